@@ -3,10 +3,28 @@
 包含ASR语音识别、LLM分析、视频下载和信息提取等核心功能
 """
 
-from core.asr_service import WhisperASR, WHISPER_AVAILABLE
-from core.gemini_llm import GeminiLLM, gemini_config
-from core.youtube_downloader import YouTubeDownloader
-from core.info_extractor import FinancialInfoExtractor
+import importlib
+
+# 名称 -> 所在模块。子模块依赖torch/whisper/yt-dlp/google-genai等重型库，
+# 首次访问对应名称时才导入，只用到其中一部分的入口不必加载全部依赖
+_LAZY_EXPORTS = {
+    'WhisperASR': 'core.asr_service',
+    'WHISPER_AVAILABLE': 'core.asr_service',
+    'GeminiLLM': 'core.gemini_llm',
+    'gemini_config': 'core.gemini_llm',
+    'YouTubeDownloader': 'core.youtube_downloader',
+    'FinancialInfoExtractor': 'core.info_extractor',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     'WhisperASR',
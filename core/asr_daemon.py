@@ -0,0 +1,194 @@
+"""
+常驻Whisper转录守护进程
+启动时加载一次模型，通过本地Unix socket接收转录请求，避免每次运行脚本都重新加载模型
+
+协议: 每个连接发送一行JSON请求 {"audio_path", "model_size", "language", "kwargs"}，
+返回一行JSON，内容与WhisperASR.transcribe_audio的返回字典一致
+"""
+
+import os
+import sys
+import json
+import socket
+import argparse
+import socketserver
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# 添加项目根目录到Python路径，以便导入模块
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# 默认socket路径，可通过环境变量ASR_DAEMON_SOCKET覆盖
+DEFAULT_SOCKET_PATH = os.environ.get("ASR_DAEMON_SOCKET", "/tmp/youtube_finance_asr.sock")
+
+# 连接守护进程的超时(秒)，转录本身耗时较长，不设读超时
+_CONNECT_TIMEOUT = 2.0
+
+UNIX_SOCKET_AVAILABLE = hasattr(socket, "AF_UNIX")
+
+
+def request_transcription(audio_path: str,
+                          model_size: str = "base",
+                          language: str = "auto",
+                          socket_path: Optional[str] = None,
+                          **kwargs) -> Optional[Dict[str, Any]]:
+    """
+    向守护进程发送转录请求
+
+    Args:
+        audio_path: 音频文件路径
+        model_size: 模型大小
+        language: 语言设置
+        socket_path: 守护进程socket路径，默认为DEFAULT_SOCKET_PATH
+        **kwargs: 传给转录的额外参数
+
+    Returns:
+        转录结果字典；守护进程未运行或通信失败时返回None，由调用方回退到进程内转录
+    """
+    socket_path = socket_path or DEFAULT_SOCKET_PATH
+    if not UNIX_SOCKET_AVAILABLE or not os.path.exists(socket_path):
+        return None
+
+    request = {
+        "audio_path": str(Path(audio_path).resolve()),
+        "model_size": model_size,
+        "language": language,
+        "kwargs": kwargs,
+    }
+
+    # 连接前先序列化，额外参数无法JSON序列化(如回调函数)时不占用守护进程，直接回退
+    try:
+        payload = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+    except (TypeError, ValueError) as e:
+        print(f"⚠️ 转录参数无法发送给ASR守护进程，回退到进程内转录: {e}")
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(_CONNECT_TIMEOUT)
+            sock.connect(socket_path)
+            sock.settimeout(None)
+            sock.sendall(payload)
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        if not line:
+            return None
+        return json.loads(line)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ ASR守护进程不可用，回退到进程内转录: {e}")
+        return None
+
+
+class _TranscribeHandler(socketserver.StreamRequestHandler):
+    """处理单个转录请求"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line)
+            result = self.server.asr.transcribe_audio(
+                request["audio_path"],
+                request.get("model_size", self.server.model_size),
+                request.get("language", "auto"),
+                **request.get("kwargs", {})
+            )
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': f"ASR守护进程处理失败: {e}",
+                'text': '',
+                'service': 'whisper'
+            }
+
+        self.wfile.write((json.dumps(result, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+
+
+def _daemon_running(socket_path: str) -> bool:
+    """
+    检查socket上是否已有守护进程在监听
+
+    Args:
+        socket_path: socket路径
+
+    Returns:
+        能连上时返回True；连接被拒绝(遗留的socket文件)或不存在时返回False
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(_CONNECT_TIMEOUT)
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+
+def serve(model_size: str = "base", socket_path: Optional[str] = None) -> None:
+    """
+    启动守护进程，预加载模型后循环处理请求(串行，GPU同一时间只跑一个转录)
+
+    Args:
+        model_size: 预加载的模型大小
+        socket_path: 监听的socket路径
+    """
+    from core.asr_service import WhisperASR, WHISPER_AVAILABLE
+
+    if not UNIX_SOCKET_AVAILABLE:
+        print("❌ 当前平台不支持Unix socket，无法启动ASR守护进程")
+        return
+    if not WHISPER_AVAILABLE:
+        print("❌ Whisper未安装，无法启动ASR守护进程")
+        return
+
+    socket_path = socket_path or DEFAULT_SOCKET_PATH
+    if os.path.exists(socket_path):
+        # 已有守护进程在运行时不能删除它的socket，否则该进程再也无法被连接
+        if _daemon_running(socket_path):
+            print(f"❌ 已有ASR守护进程在监听 {socket_path}，不再重复启动")
+            return
+        os.unlink(socket_path)
+
+    # 守护进程自身必须在进程内转录，不能再转发给自己
+    asr = WhisperASR(use_daemon=False)
+    asr._load_model(model_size)
+
+    # socket只允许当前用户连接，其他本地用户不能让守护进程读取任意音频路径
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(socket_path, _TranscribeHandler)
+    finally:
+        os.umask(old_umask)
+    os.chmod(socket_path, 0o600)
+    server.asr = asr
+    server.model_size = model_size
+
+    print(f"🎧 ASR守护进程已启动: {socket_path} (模型: {model_size})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("🛑 ASR守护进程已停止")
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="🎧 常驻Whisper转录守护进程")
+    parser.add_argument('--model', '-m', default='base',
+                        choices=['tiny', 'base', 'small', 'medium', 'large'],
+                        help='预加载的Whisper模型大小 (默认: base)')
+    parser.add_argument('--socket', '-s', default=DEFAULT_SOCKET_PATH,
+                        help=f'监听的Unix socket路径 (默认: {DEFAULT_SOCKET_PATH})')
+    args = parser.parse_args()
+
+    serve(args.model, args.socket)
+
+
+if __name__ == "__main__":
+    main()
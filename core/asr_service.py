@@ -1,45 +1,158 @@
 """
-基于OpenAI Whisper的自动语音识别(ASR)服务
+基于Whisper的自动语音识别(ASR)服务
 专注于本地Whisper部署，支持中英文混杂语音识别
+优先使用faster-whisper(CTranslate2)后端，未安装时回退到OpenAI Whisper
 """
 
+import os
+import shutil
 import logging
+import functools
+import importlib.util
 import warnings
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from core.asr_daemon import request_transcription
+
 # 抑制一些不必要的警告
 warnings.filterwarnings("ignore", category=UserWarning)
 logging.getLogger("transformers").setLevel(logging.ERROR)
 
-try:
-    import torch
-    import whisper
-    WHISPER_AVAILABLE = True
-    # 检查CUDA是否可用
-    CUDA_AVAILABLE = torch.cuda.is_available()
-    if CUDA_AVAILABLE:
-        print(f"🚀 检测到GPU: {torch.cuda.get_device_name(0)}")
-        print(f"💾 GPU内存: {torch.cuda.get_device_properties(0).total_memory // 1024**3}GB")
+# 只探测后端是否已安装，torch/whisper等重依赖推迟到首次转录时才导入
+# 优先使用faster-whisper(CTranslate2后端，INT8/FP16量化权重与融合算子)，未安装时回退到OpenAI参考实现
+FASTER_WHISPER_AVAILABLE = importlib.util.find_spec("faster_whisper") is not None
+OPENAI_WHISPER_AVAILABLE = (
+    importlib.util.find_spec("whisper") is not None and importlib.util.find_spec("torch") is not None
+)
+WHISPER_AVAILABLE = FASTER_WHISPER_AVAILABLE or OPENAI_WHISPER_AVAILABLE
+
+# OpenAI Whisper后端的语音活动检测(faster-whisper自带Silero VAD)
+SILERO_VAD_AVAILABLE = importlib.util.find_spec("silero_vad") is not None
+
+if not WHISPER_AVAILABLE:
+    print("⚠️ Whisper未安装。请运行: uv sync --extra whisper 安装依赖")
+
+# 当前使用的推理后端
+WHISPER_BACKEND = "faster-whisper" if FASTER_WHISPER_AVAILABLE else "openai-whisper"
+
+
+@functools.lru_cache(maxsize=None)
+def _cuda_available() -> bool:
+    """检查当前后端能否使用CUDA，首次调用时才导入后端并打印设备信息；只有openai-whisper后端才导入torch"""
+    if FASTER_WHISPER_AVAILABLE:
+        import ctranslate2
+        cuda_available = ctranslate2.get_cuda_device_count() > 0
+        if cuda_available:
+            print("🚀 检测到GPU，使用CUDA进行Whisper推理")
+    elif OPENAI_WHISPER_AVAILABLE:
+        import torch
+        cuda_available = torch.cuda.is_available()
+        if cuda_available:
+            print(f"🚀 检测到GPU: {torch.cuda.get_device_name(0)}")
+            print(f"💾 GPU内存: {torch.cuda.get_device_properties(0).total_memory // 1024**3}GB")
     else:
+        return False
+    
+    if not cuda_available:
         print("💻 使用CPU进行Whisper推理")
-except ImportError:
-    WHISPER_AVAILABLE = False
-    CUDA_AVAILABLE = False
-    print("⚠️ Whisper未安装。请运行: uv sync 安装依赖")
+    return cuda_available
+
+
+def _compute_type() -> str:
+    """
+    faster-whisper权重精度: GPU上INT8权重+FP16计算，CPU上纯INT8，精度与FP32基本一致
+    可通过环境变量WHISPER_COMPUTE_TYPE覆盖(如GPU上用"float16"/"bfloat16"对比WER)
+    """
+    return os.environ.get("WHISPER_COMPUTE_TYPE") or ("int8_float16" if _cuda_available() else "int8")
+
+
+def __getattr__(name: str) -> Any:
+    """CUDA_AVAILABLE/COMPUTE_TYPE按需计算，导入本模块时不加载torch"""
+    if name == "CUDA_AVAILABLE":
+        return _cuda_available()
+    if name == "COMPUTE_TYPE":
+        return _compute_type()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Whisper的输入采样率，预转换的WAV缓存文件后缀
+WHISPER_SAMPLE_RATE = 16000
+PREPARED_AUDIO_SUFFIX = ".16k.wav"
+
+
+@functools.lru_cache(maxsize=3)
+def _get_whisper_model(model_size: str, device: str):
+    """
+    加载Whisper模型，按(模型大小, 设备)在进程内缓存，所有WhisperASR实例共享
+    
+    Args:
+        model_size: 模型大小
+        device: 推理设备 ("cuda", "cpu")
+        
+    Returns:
+        当前后端的模型对象
+    """
+    print(f"📥 加载Whisper模型: {model_size} ({WHISPER_BACKEND})")
+    print(f"🖥️ 使用设备: {device}")
+    if FASTER_WHISPER_AVAILABLE:
+        from faster_whisper import WhisperModel
+        model = WhisperModel(model_size, device=device, compute_type=_compute_type())
+    else:
+        import whisper
+        model = whisper.load_model(model_size, device=device)
+        if os.environ.get("WHISPER_TORCH_COMPILE") == "1":
+            model.encoder = _compile_module(model.encoder)
+    print(f"✅ 模型加载完成 ({device})")
+    return model
+
+
+def _compile_module(module):
+    """
+    使用torch.compile编译模型子模块(PyTorch 2.x)，不支持或失败时原样返回
+    
+    Args:
+        module: 待编译的torch模块
+        
+    Returns:
+        编译后的模块或原模块
+    """
+    import torch
+    
+    if not hasattr(torch, "compile"):
+        print("⚠️ 当前PyTorch不支持torch.compile，跳过编译")
+        return module
+    try:
+        compiled = torch.compile(module)
+        print("⚙️ 已启用torch.compile编译Whisper编码器")
+        return compiled
+    except Exception as e:
+        print(f"⚠️ torch.compile失败，使用未编译模型: {e}")
+        return module
 
 
 class WhisperASR:
-    """基于OpenAI Whisper的语音识别服务类"""
+    """基于Whisper的语音识别服务类"""
     
-    def __init__(self):
-        """初始化Whisper ASR服务"""
+    def __init__(self, use_daemon: bool = True):
+        """
+        初始化Whisper ASR服务
+        
+        Args:
+            use_daemon: 是否优先把转录请求发给常驻的ASR守护进程(已加载模型)，不可用时在进程内转录
+        """
         self.model = None
         self.current_model_size = None
+        self.use_daemon = use_daemon
+        self.vad_model = None
         
     def transcribe_audio(self, audio_path: str, 
                         model_size: str = "base",
                         language: str = "auto",
+                        use_vad: bool = True,
+                        return_segments: bool = False,
                         **kwargs) -> Dict[str, Any]:
         """
         使用Whisper转录音频文件为文本
@@ -48,24 +161,36 @@ class WhisperASR:
             audio_path: 音频文件路径
             model_size: 模型大小 ("tiny", "base", "small", "medium", "large")
             language: 语言代码 ("auto", "zh", "en", "zh-en")
+            use_vad: 是否先做语音活动检测，只转录有人声的片段(跳过片头片尾音乐和静音)
+            return_segments: 是否返回带时间戳的分段；不需要时跳过时间戳解码，segments为空列表
             **kwargs: 额外参数
             
         Returns:
             Dict包含转录结果
         """
-        if not WHISPER_AVAILABLE:
+        audio_path = Path(audio_path)
+        if not audio_path.exists():
             return {
                 'success': False,
-                'error': 'Whisper未安装。请运行: uv sync',
+                'error': f'音频文件不存在: {audio_path}',
                 'text': '',
                 'service': 'whisper'
             }
         
-        audio_path = Path(audio_path)
-        if not audio_path.exists():
+        # 守护进程已常驻模型时直接转发，省去本进程的模型加载
+        if self.use_daemon:
+            daemon_result = request_transcription(
+                str(audio_path), model_size, language,
+                use_vad=use_vad, return_segments=return_segments, **kwargs
+            )
+            if daemon_result is not None:
+                print(f"🎧 已由ASR守护进程完成转录: {audio_path.name}")
+                return daemon_result
+        
+        if not WHISPER_AVAILABLE:
             return {
                 'success': False,
-                'error': f'音频文件不存在: {audio_path}',
+                'error': 'Whisper未安装。请运行: uv sync',
                 'text': '',
                 'service': 'whisper'
             }
@@ -75,31 +200,22 @@ class WhisperASR:
         print(f"🧠 模型大小: {model_size}")
         
         try:
-            # 加载或重用Whisper模型
-            if self.model is None or self.current_model_size != model_size:
-                print(f"📥 加载Whisper模型: {model_size}")
-                # 根据GPU可用性选择设备
-                device = "cuda" if CUDA_AVAILABLE else "cpu"
-                print(f"🖥️ 使用设备: {device}")
-                self.model = whisper.load_model(model_size, device=device)
-                self.current_model_size = model_size
-                print(f"✅ 模型加载完成 ({device})")
+            self._load_model(model_size)
             
             # 设置语言参数
             whisper_language = self._get_whisper_language(language)
                 
+            # 不需要分段时间线时只解码文本token，省去时间戳预测
+            if not return_segments:
+                kwargs.setdefault("without_timestamps", True)
+            
             # 执行转录
             print("🔄 正在转录音频...")
-            result = self.model.transcribe(
-                str(audio_path),
-                language=whisper_language,
-                verbose=False,
-                **kwargs
-            )
+            result = self._run_transcribe(str(audio_path), whisper_language, use_vad, **kwargs)
             
             text = result["text"].strip()
             detected_language = result.get("language", "unknown")
-            segments = result.get("segments", [])
+            segments = result.get("segments", []) if return_segments else []
             
             # 语言显示名称映射
             language_names = {
@@ -115,7 +231,8 @@ class WhisperASR:
             print(f"✅ 转录完成!")
             print(f"🌐 检测语言: {language_display} ({detected_language})")
             print(f"📝 文本长度: {len(text)} 个字符")
-            print(f"⏱️ 分段数量: {len(segments)}")
+            if return_segments:
+                print(f"⏱️ 分段数量: {len(segments)}")
             
             return {
                 'success': True,
@@ -123,7 +240,9 @@ class WhisperASR:
                 'language': detected_language,
                 'language_display': language_display,
                 'service': 'whisper',
+                'backend': WHISPER_BACKEND,
                 'model_size': model_size,
+                'language_probability': result.get('language_probability'),
                 'segments': segments,
                 'segment_count': len(segments),
                 'text_length': len(text),
@@ -141,6 +260,144 @@ class WhisperASR:
                 'model_size': model_size
             }
     
+    def transcribe_batch(self, audio_paths: List[str],
+                         model_size: str = "base",
+                         language: str = "auto",
+                         keep_prepared_audio: bool = False,
+                         **kwargs) -> List[Dict[str, Any]]:
+        """
+        批量转录多个音频文件，模型只加载一次并在各文件间复用
+        
+        Args:
+            audio_paths: 音频文件路径列表
+            model_size: 模型大小 ("tiny", "base", "small", "medium", "large")
+            language: 语言代码 ("auto", "zh", "en", "zh-en")
+            keep_prepared_audio: 是否保留预转换的16kHz WAV(约每小时115MB)，供换用其他模型重新转录时复用
+            **kwargs: 额外参数
+            
+        Returns:
+            与audio_paths顺序一致的转录结果列表
+        """
+        # transcribe_audio在模型大小不变时复用已加载的模型，整批只加载一次
+        # 当前文件转录时，后台线程预先把下一个文件解码重采样为16kHz WAV
+        results = []
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            pending = prefetcher.submit(prepare_audio, audio_paths[0]) if audio_paths else None
+            for i, audio_path in enumerate(audio_paths, 1):
+                try:
+                    prepared_path = pending.result()
+                except Exception:
+                    prepared_path = audio_path
+                if i < len(audio_paths):
+                    pending = prefetcher.submit(prepare_audio, audio_paths[i])
+                
+                print(f"\n📦 批量转录 {i}/{len(audio_paths)}")
+                result = self.transcribe_audio(str(prepared_path), model_size, language, **kwargs)
+                results.append(result)
+                # 转录成功后删除本次新生成的WAV，不在源文件旁长期占用磁盘
+                if result.get('success') and not keep_prepared_audio and Path(prepared_path) != Path(audio_path):
+                    try:
+                        Path(prepared_path).unlink()
+                    except OSError:
+                        pass
+        return results
+    
+    def _load_model(self, model_size: str) -> None:
+        """
+        获取Whisper模型，进程内已加载过相同大小的模型时直接复用
+        
+        Args:
+            model_size: 模型大小
+        """
+        # 根据GPU可用性选择设备
+        device = "cuda" if _cuda_available() else "cpu"
+        self.model = _get_whisper_model(model_size, device)
+        self.current_model_size = model_size
+    
+    def release(self) -> None:
+        """释放进程内缓存的所有Whisper模型及显存，显存紧张时调用"""
+        self.model = None
+        self.current_model_size = None
+        _get_whisper_model.cache_clear()
+        if WHISPER_BACKEND == "openai-whisper" and _cuda_available():
+            import torch
+            torch.cuda.empty_cache()
+        print("🧹 已释放Whisper模型缓存")
+    
+    def _run_transcribe(self, audio_path: str, whisper_language: Optional[str],
+                        use_vad: bool = True, **kwargs) -> Dict[str, Any]:
+        """
+        使用当前后端执行转录，统一为OpenAI Whisper的结果格式
+        
+        Args:
+            audio_path: 音频文件路径
+            whisper_language: Whisper语言代码，None表示自动检测
+            use_vad: 是否只转录语音活动检测出的片段
+            **kwargs: 额外参数，原样传给后端
+            
+        Returns:
+            包含text、language、segments的结果字典
+        """
+        if not FASTER_WHISPER_AVAILABLE:
+            import whisper
+            audio = audio_path
+            if use_vad and SILERO_VAD_AVAILABLE and "clip_timestamps" not in kwargs:
+                # 只解码一次音频，VAD与转录共用同一份波形
+                audio = whisper.load_audio(audio_path)
+                clips = self._speech_clip_timestamps(audio)
+                if clips:
+                    kwargs["clip_timestamps"] = clips
+            # GPU上显式使用FP16推理；CPU不支持FP16，显式关闭以免每次告警回退
+            kwargs.setdefault("fp16", _cuda_available())
+            import torch
+            with torch.inference_mode():
+                return self.model.transcribe(audio, language=whisper_language, verbose=False, **kwargs)
+        
+        options = {"vad_filter": use_vad, "beam_size": 5}
+        options.update(kwargs)
+        segments_iter, info = self.model.transcribe(audio_path, language=whisper_language, **options)
+        
+        # segments是惰性生成器，遍历时才真正解码
+        segments = [
+            {"id": i, "start": segment.start, "end": segment.end, "text": segment.text}
+            for i, segment in enumerate(segments_iter)
+        ]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "language": info.language,
+            "language_probability": info.language_probability,
+            "segments": segments,
+        }
+    
+    def _speech_clip_timestamps(self, audio) -> List[float]:
+        """
+        使用Silero VAD检测语音片段，转换为Whisper的clip_timestamps参数
+        
+        Args:
+            audio: 16kHz单声道float32波形
+            
+        Returns:
+            [起点1, 终点1, 起点2, 终点2, ...] 形式的秒数列表；未检测到语音时返回空列表
+        """
+        import torch
+        from silero_vad import load_silero_vad, get_speech_timestamps
+        
+        if self.vad_model is None:
+            self.vad_model = load_silero_vad()
+        
+        speech_timestamps = get_speech_timestamps(
+            torch.from_numpy(audio), self.vad_model,
+            sampling_rate=WHISPER_SAMPLE_RATE, return_seconds=True
+        )
+        clips = []
+        for span in speech_timestamps:
+            clips.extend([float(span["start"]), float(span["end"])])
+        
+        if clips:
+            speech_seconds = sum(clips[i + 1] - clips[i] for i in range(0, len(clips), 2))
+            print(f"🔇 VAD检测到 {len(speech_timestamps)} 段语音, 共 {speech_seconds:.0f}/{len(audio) / WHISPER_SAMPLE_RATE:.0f} 秒")
+        return clips
+    
     def _get_whisper_language(self, language: str) -> Optional[str]:
         """
         转换语言参数为Whisper格式
@@ -189,16 +446,69 @@ class WhisperASR:
         
         return {
             "whisper_available": WHISPER_AVAILABLE,
-            "cuda_available": CUDA_AVAILABLE,
+            "cuda_available": _cuda_available(),
+            "backend": WHISPER_BACKEND,
+            "compute_type": _compute_type() if FASTER_WHISPER_AVAILABLE else "float32",
             "current_model": self.current_model_size,
             "available_models": self.get_available_models(),
             "models_info": models_info,
             "supported_languages": ["auto", "zh", "en", "zh-en"],
             "recommended_model": "base",
-            "device": "cuda" if CUDA_AVAILABLE else "cpu"
+            "device": "cuda" if _cuda_available() else "cpu"
         }
 
 
+def prepare_audio(audio_path: str) -> Path:
+    """
+    将音频预先转换为16kHz单声道WAV并缓存在同目录，后续转录(包括换用其他模型重转)直接复用
+    
+    只在批量转录时使用，与上一个文件的推理重叠执行；单次转录时faster-whisper直接解码原始音频，
+    预转换只会多一遍解码和一个大文件
+    
+    Args:
+        audio_path: 原始音频文件路径
+        
+    Returns:
+        转换后的WAV路径；已是缓存文件、未安装ffmpeg或转换失败时返回原路径
+    """
+    audio_path = Path(audio_path)
+    if audio_path.name.endswith(PREPARED_AUDIO_SUFFIX):
+        return audio_path
+    
+    wav_path = audio_path.with_name(audio_path.stem + PREPARED_AUDIO_SUFFIX)
+    if wav_path.exists() and wav_path.stat().st_mtime >= audio_path.stat().st_mtime:
+        return wav_path
+    
+    if shutil.which("ffmpeg") is None:
+        return audio_path
+    
+    # 先写唯一的临时文件再替换，避免中断时留下不完整的缓存，也避免并发转换同一文件时互相覆盖
+    try:
+        fd, tmp_name = tempfile.mkstemp(prefix=wav_path.name + ".", suffix=".tmp", dir=wav_path.parent)
+    except OSError as e:
+        print(f"⚠️ 音频预转换失败，使用原始文件: {e}")
+        return audio_path
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-i", str(audio_path),
+             "-ar", str(WHISPER_SAMPLE_RATE), "-ac", "1", "-f", "wav", str(tmp_path)],
+            check=True
+        )
+        os.replace(tmp_path, wav_path)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"⚠️ 音频预转换失败，使用原始文件: {e}")
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        return audio_path
+    
+    print(f"🎚️ 已预转换为16kHz单声道WAV: {wav_path.name}")
+    return wav_path
+
+
 def transcribe_audio_file(audio_path: str, model_size: str = "base", 
                          language: str = "auto", **kwargs) -> Dict[str, Any]:
     """
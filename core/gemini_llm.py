@@ -1,14 +1,34 @@
+import asyncio
+import functools
 import os
+import json
 import time
 import logging
-import traceback
 from pathlib import Path
 import random
+from email.utils import parsedate_to_datetime
 
+import httpx
 from google import genai
 from google.api_core import exceptions as google_exceptions
 from google.genai import types
 
+from core.rate_limiter import TokenBucket, estimate_tokens
+
+# 安装h2后底层httpx客户端启用HTTP/2，并发请求复用同一条连接
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 批量预测需要通过GCS上传输入、读取输出
+try:
+    from google.cloud import storage
+    GCS_AVAILABLE = True
+except ImportError:
+    GCS_AVAILABLE = False
+
 # 日志
 logging.basicConfig(level=logging.INFO)
 
@@ -38,8 +58,140 @@ gemini_config = {
     ],
     # 计费标签
     "billing_name": "xxxx",
+    # 批量预测的GCS前缀 (如 gs://bucket/batch)，为None时不使用批量预测
+    "batch_gcs_uri": None,
+    # 客户端限流: 每分钟请求数/token数配额，为None时不限流
+    "rpm": None,
+    "tpm": None,
 }
 
+# 底层HTTP连接池: 保持长连接，避免每次请求重新进行TCP/TLS握手
+_HTTP_POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60)
+
+# Pro模型不能关闭思考，思考预算最小为128
+_PRO_MIN_THINKING_BUDGET = 128
+
+# 批量预测任务的终止状态
+_BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+
+def _parse_retry_after(error):
+    """
+    从异常携带的HTTP响应中解析Retry-After头(秒数或HTTP日期)
+
+    Args:
+        error: API调用抛出的异常
+
+    Returns:
+        建议等待的秒数，没有该头或无法解析时返回None
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_openapi_schema(node, in_properties=False):
+    """
+    将小写type的JSON schema转换为批量预测请求使用的OpenAPI schema (type为大写枚举名)
+    """
+    if isinstance(node, list):
+        return [_to_openapi_schema(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    return {
+        key: (value.upper() if key == "type" and not in_properties and isinstance(value, str)
+              else _to_openapi_schema(value, in_properties=(key == "properties" and not in_properties)))
+        for key, value in node.items()
+    }
+
+
+def _candidate_text(candidate):
+    """
+    取出候选结果的文本，跳过思考部分
+
+    结构化输出通常只有一个文本part，直接返回，不经过response.text每次访问时的遍历和拼接
+
+    Args:
+        candidate: 响应中的候选结果
+
+    Returns:
+        候选结果的文本，没有文本时返回空字符串
+    """
+    content = getattr(candidate, "content", None)
+    parts = getattr(content, "parts", None) or []
+    if len(parts) == 1 and not parts[0].thought:
+        return parts[0].text or ""
+    return "".join(part.text for part in parts if part.text and not part.thought)
+
+
+def _stream_finish_reason(chunk):
+    """
+    取出流式响应分块中候选结果的结束原因
+
+    MAX_TOKENS与非流式调用一致映射为"length"，STOP为"stop"，其余(如SAFETY)取枚举名的小写形式
+
+    Args:
+        chunk: 流式响应的一个分块
+
+    Returns:
+        结束原因，该分块尚未结束时返回None
+    """
+    candidates = getattr(chunk, "candidates", None) or []
+    reason = candidates[0].finish_reason if candidates else None
+    if not reason or reason == types.FinishReason.FINISH_REASON_UNSPECIFIED:
+        return None
+    if reason == types.FinishReason.MAX_TOKENS:
+        return "length"
+    if reason == types.FinishReason.STOP:
+        return "stop"
+    return str(getattr(reason, "name", reason)).lower()
+
+
+@functools.lru_cache(maxsize=None)
+def _configure_credentials(credentials_path):
+    """
+    检查凭据文件并设置GOOGLE_APPLICATION_CREDENTIALS，每个路径在进程内只检查一次
+
+    Args:
+        credentials_path: 凭据文件路径
+
+    Returns:
+        凭据文件是否存在
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"🔑 检查Gemini凭据文件: {credentials_path}")
+
+    if credentials_path and os.path.exists(credentials_path):
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
+        logger.info(f"✅ 找到凭据文件: {credentials_path}")
+        return True
+
+    logger.warning(f"❌ Gemini凭据文件不存在: {credentials_path}")
+    logger.warning(f"💡 请确保配置文件存在并包含正确的Google Cloud凭据")
+    return False
+
+
+@functools.lru_cache(maxsize=1)
+def get_shared_llm():
+    """
+    获取进程内共享的GeminiLLM实例(使用默认gemini_config)
+
+    多个提取器复用同一个客户端，避免重复加载凭据、创建客户端和建立TLS连接
+    """
+    return GeminiLLM(gemini_config)
+
+
 class GeminiLLM:
     """
     Google Gemini LLM调用封装类
@@ -66,32 +218,101 @@ class GeminiLLM:
             self.gemini_max_tokens = gemini_config["max_tokens"]
             self.gemini_thinking_budget = gemini_config["thinking_budget"]
             self.gemini_safety_settings = gemini_config["safety_settings"]
+            self.gemini_batch_gcs_uri = gemini_config.get("batch_gcs_uri")
+
+            # 安全设置和默认思考配置每次请求都相同，预先构建一次供所有请求复用
+            self._safety_settings = [
+                types.SafetySetting(category=setting["category"], threshold=setting["threshold"])
+                for setting in self.gemini_safety_settings
+            ]
+            self._default_thinking_config = types.ThinkingConfig(
+                thinking_budget=self._resolve_thinking_budget(self.gemini_thinking_budget)
+            )
+            self._default_labels = {"billing_name": self.gemini_billing_name}
+
+            # 按配额在本地预先等待，而不是触发429后再退避重试
+            rpm, tpm = gemini_config.get("rpm"), gemini_config.get("tpm")
+            self._request_limiter = TokenBucket(rpm) if rpm else None
+            self._token_limiter = TokenBucket(tpm) if tpm else None
 
             # 设置Google应用凭据
-            credentials_path = gemini_config.get("credentials_path")
-            self.logger.info(f"🔑 检查Gemini凭据文件: {credentials_path}")
-            
-            if credentials_path and os.path.exists(credentials_path):
-                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-                self.logger.info(f"✅ 找到凭据文件: {credentials_path}")
-            else:
-                self.logger.warning(f"❌ Gemini凭据文件不存在: {credentials_path}")
-                self.logger.warning(f"💡 请确保配置文件存在并包含正确的Google Cloud凭据")
+            _configure_credentials(gemini_config.get("credentials_path"))
 
             # 初始化Gemini客户端
             self.gemini_client = genai.Client(
                 vertexai=True,
                 project=self.gemini_project_id,
                 location=self.gemini_location,
+                http_options=self._build_http_options(),
             )
             self.logger.info(
                 f"Initialized Gemini tool, project: {self.gemini_project_id}, model: {self.gemini_model_name}"
             )
         except Exception as e:
-            self.logger.error(f"Failed to initialize Gemini client: {e}")
-            traceback.print_exc()
+            self.logger.exception(f"Failed to initialize Gemini client: {e}")
             raise
 
+    def _resolve_thinking_budget(self, thinking_budget):
+        """
+        确定实际使用的思考预算
+
+        Flash系列传0可关闭思考；Pro模型不支持关闭，小于最小值时提升到最小值，避免请求被拒绝
+
+        Args:
+            thinking_budget: 请求的思考预算，为None时使用配置中的默认值
+
+        Returns:
+            实际使用的思考预算
+        """
+        if thinking_budget is None:
+            thinking_budget = self.gemini_thinking_budget
+        if "pro" in self.gemini_model_name and 0 <= thinking_budget < _PRO_MIN_THINKING_BUDGET:
+            return _PRO_MIN_THINKING_BUDGET
+        return thinking_budget
+
+    def _build_http_options(self):
+        """
+        构建底层httpx客户端参数: 持久连接池，可用时启用HTTP/2
+
+        Returns:
+            types.HttpOptions
+        """
+        client_args = {"limits": _HTTP_POOL_LIMITS, "http2": HTTP2_AVAILABLE}
+        return types.HttpOptions(client_args=client_args, async_client_args=dict(client_args))
+
+    def close(self):
+        """关闭底层HTTP连接池，不再使用该实例时调用"""
+        close = getattr(self.gemini_client, "close", None)
+        if callable(close):
+            close()
+
+    def _estimate_request_tokens(self, message_list, config):
+        """估算一次请求消耗的token配额: 输入估算值 + 输出和思考预算"""
+        input_tokens = sum(estimate_tokens(message.get("content", "")) for message in message_list)
+        thinking_config = getattr(config, "thinking_config", None)
+        thinking_tokens = getattr(thinking_config, "thinking_budget", None) or 0
+        return input_tokens + (config.max_output_tokens or 0) + thinking_tokens
+
+    def _throttle(self, message_list, config):
+        """同步调用前按RPM/TPM配额等待"""
+        waited = 0.0
+        if self._request_limiter:
+            waited += self._request_limiter.acquire(1)
+        if self._token_limiter:
+            waited += self._token_limiter.acquire(self._estimate_request_tokens(message_list, config))
+        if waited > 0:
+            self.logger.info(f"⏳ 客户端限流，等待 {waited:.1f} 秒")
+
+    async def _athrottle(self, message_list, config):
+        """异步调用前按RPM/TPM配额等待"""
+        waited = 0.0
+        if self._request_limiter:
+            waited += await self._request_limiter.aacquire(1)
+        if self._token_limiter:
+            waited += await self._token_limiter.aacquire(self._estimate_request_tokens(message_list, config))
+        if waited > 0:
+            self.logger.info(f"⏳ 客户端限流，等待 {waited:.1f} 秒")
+
     def _convert_messages_to_gemini_contents(self, messages):
         """
         将标准消息格式转换为Gemini的Content格式
@@ -128,6 +349,7 @@ class GeminiLLM:
         max_tokens=None,
         timeout=None,
         thinking_budget=None,
+        response_schema=None,
         **kwargs,
     ):
         """
@@ -139,7 +361,9 @@ class GeminiLLM:
             max_tokens: 最大输出token数
             timeout: 超时时间（秒）
             thinking_budget: 思考预算token数
-            **kwargs: 其他参数（如response_mime_type等）
+            response_schema: 输出结构的schema(JSON schema字典或types.Schema)，
+                指定后由API在解码时强制输出符合该结构的JSON
+            **kwargs: 其他参数（如response_mime_type、cached_content等）
 
         Returns:
             (response, tokens_used, finish_reason): 返回内容、token使用量(整数)和结束原因
@@ -149,52 +373,11 @@ class GeminiLLM:
             return "", 0, "invalid_request"
 
         try:
-            # 转换消息格式
-            contents, system_instruction = self._convert_messages_to_gemini_contents(message_list)
-
-            # 使用传入的参数或配置文件中的默认值
-            request_timeout = timeout if timeout is not None else self.gemini_timeout
-            request_temperature = temperature if temperature is not None else self.gemini_temperature
-            request_max_tokens = max_tokens if max_tokens is not None else self.gemini_max_tokens
-            request_thinking_budget = thinking_budget if thinking_budget is not None else self.gemini_thinking_budget
-
-            # 从 kwargs 中获取 response_mime_type 和 response_schema
-            response_mime_type = kwargs.get("response_mime_type")
-            response_schema = kwargs.get("response_schema")
-
-            # 设置默认labels
-            labels = kwargs.get("labels", {"billing_name": self.gemini_billing_name})
-
-            self.logger.info(f"Calling Gemini API, model: {self.gemini_model_name}, message count: {len(contents)}")
-
-            # 配置生成参数
-            config_params = {
-                "temperature": request_temperature,
-                "max_output_tokens": request_max_tokens,
-                "safety_settings": [
-                    types.SafetySetting(category=setting["category"], threshold=setting["threshold"])
-                    for setting in self.gemini_safety_settings
-                ],
-                "thinking_config": types.ThinkingConfig(thinking_budget=request_thinking_budget),
-                "labels": labels,
-            }
-            
-            # 如果指定了response_mime_type，添加到配置中
-            if response_mime_type:
-                config_params["response_mime_type"] = response_mime_type
-                self.logger.info(f"Setting response_mime_type to: {response_mime_type}")
-            
-            # 如果指定了response_schema，添加到配置中
-            if response_schema:
-                config_params["response_schema"] = response_schema
-                self.logger.info(f"Setting response_schema with {len(response_schema.get('properties', {}))} properties")
-            
-            generate_content_config = types.GenerateContentConfig(**config_params)
-
-            # 如果有系统指令，添加到配置中
-            if system_instruction:
-                generate_content_config.system_instruction = system_instruction
+            contents, generate_content_config = self._build_request(
+                message_list, temperature, max_tokens, thinking_budget, response_schema, **kwargs
+            )
 
+            self._throttle(message_list, generate_content_config)
             start_time = time.time()
 
             # 使用重试机制调用API
@@ -204,47 +387,414 @@ class GeminiLLM:
                 max_retries=self.gemini_max_retries
             )
 
-            # 处理响应
-            end_time = time.time()
-            response_time = end_time - start_time
-
-            # 统计token使用情况
-            usage = response.usage_metadata
-            input_tokens = getattr(usage, "prompt_token_count", 0) or 0
-            output_tokens = getattr(usage, "candidates_token_count", 0) or 0
-            thoughts_tokens = getattr(usage, "thoughts_token_count", 0) or 0
-            total_tokens = input_tokens + output_tokens + thoughts_tokens
-
-            self.logger.info(f"Gemini API call successful, time taken: {response_time:.2f} seconds")
-            self.logger.info(f"Token usage: input={input_tokens}, output={output_tokens}, thoughts={thoughts_tokens}")
-
-            if response and response.text:
-                return response.text, total_tokens, "stop"
-            else:
-                self.logger.warning(f"Gemini API returned empty response")
-                return "", 0, "empty_response"
-
-        except google_exceptions.DeadlineExceeded:
-            self.logger.error(f"Gemini API request timed out after {timeout or self.gemini_timeout} seconds")
-            traceback.print_exc()
+            return self._parse_response(response, time.time() - start_time)
+
+        except Exception as e:
+            return self._handle_call_error(e, timeout)
+
+    async def acall(
+        self,
+        message_list,
+        temperature=None,
+        max_tokens=None,
+        timeout=None,
+        thinking_budget=None,
+        response_schema=None,
+        **kwargs,
+    ):
+        """
+        异步调用Google Gemini API，参数和返回值与call一致
+
+        使用 google-genai 的 aio 客户端，适合在同一事件循环中并发发起多个请求
+
+        Returns:
+            (response, tokens_used, finish_reason): 返回内容、token使用量(整数)和结束原因
+        """
+        if not message_list:
+            self.logger.warning("Message list is empty")
+            return "", 0, "invalid_request"
+
+        try:
+            contents, generate_content_config = self._build_request(
+                message_list, temperature, max_tokens, thinking_budget, response_schema, **kwargs
+            )
+
+            await self._athrottle(message_list, generate_content_config)
+            start_time = time.time()
+
+            response = await self._acall_with_retry(
+                contents=contents,
+                config=generate_content_config,
+                max_retries=self.gemini_max_retries
+            )
+
+            return self._parse_response(response, time.time() - start_time)
+
+        except Exception as e:
+            return self._handle_call_error(e, timeout)
+
+    async def astream(
+        self,
+        message_list,
+        temperature=None,
+        max_tokens=None,
+        timeout=None,
+        thinking_budget=None,
+        response_schema=None,
+        **kwargs,
+    ):
+        """
+        流式调用Google Gemini API，参数与call一致
+
+        Yields:
+            (text_chunk, tokens_used, finish_reason): 新到达的文本片段、截至目前的token使用量和结束原因；
+            结束原因在最后一个分块之前为None，最后一个分块即使没有文本也会产出
+
+        Raises:
+            Exception: 流式调用失败时直接抛出，由调用方决定是否回退
+        """
+        if not message_list:
+            self.logger.warning("Message list is empty")
+            return
+
+        contents, generate_content_config = self._build_request(
+            message_list, temperature, max_tokens, thinking_budget, response_schema, **kwargs
+        )
+
+        await self._athrottle(message_list, generate_content_config)
+        start_time = time.time()
+        tokens_used = 0
+        finish_reason = None
+
+        stream = await self.gemini_client.aio.models.generate_content_stream(
+            model=self.gemini_model_name,
+            contents=contents,
+            config=generate_content_config,
+        )
+        async for chunk in stream:
+            usage = chunk.usage_metadata
+            if usage:
+                tokens_used = sum(
+                    getattr(usage, name, 0) or 0
+                    for name in ("prompt_token_count", "candidates_token_count", "thoughts_token_count")
+                )
+            finish_reason = _stream_finish_reason(chunk) or finish_reason
+            text = chunk.text
+            if text or finish_reason:
+                yield text or "", tokens_used, finish_reason
+
+        if finish_reason == "length":
+            self.logger.warning(f"Gemini stream output truncated by max_output_tokens")
+        self.logger.info(f"Gemini stream finished, time taken: {time.time() - start_time:.2f} seconds, tokens: {tokens_used}")
+
+    def embed(self, text, model="text-embedding-004", dimensions=256):
+        """
+        计算文本嵌入向量
+
+        Args:
+            text: 输入文本
+            model: 嵌入模型名称
+            dimensions: 输出向量维度
+
+        Returns:
+            嵌入向量(浮点数列表)
+        """
+        response = self.gemini_client.models.embed_content(
+            model=model,
+            contents=text,
+            config=types.EmbedContentConfig(output_dimensionality=dimensions),
+        )
+        return response.embeddings[0].values
+
+    def create_cached_content(self, text, ttl_seconds=3600, display_name=None):
+        """
+        创建显式上下文缓存，后续请求通过cached_content复用这段静态内容
+
+        Args:
+            text: 要缓存的静态内容(通常是prompt模板中不变的部分)
+            ttl_seconds: 缓存有效期（秒）
+            display_name: 缓存显示名称
+
+        Returns:
+            缓存资源名称
+
+        Raises:
+            Exception: 创建失败(如内容低于模型要求的最小token数)
+        """
+        cached_content = self.gemini_client.caches.create(
+            model=self.gemini_model_name,
+            config=types.CreateCachedContentConfig(
+                contents=[types.Content(role="user", parts=[types.Part.from_text(text=text)])],
+                ttl=f"{ttl_seconds}s",
+                display_name=display_name,
+            ),
+        )
+        self.logger.info(f"📌 Created cached content: {cached_content.name}, ttl: {ttl_seconds}s")
+        return cached_content.name
+
+    def batch_generate(
+        self,
+        requests,
+        gcs_uri=None,
+        temperature=None,
+        max_tokens=None,
+        thinking_budget=None,
+        poll_interval=30,
+        timeout=24 * 3600,
+        **kwargs,
+    ):
+        """
+        通过Vertex AI批量预测提交一批请求，价格约为在线调用的一半，适合离线任务
+
+        Args:
+            requests: {请求key: message_list} 字典
+            gcs_uri: 存放输入/输出文件的GCS前缀，默认使用配置中的batch_gcs_uri
+            temperature: 温度参数
+            max_tokens: 最大输出token数
+            thinking_budget: 思考预算token数
+            poll_interval: 轮询任务状态的间隔（秒）
+            timeout: 等待任务完成的最长时间（秒）
+            **kwargs: 其他参数（如response_mime_type、response_schema等）
+
+        Returns:
+            {请求key: (response, tokens_used, finish_reason)} 字典，没有结果的请求不包含在内
+
+        Raises:
+            RuntimeError: 未配置GCS、任务失败或等待超时
+        """
+        gcs_uri = gcs_uri or self.gemini_batch_gcs_uri
+        if not GCS_AVAILABLE:
+            raise RuntimeError("批量预测需要google-cloud-storage，请先安装")
+        if not gcs_uri or not gcs_uri.startswith("gs://"):
+            raise RuntimeError(f"未配置有效的批量预测GCS路径: {gcs_uri}")
+
+        bucket_name, _, prefix = gcs_uri[len("gs://"):].partition("/")
+        run_prefix = "/".join(part for part in (prefix.strip("/"), time.strftime("%Y%m%d_%H%M%S")) if part)
+        bucket = storage.Client(project=self.gemini_project_id).bucket(bucket_name)
+
+        # 每行一个请求，key用于把输出映射回请求
+        lines = [
+            json.dumps({
+                "key": key,
+                "request": self._build_batch_request(message_list, temperature, max_tokens, thinking_budget, **kwargs),
+            }, ensure_ascii=False)
+            for key, message_list in requests.items()
+        ]
+        bucket.blob(f"{run_prefix}/input.jsonl").upload_from_string("\n".join(lines), content_type="application/jsonl")
+
+        job = self.gemini_client.batches.create(
+            model=self.gemini_model_name,
+            src=f"gs://{bucket_name}/{run_prefix}/input.jsonl",
+            config=types.CreateBatchJobConfig(
+                dest=f"gs://{bucket_name}/{run_prefix}/output",
+                display_name=f"{self.gemini_billing_name}-{run_prefix.replace('/', '-')}",
+            ),
+        )
+        self.logger.info(f"📦 Batch job submitted: {job.name}, requests: {len(lines)}")
+
+        deadline = time.time() + timeout
+        while job.state not in _BATCH_DONE_STATES:
+            if time.time() > deadline:
+                raise RuntimeError(f"批量预测任务超时: {job.name}")
+            time.sleep(poll_interval)
+            job = self.gemini_client.batches.get(name=job.name)
+            self.logger.info(f"⏳ Batch job state: {job.state}")
+
+        if job.state != "JOB_STATE_SUCCEEDED":
+            raise RuntimeError(f"批量预测任务失败: {job.name}, state: {job.state}, error: {job.error}")
+
+        results = {}
+        for blob in bucket.list_blobs(prefix=f"{run_prefix}/output"):
+            if not blob.name.endswith(".jsonl"):
+                continue
+            for line in blob.download_as_text().splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    parsed = self._parse_batch_response(record.get("response") or {})
+                    if parsed is not None:
+                        results[record.get("key")] = parsed
+
+        self.logger.info(f"✅ Batch job finished: {len(results)}/{len(lines)} responses")
+        return results
+
+    def _build_batch_request(self, message_list, temperature, max_tokens, thinking_budget, **kwargs):
+        """
+        构建批量预测输入文件中单条请求的JSON，参数与 _build_request 一致
+        """
+        contents, system_instruction = self._convert_messages_to_gemini_contents(message_list)
+
+        generation_config = {
+            "temperature": temperature if temperature is not None else self.gemini_temperature,
+            "maxOutputTokens": max_tokens if max_tokens is not None else self.gemini_max_tokens,
+            "thinkingConfig": {
+                "thinkingBudget": self._resolve_thinking_budget(thinking_budget)
+            },
+        }
+        if kwargs.get("response_mime_type"):
+            generation_config["responseMimeType"] = kwargs["response_mime_type"]
+        if kwargs.get("response_schema"):
+            generation_config["responseSchema"] = _to_openapi_schema(kwargs["response_schema"])
+
+        request = {
+            "contents": [content.model_dump(mode="json", exclude_none=True) for content in contents],
+            "generationConfig": generation_config,
+            "safetySettings": self.gemini_safety_settings,
+            "labels": kwargs.get("labels", {"billing_name": self.gemini_billing_name}),
+        }
+        if system_instruction:
+            request["systemInstruction"] = {
+                "parts": [part.model_dump(mode="json", exclude_none=True) for part in system_instruction]
+            }
+        return request
+
+    def _parse_batch_response(self, response):
+        """
+        解析批量预测输出中的单条响应
+
+        Returns:
+            (response, tokens_used, finish_reason) 元组，没有候选结果时返回None
+        """
+        candidates = response.get("candidates") or []
+        if not candidates:
+            return None
+
+        candidate = candidates[0]
+        text = "".join(
+            part.get("text", "")
+            for part in (candidate.get("content") or {}).get("parts", [])
+            if not part.get("thought")
+        )
+        usage = response.get("usageMetadata") or {}
+        tokens_used = sum(
+            usage.get(name, 0) or 0
+            for name in ("promptTokenCount", "candidatesTokenCount", "thoughtsTokenCount")
+        )
+
+        if candidate.get("finishReason") == "MAX_TOKENS":
+            return text, tokens_used, "length"
+        return (text, tokens_used, "stop") if text else ("", 0, "empty_response")
+
+    def _build_request(self, message_list, temperature, max_tokens, thinking_budget, response_schema=None, **kwargs):
+        """
+        构建Gemini请求内容和生成配置
+
+        Returns:
+            (contents, generate_content_config) 元组
+        """
+        # 转换消息格式
+        contents, system_instruction = self._convert_messages_to_gemini_contents(message_list)
+
+        # 使用传入的参数或配置文件中的默认值
+        request_temperature = temperature if temperature is not None else self.gemini_temperature
+        request_max_tokens = max_tokens if max_tokens is not None else self.gemini_max_tokens
+        if thinking_budget is None or thinking_budget == self.gemini_thinking_budget:
+            thinking_config = self._default_thinking_config
+        else:
+            thinking_config = types.ThinkingConfig(thinking_budget=self._resolve_thinking_budget(thinking_budget))
+
+        # 指定response_schema时输出必须是JSON
+        response_mime_type = kwargs.get("response_mime_type") or ("application/json" if response_schema else None)
+
+        # 设置默认labels
+        labels = kwargs.get("labels", self._default_labels)
+
+        self.logger.info(f"Calling Gemini API, model: {self.gemini_model_name}, message count: {len(contents)}")
+
+        # 配置生成参数
+        config_params = {
+            "temperature": request_temperature,
+            "max_output_tokens": request_max_tokens,
+            "safety_settings": self._safety_settings,
+            "thinking_config": thinking_config,
+            "labels": labels,
+        }
+
+        # 如果指定了response_mime_type，添加到配置中
+        if response_mime_type:
+            config_params["response_mime_type"] = response_mime_type
+            self.logger.info(f"Setting response_mime_type to: {response_mime_type}")
+
+        # 如果指定了response_schema，添加到配置中
+        if response_schema:
+            config_params["response_schema"] = response_schema
+            properties = response_schema.get("properties") if isinstance(response_schema, dict) else getattr(response_schema, "properties", None)
+            self.logger.info(f"Setting response_schema with {len(properties or {})} properties")
+
+        # 如果指定了cached_content，复用已缓存的静态prompt前缀
+        if kwargs.get("cached_content"):
+            config_params["cached_content"] = kwargs["cached_content"]
+
+        generate_content_config = types.GenerateContentConfig(**config_params)
+
+        # 如果有系统指令，添加到配置中
+        if system_instruction:
+            generate_content_config.system_instruction = system_instruction
+
+        return contents, generate_content_config
+
+    def _parse_response(self, response, response_time):
+        """
+        解析API响应，统计token使用情况
+
+        Returns:
+            (response, tokens_used, finish_reason) 元组
+        """
+        usage = response.usage_metadata
+        input_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        thoughts_tokens = getattr(usage, "thoughts_token_count", 0) or 0
+        cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+        total_tokens = input_tokens + output_tokens + thoughts_tokens
+
+        self.logger.info(f"Gemini API call successful, time taken: {response_time:.2f} seconds")
+        self.logger.info(
+            f"Token usage: input={input_tokens}, cached={cached_tokens}, output={output_tokens}, thoughts={thoughts_tokens}"
+        )
+
+        candidates = getattr(response, "candidates", None) or []
+        text = _candidate_text(candidates[0]) if candidates else ""
+        if candidates and candidates[0].finish_reason == types.FinishReason.MAX_TOKENS:
+            self.logger.warning(f"Gemini API output truncated by max_output_tokens")
+            return text, total_tokens, "length"
+
+        if text:
+            return text, total_tokens, "stop"
+        else:
+            self.logger.warning(f"Gemini API returned empty response")
+            return "", 0, "empty_response"
+
+    def _handle_call_error(self, e, timeout=None):
+        """
+        将调用异常转换为 (response, tokens_used, finish_reason) 结果
+
+        重试路径上(如429集中出现时)错误频繁，只在DEBUG级别附带堆栈，避免每次都格式化
+        """
+        exc_info = e if self.logger.isEnabledFor(logging.DEBUG) else None
+        if isinstance(e, google_exceptions.DeadlineExceeded):
+            self.logger.error(f"Gemini API request timed out after {timeout or self.gemini_timeout} seconds", exc_info=exc_info)
             return "", 0, "timeout"
-        except google_exceptions.PermissionDenied as e:
-            self.logger.error(f"Permission denied when calling Gemini API: {e}")
-            traceback.print_exc()
+        elif isinstance(e, google_exceptions.PermissionDenied):
+            self.logger.error(f"Permission denied when calling Gemini API: {e}", exc_info=exc_info)
             return "", 0, "permission_denied"
-        except google_exceptions.InvalidArgument as e:
-            self.logger.error(f"Invalid argument when calling Gemini API: {e}")
-            traceback.print_exc()
+        elif isinstance(e, google_exceptions.InvalidArgument):
+            self.logger.error(f"Invalid argument when calling Gemini API: {e}", exc_info=exc_info)
             return "", 0, "invalid_argument"
-        except google_exceptions.ResourceExhausted as e:
-            self.logger.error(f"Resource exhausted when calling Gemini API: {e}")
-            traceback.print_exc()
+        elif isinstance(e, google_exceptions.ResourceExhausted):
+            self.logger.error(f"Resource exhausted when calling Gemini API: {e}", exc_info=exc_info)
             return "", 0, "resource_exhausted"
-        except Exception as e:
-            self.logger.error(f"Unexpected error when calling Gemini API: {e}")
-            traceback.print_exc()
+        else:
+            self.logger.error(f"Unexpected error when calling Gemini API: {e}", exc_info=exc_info)
             return "", 0, "error"
     
+    def _retry_wait_time(self, attempt, error=None):
+        """
+        计算重试等待时间：优先使用服务端返回的Retry-After，否则指数退避 + 随机抖动
+        """
+        retry_after = _parse_retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, 60)  # 服务端建议最多等待60秒
+        return min(2 ** attempt + random.uniform(0, 1), 30)  # 最大等待30秒
+
     def _call_with_retry(self, contents, config, max_retries=3):
         """
         带重试机制的API调用
@@ -265,8 +815,7 @@ class GeminiLLM:
         for attempt in range(max_retries + 1):  # +1 因为包含初次尝试
             try:
                 if attempt > 0:
-                    # 指数退避 + 随机抖动
-                    wait_time = min(2 ** attempt + random.uniform(0, 1), 30)  # 最大等待30秒
+                    wait_time = self._retry_wait_time(attempt, last_exception)
                     self.logger.info(f"🔄 重试第 {attempt} 次，等待 {wait_time:.1f} 秒...")
                     time.sleep(wait_time)
                 
@@ -311,3 +860,56 @@ class GeminiLLM:
         
         # 不应该到达这里
         raise last_exception or Exception("重试机制异常")
+
+    async def _acall_with_retry(self, contents, config, max_retries=3):
+        """
+        带重试机制的异步API调用，重试策略与 _call_with_retry 一致
+
+        Args:
+            contents: Gemini内容
+            config: 生成配置
+            max_retries: 最大重试次数
+
+        Returns:
+            API响应对象
+
+        Raises:
+            Exception: 重试耗尽后仍然失败
+        """
+        last_exception = None
+
+        for attempt in range(max_retries + 1):  # +1 因为包含初次尝试
+            try:
+                if attempt > 0:
+                    wait_time = self._retry_wait_time(attempt, last_exception)
+                    self.logger.info(f"🔄 重试第 {attempt} 次，等待 {wait_time:.1f} 秒...")
+                    await asyncio.sleep(wait_time)
+
+                response = await self.gemini_client.aio.models.generate_content(
+                    model=self.gemini_model_name,
+                    contents=contents,
+                    config=config,
+                )
+
+                if attempt > 0:
+                    self.logger.info(f"✅ 重试成功！第 {attempt} 次尝试")
+
+                return response
+
+            except (google_exceptions.PermissionDenied,
+                    google_exceptions.InvalidArgument) as e:
+                # 不可重试的错误，直接抛出
+                self.logger.error(f"❌ 不可重试错误: {type(e).__name__}: {e}")
+                raise e
+
+            except Exception as e:
+                # 可重试错误和其他未知错误都进行重试
+                last_exception = e
+                self.logger.warning(f"⚠️ 调用失败 (第 {attempt + 1}/{max_retries + 1} 次): {type(e).__name__}: {e}")
+
+                if attempt == max_retries:
+                    self.logger.error(f"❌ 重试次数耗尽，最终失败")
+                    raise last_exception
+
+        # 不应该到达这里
+        raise last_exception or Exception("重试机制异常")
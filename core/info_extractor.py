@@ -3,44 +3,723 @@
 从ASR转录的文本中提取关键投资信息，包括宏观数据、个股分析、关键点位等
 """
 
+import re
 import sys
+import os
 import json
+import time
+import random
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 from pathlib import Path
 
-project_root = Path(__file__).parent.parent
-if str(project_root) not in sys.path:
-    sys.path.insert(0, str(project_root))
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(_PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PROJECT_ROOT))
+
+from core.rate_limiter import estimate_tokens
 
 # 设置日志
 logger = logging.getLogger(__name__)
 
 # 尝试导入gemini_llm
 try:
-    from core.gemini_llm import GeminiLLM, gemini_config
+    from core.gemini_llm import get_shared_llm
     GEMINI_AVAILABLE = True
 except ImportError as e:
     GEMINI_AVAILABLE = False
     logger.warning(f"Gemini LLM不可用，请检查依赖和配置: {e}")
 
+# 尝试导入json_repair，用于修复格式不完整的JSON响应
+try:
+    import json_repair
+    JSON_REPAIR_AVAILABLE = True
+except ImportError:
+    JSON_REPAIR_AVAILABLE = False
+
+# 语义缓存依赖numpy，不可用时只使用精确缓存
+try:
+    from core.semantic_cache import SemanticCache, NUMPY_AVAILABLE
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 尝试导入orjson，用于快速序列化提取结果
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# orjson.JSONDecodeError继承自json.JSONDecodeError，两种实现的异常处理一致
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """序列化为UTF-8编码的紧凑JSON字节串"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# 尝试导入fastjsonschema，用于本地校验LLM响应结构
+try:
+    import fastjsonschema
+    FASTJSONSCHEMA_AVAILABLE = True
+except ImportError:
+    FASTJSONSCHEMA_AVAILABLE = False
+
+# 尝试导入pyahocorasick，用于单次扫描匹配股票别名
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# schema变更时递增，使旧缓存失效(prompt模板内容已包含在缓存键中)
+SCHEMA_VERSION = "2"
+_DEFAULT_CACHE_DIR = _PROJECT_ROOT / "downloads" / ".extract_cache"
+_DEFAULT_SEMANTIC_CACHE_DIR = _PROJECT_ROOT / "downloads" / ".extract_semcache"
+# 语义缓存的嵌入只使用标题和转录开头部分
+_SEMANTIC_KEY_CHARS = 2000
+
+# 已知股票的别名 -> 美股代码，规则提取只识别这些名称
+_TICKER_ALIASES = {
+    "特斯拉": "TSLA", "TSLA": "TSLA",
+    "苹果": "AAPL", "AAPL": "AAPL",
+    "谷歌": "GOOGL", "GOOGL": "GOOGL", "GOOG": "GOOG",
+    "微软": "MSFT", "MSFT": "MSFT",
+    "亚马逊": "AMZN", "AMZN": "AMZN",
+    "英伟达": "NVDA", "NVDA": "NVDA",
+    "Meta": "META", "META": "META",
+    "博通": "AVGO", "AVGO": "AVGO",
+    "露露乐檬": "LULU", "LULU": "LULU",
+    "超威": "AMD", "AMD": "AMD",
+    "台积电": "TSM", "TSM": "TSM",
+    "奈飞": "NFLX", "NFLX": "NFLX",
+    "英特尔": "INTC", "INTC": "INTC",
+    "甲骨文": "ORCL", "ORCL": "ORCL",
+    "帕兰提尔": "PLTR", "PLTR": "PLTR",
+    "阿里巴巴": "BABA", "BABA": "BABA",
+    "伯克希尔": "BRK.B", "BRK.B": "BRK.B",
+    "摩根大通": "JPM", "JPM": "JPM",
+    "SPY": "SPY", "QQQ": "QQQ",
+}
+
+if AHOCORASICK_AVAILABLE:
+    _TICKER_AC = ahocorasick.Automaton()
+    for _alias, _ticker in _TICKER_ALIASES.items():
+        _TICKER_AC.add_word(_alias, (_alias, _ticker))
+    _TICKER_AC.make_automaton()
+else:
+    # 未安装pyahocorasick时使用正则多选分支，长别名优先
+    _TICKER_RE = re.compile('|'.join(
+        re.escape(alias) for alias in sorted(_TICKER_ALIASES, key=len, reverse=True)
+    ))
+
+_NUMBER_RE = re.compile(
+    r'\$\d+\.?\d*'            # 价格
+    r'|\b\d+\.?\d*(?:%|美元|亿)'  # 百分比、美元、亿
+    r'|\b\d{1,4}\.?\d*块'      # 中文价格描述
+)
+
+
+def _iter_ticker_matches(text: str):
+    """
+    在文本中查找已知股票别名，产出对应的股票代码
+    
+    英文别名要求前后不是ASCII字母或数字(避免匹配单词内部)，中文相邻不受影响
+    """
+    if AHOCORASICK_AVAILABLE:
+        matches = ((end - len(alias) + 1, end + 1, ticker) for end, (alias, ticker) in _TICKER_AC.iter(text))
+    else:
+        matches = ((m.start(), m.end(), _TICKER_ALIASES[m.group(0)]) for m in _TICKER_RE.finditer(text))
+    
+    for start, end, ticker in matches:
+        if start > 0 and _is_ascii_alnum(text[start - 1]) and _is_ascii_alnum(text[start]):
+            continue
+        if end < len(text) and _is_ascii_alnum(text[end]) and _is_ascii_alnum(text[end - 1]):
+            continue
+        yield ticker
+
+
+def _is_ascii_alnum(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+def _take_unique(values, limit: int) -> List[str]:
+    """按出现顺序去重，凑够limit个后立即停止扫描"""
+    seen = {}
+    for value in values:
+        seen.setdefault(value)
+        if len(seen) >= limit:
+            break
+    return list(seen)
+
+
+def _balance_truncated_json(text: str) -> Optional[str]:
+    """
+    补全被截断的JSON对象：回退到最后一个完整成员处，再按嵌套顺序补齐右括号
+    
+    用于未安装json_repair时挽救因输出token耗尽而截断的响应
+    
+    Args:
+        text: 原始响应文本
+        
+    Returns:
+        补全后的JSON文本，找不到可用的截断点时返回None
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    
+    stack = []
+    safe_end, safe_stack = None, None
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]':
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                return text[start:i + 1]
+            safe_end, safe_stack = i + 1, list(stack)
+        elif char == ',':
+            # 逗号之前的成员一定是完整的
+            safe_end, safe_stack = i, list(stack)
+    
+    if safe_end is None:
+        return None
+    return text[start:safe_end] + ''.join(reversed(safe_stack))
+
+def _split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    按句子边界把文本切分为估算token数不超过max_tokens的块
+    
+    没有标点的超长句子(ASR输出常见)按字符数硬切
+    
+    Args:
+        text: 待切分的文本
+        max_tokens: 每块的估算token上限
+        
+    Returns:
+        文本块列表
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        if not sentence:
+            continue
+        sentence_tokens = estimate_tokens(sentence)
+        if current and current_tokens + sentence_tokens > max_tokens:
+            chunks.append(''.join(current))
+            current, current_tokens = [], 0
+        if sentence_tokens > max_tokens:
+            step = max(1, len(sentence) * max_tokens // sentence_tokens)
+            pieces = [sentence[i:i + step] for i in range(0, len(sentence), step)]
+            chunks.extend(pieces[:-1])
+            sentence = pieces[-1]
+            sentence_tokens = estimate_tokens(sentence)
+        current.append(sentence)
+        current_tokens += sentence_tokens
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+
+def _merge_unique(items: List[Dict[str, Any]], key_field: str) -> List[Dict[str, Any]]:
+    """按key_field去重合并对象列表，保留首次出现的对象"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        merged.setdefault(str(item.get(key_field, '')).strip().lower(), item)
+    return list(merged.values())
+
+
+def _merge_stock_analysis(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按股票代码合并个股分析：合并要点，其余字段以首次出现的非空值为准"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        symbol = str(item.get("symbol", '')).strip().upper()
+        if symbol not in merged:
+            merged[symbol] = dict(item, key_points=list(item.get("key_points") or []))
+            continue
+        target = merged[symbol]
+        for point in item.get("key_points") or []:
+            if point not in target["key_points"]:
+                target["key_points"].append(point)
+        for field, value in item.items():
+            if value and not target.get(field):
+                target[field] = value
+    return list(merged.values())
+
+
+# 合并分块结果时数组字段的去重键
+_MERGE_KEY_FIELDS = {
+    "macroeconomic_data": "indicator",
+    "key_events": "event",
+    "investment_advice": "advice",
+    "risks_and_warnings": "risk",
+}
+
+# 流式提取时逐项产出的数组字段
+_STREAM_WATCH_KEYS = ["stock_analysis", "macroeconomic_data", "key_events", "investment_advice", "risks_and_warnings"]
+
+
+# 财经信息提取的JSON schema，模块加载时构建一次，所有实例共享(只读，请勿修改)
+_FINANCIAL_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": [
+        "summary",
+        "market_overview", 
+        "macroeconomic_data",
+        "stock_analysis",
+        "key_events",
+        "investment_advice",
+        "risks_and_warnings"
+    ],
+    "properties": {
+        "summary": {
+            "type": "string",
+            "description": "对整个财经分析内容的简明总结"
+        },
+        "market_overview": {
+            "type": "object",
+            "required": ["date", "major_indices", "market_sentiment"],
+            "properties": {
+                "date": {
+                    "type": "string",
+                    "description": "分析日期，格式YYYY-MM-DD"
+                },
+                "major_indices": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["name", "performance"],
+                        "properties": {
+                            "name": {
+                                "type": "string",
+                                "description": "指数名称，如S&P 500, 纳斯达克等"
+                            },
+                            "performance": {
+                                "type": "string",
+                                "description": "当日表现描述"
+                            },
+                            "current_level": {
+                                "type": "string",
+                                "description": "当前点位或价格"
+                            },
+                            "key_levels": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "关键技术位"
+                            },
+                            "analysis": {
+                                "type": "string",
+                                "description": "技术分析和走势解读"
+                            }
+                        }
+                    },
+                    "description": "主要市场指数分析"
+                },
+                "market_sentiment": {
+                    "type": "string",
+                    "description": "整体市场情绪和驱动因素"
+                }
+            }
+        },
+        "macroeconomic_data": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["indicator", "impact"],
+                "properties": {
+                    "indicator": {
+                        "type": "string",
+                        "description": "宏观经济指标名称"
+                    },
+                    "actual_value": {
+                        "type": "string",
+                        "description": "实际公布值"
+                    },
+                    "expected_value": {
+                        "type": "string",
+                        "description": "市场预期值"
+                    },
+                    "previous_value": {
+                        "type": "string",
+                        "description": "前值"
+                    },
+                    "impact": {
+                        "type": "string",
+                        "description": "对市场的影响分析"
+                    },
+                    "interpretation": {
+                        "type": "string",
+                        "description": "数据解读和意义"
+                    }
+                }
+            },
+            "description": "宏观经济数据和分析"
+        },
+        "stock_analysis": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["symbol", "key_points"],
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "股票代码或ETF代码"
+                    },
+                    "company_name": {
+                        "type": "string",
+                        "description": "公司或产品全名"
+                    },
+                    "current_price": {
+                        "type": "string",
+                        "description": "当前价格或价格区间"
+                    },
+                    "price_change": {
+                        "type": "string",
+                        "description": "价格变化"
+                    },
+                    "key_points": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "关键分析要点"
+                    },
+                    "price_levels": {
+                        "type": "object",
+                        "properties": {
+                            "support": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "支撑位"
+                            },
+                            "resistance": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "阻力位"
+                            },
+                            "target": {
+                                "type": "array", 
+                                "items": {"type": "string"},
+                                "description": "目标位"
+                            }
+                        }
+                    },
+                    "recommendation": {
+                        "type": "string",
+                        "enum": ["买入", "持有", "卖出", "观望"],
+                        "description": "投资建议"
+                    },
+                    "risk_reward_ratio": {
+                        "type": "string",
+                        "description": "风险收益比"
+                    },
+                    "analyst_notes": {
+                        "type": "string",
+                        "description": "分析师备注"
+                    }
+                }
+            },
+            "description": "个股分析"
+        },
+        "key_events": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["event", "impact"],
+                "properties": {
+                    "event": {
+                        "type": "string",
+                        "description": "关键事件描述"
+                    },
+                    "date": {
+                        "type": "string",
+                        "description": "事件日期"
+                    },
+                    "impact": {
+                        "type": "string",
+                        "description": "对市场的影响"
+                    },
+                    "category": {
+                        "type": "string",
+                        "enum": ["财报", "政策", "经济数据", "企业行为", "其他"],
+                        "description": "事件类别"
+                    }
+                }
+            },
+            "description": "影响市场的关键事件"
+        },
+        "investment_advice": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["advice", "timeframe"],
+                "properties": {
+                    "advice": {
+                        "type": "string",
+                        "description": "具体投资建议"
+                    },
+                    "timeframe": {
+                        "type": "string",
+                        "enum": ["短期", "中期", "长期"],
+                        "description": "建议的时间框架"
+                    },
+                    "rationale": {
+                        "type": "string",
+                        "description": "建议的理由"
+                    },
+                    "target_audience": {
+                        "type": "string",
+                        "description": "目标投资者类型"
+                    }
+                }
+            },
+            "description": "投资建议"
+        },
+        "risks_and_warnings": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["risk", "severity"],
+                "properties": {
+                    "risk": {
+                        "type": "string",
+                        "description": "风险描述"
+                    },
+                    "severity": {
+                        "type": "string",
+                        "enum": ["低", "中", "高"],
+                        "description": "风险严重程度"
+                    },
+                    "probability": {
+                        "type": "string",
+                        "enum": ["低", "中", "高"],
+                        "description": "风险发生概率"
+                    },
+                    "mitigation": {
+                        "type": "string",
+                        "description": "风险缓解措施"
+                    }
+                }
+            },
+            "description": "风险提示和警告"
+        }
+    }
+}
+
+# 预编译的schema校验器，模块加载时生成一次
+_SCHEMA_VALIDATOR = fastjsonschema.compile(_FINANCIAL_SCHEMA) if FASTJSONSCHEMA_AVAILABLE else None
+
+
+def _strip_schema_descriptions(node: Any, in_properties: bool = False) -> Any:
+    """
+    递归删除schema中的description字段，用于生成发送给模型的精简schema
+    
+    Args:
+        node: schema节点
+        in_properties: 当前节点是否为properties映射(其键为字段名，需全部保留)
+        
+    Returns:
+        不含description的schema副本
+    """
+    if isinstance(node, list):
+        return [_strip_schema_descriptions(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    return {
+        key: _strip_schema_descriptions(value, in_properties=(key == "properties" and not in_properties))
+        for key, value in node.items()
+        if in_properties or key != "description"
+    }
+
+
+# 发送给模型的schema：去掉description以减少每次请求的输入token，字段说明保留在_FINANCIAL_SCHEMA中
+_FINANCIAL_SCHEMA_WIRE = _strip_schema_descriptions(_FINANCIAL_SCHEMA)
+
+# 显式上下文缓存的有效期，到期前提前重建以免请求引用已过期的缓存
+_CONTEXT_CACHE_TTL = 3600
+_CONTEXT_CACHE_MARGIN = 60
+
+# 转录文本低于该估算token数时不调用LLM
+_MIN_LLM_INPUT_TOKENS = 200
+
+# 转录文本输入token上限，超出时分块提取；单次调用的路径(流式、批量预测)保留开头70%和结尾30%
+_MAX_INPUT_TOKENS = 60000
+_TRUNCATE_HEAD_RATIO = 0.7
+_TRUNCATION_MARKER = "\n...[中间部分已省略]...\n"
+
+# 超过输入上限的转录按句子边界切分为若干块并发提取(map)，再合并各块结果(reduce)
+_MAP_CHUNK_TOKENS = 20000
+# 单条转录分块提取时同时进行的LLM调用数上限(批量提取时改用批量的并发名额)
+_MAP_CONCURRENCY = 4
+_REDUCE_SCHEMA = {
+    "type": "object",
+    "required": ["summary", "market_sentiment"],
+    "properties": {
+        "summary": {"type": "string"},
+        "market_sentiment": {"type": "string"},
+    },
+}
+_REDUCE_CALL_PARAMS = {"temperature": 0.0, "max_tokens": 2000, "thinking_budget": 0, "response_schema": _REDUCE_SCHEMA}
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[\u3002\uff01\uff1f!?\n])|(?<=\.\s)')
+
+# 输出/思考token上限：初始值较小，输出被截断时逐次翻倍，直到上限
+# 受schema约束的抽取任务几乎不需要思考，思考token同样计费且增加延迟
+_MAX_OUTPUT_TOKENS = 4000
+_THINKING_BUDGET = 512
+_MAX_OUTPUT_TOKENS_CAP = 16000
+_THINKING_BUDGET_CAP = 8000
+
+_PROMPT_FILE = _PROJECT_ROOT / "prompts" / "financial_extraction_prompt.txt"
+
+
+# 已读取的prompt模板及其修改时间，文件被修改后下一次调用时重新读取
+_prompt_template_cache: Dict[str, Any] = {"mtime": None, "template": None}
+
+
+def _load_prompt_template() -> str:
+    """
+    读取prompt模板，只在文件修改时间变化时重新读取磁盘
+    
+    Returns:
+        prompt模板文本
+    """
+    try:
+        mtime = _PROMPT_FILE.stat().st_mtime_ns
+        if mtime != _prompt_template_cache["mtime"]:
+            template = _PROMPT_FILE.read_text(encoding='utf-8')
+            _prompt_template_cache.update(mtime=mtime, template=template)
+            logger.info(f"✅ 使用外部prompt模板: {_PROMPT_FILE}")
+    except Exception as e:
+        raise RuntimeError(f"⚠️ 读取prompt模板失败, prompt_file: {_PROMPT_FILE}, error: {e}")
+    return _prompt_template_cache["template"]
+
+
+@functools.lru_cache(maxsize=4)
+def _template_version(prompt_template: str) -> str:
+    payload = prompt_template.encode('utf-8') + SCHEMA_VERSION.encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def _prompt_version() -> str:
+    """prompt模板和schema版本的摘要，记录在缓存条目中用于识别过期结果"""
+    return _template_version(_load_prompt_template())
+
+
+class _InvalidResponseError(Exception):
+    """LLM返回了内容但无法解析或不符合schema，保留原始响应用于反馈重试"""
+    
+    def __init__(self, message: str, response: str):
+        super().__init__(message)
+        self.response = response
+
+
+class _JsonStreamWatcher:
+    """
+    增量扫描流式到达的JSON文本
+    
+    当被关注的顶层数组字段(如stock_analysis)中的某个对象闭合时立即解析并产出，
+    无需等待整个响应生成完毕
+    """
+    
+    def __init__(self, watch_keys: List[str]):
+        self.watch_keys = set(watch_keys)
+        self.text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key = None
+        self._array_key = None
+        self._item_start = None
+    
+    def feed(self, chunk: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        追加文本片段
+        
+        Returns:
+            本次新完成的 (字段名, 对象) 列表
+        """
+        self.text += chunk
+        completed = []
+        text = self.text
+        
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_key = text[self._string_start + 1:i]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in '{[':
+                if c == '[' and len(self._stack) == 1:
+                    self._array_key = self._last_key
+                elif c == '{' and self._stack == ['{', '['] and self._array_key in self.watch_keys:
+                    self._item_start = i
+                self._stack.append(c)
+            elif c in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if c == '}' and self._stack == ['{', '['] and self._item_start is not None:
+                    try:
+                        completed.append((self._array_key, _json_loads(text[self._item_start:i + 1])))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+        
+        self._pos = len(text)
+        return completed
+
 
 class FinancialInfoExtractor:
     """财经信息提取器类"""
     
-    def __init__(self, use_gemini: bool = True):
+    def __init__(self, use_gemini: bool = True, use_cache: bool = True, cache_dir: Optional[str] = None,
+                 semantic_cache_threshold: Optional[float] = None,
+                 semantic_cache_ttl: Optional[float] = None):
         """
         初始化信息提取器
         
         Args:
             use_gemini: 是否使用Gemini LLM进行提取
+            use_cache: 是否启用提取结果的磁盘缓存
+            cache_dir: 缓存目录，默认 downloads/.extract_cache
+            semantic_cache_threshold: 语义缓存的余弦相似度阈值(如0.92)，为None时不启用。
+                相似但不同的视频会直接复用已有结果，仅在可接受这种近似时开启
+            semantic_cache_ttl: 语义缓存条目的有效期(秒)，为None时永不过期
         """
         logger.info(f"🔧 初始化信息提取器, use_gemini={use_gemini}, GEMINI_AVAILABLE={GEMINI_AVAILABLE}")
         
         self.use_gemini = use_gemini and GEMINI_AVAILABLE
         
         # 定义财经信息提取的JSON schema
-        self.response_schema = self._create_financial_schema()
+        self.response_schema = _FINANCIAL_SCHEMA_WIRE
         self.llm = None
         
         if not GEMINI_AVAILABLE:
@@ -50,13 +729,28 @@ class FinancialInfoExtractor:
         else:
             try:
                 logger.info("🚀 尝试初始化Gemini LLM...")
-                self.llm = GeminiLLM(gemini_config)
+                self.llm = get_shared_llm()
                 logger.info("✅ Gemini LLM初始化成功")
             except Exception as e:
-                logger.error(f"❌ Gemini LLM初始化失败: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception(f"❌ Gemini LLM初始化失败: {e}")
                 self.use_gemini = False
+        
+        self.cache_dir = (Path(cache_dir) if cache_dir else _DEFAULT_CACHE_DIR) if use_cache else None
+        
+        self.semantic_cache = None
+        if semantic_cache_threshold is not None and use_cache and self.use_gemini:
+            if NUMPY_AVAILABLE:
+                self.semantic_cache = SemanticCache(
+                    str(_DEFAULT_SEMANTIC_CACHE_DIR), semantic_cache_threshold, semantic_cache_ttl
+                )
+            else:
+                logger.warning("⚠️ 语义缓存需要numpy，已跳过")
+        
+        # Gemini显式上下文缓存(静态prompt前缀)，创建失败后不再重试
+        self._cached_content_name = None
+        self._cached_content_version = None
+        self._cached_content_expires_at = 0.0
+        self._context_cache_disabled = False
     
     def extract_key_info(self, transcription_text: str, video_title: str = "") -> Dict[str, Any]:
         """
@@ -69,11 +763,184 @@ class FinancialInfoExtractor:
         Returns:
             包含提取信息的字典
         """
-        if not self.use_gemini:
+        if not self._should_use_llm(transcription_text):
             return self._extract_without_llm(transcription_text, video_title)
         
-        # 使用重试机制进行提取
-        return self._extract_with_retry(transcription_text, video_title, max_attempts=3)
+        cache_key = self._cache_key(transcription_text, video_title)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        embedding = self._semantic_embedding(transcription_text, video_title)
+        if embedding is not None:
+            similar = self.semantic_cache.lookup(embedding)
+            if similar is not None:
+                similar["extraction_method"] = "gemini_llm_semantic_cache"
+                return similar
+        
+        # 使用重试机制进行提取，超长文本分块并发提取后合并
+        if estimate_tokens(transcription_text) > _MAX_INPUT_TOKENS:
+            result = self._extract_map_reduce(transcription_text, video_title)
+        else:
+            result = self._extract_with_retry(transcription_text, video_title, max_attempts=3)
+        self._cache_set(cache_key, result)
+        if embedding is not None and result.get("extraction_method") == "gemini_llm":
+            self.semantic_cache.add(embedding, result)
+        return result
+    
+    async def extract_key_info_batch(self, items: List[Tuple[str, str]],
+                                     concurrency: int = 8,
+                                     checkpoint_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        并发提取多个转录文本的关键财经信息
+        
+        Args:
+            items: (转录文本, 视频标题) 列表
+            concurrency: 最大并发请求数
+            checkpoint_path: 可选的JSONL检查点文件，每完成一条即追加一行
+            
+        Returns:
+            与items顺序一致的提取信息列表
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _extract_one(index: int, transcription_text: str, video_title: str) -> Dict[str, Any]:
+            # 并发名额按LLM调用占用：超长转录的每个分块各占一个，而不是整条转录占一个再额外并发
+            if self._should_use_llm(transcription_text):
+                cache_key = self._cache_key(transcription_text, video_title)
+                result = self._cache_get(cache_key)
+                if result is None:
+                    result = await self._aextract(transcription_text, video_title, semaphore)
+                    self._cache_set(cache_key, result)
+            else:
+                result = self._extract_without_llm(transcription_text, video_title)
+            
+            if checkpoint_path:
+                self._append_checkpoint(checkpoint_path, index, video_title, result)
+            return result
+        
+        logger.info(f"🚀 批量提取 {len(items)} 条转录, 并发数: {concurrency}")
+        return await asyncio.gather(*[
+            _extract_one(index, transcription_text, video_title)
+            for index, (transcription_text, video_title) in enumerate(items)
+        ])
+    
+    def extract_key_info_batch_job(self, items: List[Tuple[str, str]],
+                                   poll_interval: int = 30,
+                                   concurrency: int = 8) -> List[Dict[str, Any]]:
+        """
+        通过Vertex AI批量预测提取多个转录文本的关键财经信息
+        
+        价格约为在线调用的一半，但需要几分钟到数小时才能完成，适合离线批处理。
+        缓存命中的条目不会提交；批量任务失败或个别结果无效时，改用并发在线提取。
+        
+        Args:
+            items: (转录文本, 视频标题) 列表
+            poll_interval: 轮询任务状态的间隔（秒）
+            concurrency: 改用在线提取时的最大并发线程数
+            
+        Returns:
+            与items顺序一致的提取信息列表
+        """
+        if not self.use_gemini:
+            return [self._extract_without_llm(text, title) for text, title in items]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        requests = {}
+        for index, (transcription_text, video_title) in enumerate(items):
+            if not self._should_use_llm(transcription_text):
+                results[index] = self._extract_without_llm(transcription_text, video_title)
+                continue
+            results[index] = self._cache_get(self._cache_key(transcription_text, video_title))
+            if results[index] is None:
+                requests[str(index)], _ = self._build_messages(transcription_text, video_title, use_context_cache=False)
+        
+        if requests:
+            logger.info(f"📦 提交批量预测任务: {len(requests)} 条")
+            try:
+                responses = self.llm.batch_generate(requests, poll_interval=poll_interval, **self._llm_call_params())
+            except Exception as e:
+                logger.warning(f"⚠️ 批量预测失败，改用在线并发提取: {e}")
+                responses = {}
+            
+            for key, (response, tokens_used, finish_reason) in responses.items():
+                index = int(key)
+                try:
+                    if finish_reason == "length":
+                        raise Exception("输出达到token上限被截断")
+                    results[index] = self._handle_llm_response(response, tokens_used, finish_reason, 0)
+                    self._cache_set(self._cache_key(*items[index]), results[index])
+                except Exception as e:
+                    logger.warning(f"⚠️ 第 {index + 1} 条批量预测结果无效: {e}")
+        
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            logger.info(f"🔄 {len(missing)} 条未获得批量结果，改用在线提取")
+            # 同步方法中不能用asyncio.run驱动异步批量提取(共享的aio客户端绑定在其他事件循环上)，改用线程池
+            with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(missing)))) as executor:
+                retried = list(executor.map(lambda index: self.extract_key_info(*items[index]), missing))
+            for index, result in zip(missing, retried):
+                results[index] = result
+        
+        return results
+    
+    async def extract_key_info_stream(self, transcription_text: str,
+                                      video_title: str = "") -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式提取关键财经信息
+        
+        每当stock_analysis、macroeconomic_data等数组中的一个对象生成完毕，
+        就产出一次当前已完成部分的快照(带 "partial": True)；最后产出完整结果。
+        流式调用失败时回退到带重试的普通提取。
+        
+        Args:
+            transcription_text: ASR转录的文本
+            video_title: 视频标题
+            
+        Yields:
+            部分结果快照，最后一个为完整的提取信息字典
+        """
+        if not self._should_use_llm(transcription_text):
+            yield self._extract_without_llm(transcription_text, video_title)
+            return
+        
+        watcher = _JsonStreamWatcher(_STREAM_WATCH_KEYS)
+        partial: Dict[str, List[Dict[str, Any]]] = {}
+        tokens_used = 0
+        finish_reason = None
+        
+        try:
+            logger.info("🤖 开始使用Gemini流式提取关键信息...")
+            messages, cache_params = self._build_messages(transcription_text, video_title)
+            async for text_chunk, tokens_used, finish_reason in self.llm.astream(
+                message_list=messages, **self._llm_call_params(), **cache_params
+            ):
+                for field, item in watcher.feed(text_chunk):
+                    partial.setdefault(field, []).append(item)
+                    yield {"partial": True, **{key: list(items) for key, items in partial.items()}}
+            
+            # 截断的输出交给带重试的提取，由其提高token上限重新请求
+            if finish_reason == "length":
+                raise Exception("输出达到token上限被截断")
+            yield self._handle_llm_response(watcher.text, tokens_used, finish_reason or "stop", 0)
+            
+        except Exception as e:
+            logger.warning(f"⚠️ 流式提取失败，改用普通提取: {e}")
+            yield await self._aextract_with_retry(transcription_text, video_title, max_attempts=3)
+    
+    def _should_use_llm(self, transcription_text: str) -> bool:
+        """
+        判断是否值得调用LLM：Gemini可用，且转录文本不是过短的片段
+        
+        过短的文本(如下载失败的残片、仅有片头音乐的转录)提取不出有效信息，直接走规则提取
+        """
+        if not self.use_gemini:
+            return False
+        estimated_tokens = estimate_tokens(transcription_text)
+        if estimated_tokens < _MIN_LLM_INPUT_TOKENS:
+            logger.info(f"ℹ️ 转录文本过短 (约{estimated_tokens} tokens)，跳过LLM使用规则提取")
+            return False
+        return True
     
     def _extract_with_retry(self, transcription_text: str, video_title: str, max_attempts: int = 3) -> Dict[str, Any]:
         """
@@ -88,63 +955,418 @@ class FinancialInfoExtractor:
             提取的信息字典
         """
         last_error = None
+        token_scale = 1
+        feedback: List[Dict[str, str]] = []
         
         for attempt in range(max_attempts):
             try:
                 logger.info(f"🤖 开始使用Gemini提取关键信息... (第 {attempt + 1}/{max_attempts} 次)")
                 
-                # 构建提取prompt
-                prompt = self._build_extraction_prompt(transcription_text, video_title)
-                
-                # 调用LLM
-                messages = [{"role": "user", "content": prompt}]
-                
+                messages, cache_params = self._build_messages(transcription_text, video_title)
                 response, tokens_used, finish_reason = self.llm.call(
-                    message_list=messages,
-                    temperature=0.1,
-                    max_tokens=8000,
-                    thinking_budget=8000,
-                    response_mime_type="application/json",
-                    response_schema=self.response_schema
+                    message_list=messages + feedback, **self._llm_call_params(token_scale), **cache_params
                 )
+                if finish_reason == "length":
+                    token_scale *= 2
+                    raise Exception("输出达到token上限被截断，下次尝试提高上限")
+                return self._handle_llm_response(response, tokens_used, finish_reason, attempt)
+                    
+            except Exception as e:
+                last_error = e
+                logger.warning(f"⚠️ 第 {attempt + 1} 次提取失败: {e}")
+                # 输出格式有误时把错误反馈给模型，让其在下一次尝试中修正
+                feedback = self._feedback_messages(e) if isinstance(e, _InvalidResponseError) else []
                 
-                logger.info(f"💰 LLM调用完成，使用tokens: {tokens_used}")
-                
-                if finish_reason != "stop":
-                    logger.warning(f"⚠️ LLM调用未正常结束: {finish_reason}")
-                    # 如果不是正常结束，但有响应内容，仍然尝试解析
-                    if not response.strip():
-                        raise Exception(f"LLM调用未正常结束且响应为空: {finish_reason}")
+                if attempt < max_attempts - 1:
+                    wait_time = self._backoff_time(attempt)
+                    logger.info(f"🔄 等待 {wait_time:.1f} 秒后重试...")
+                    time.sleep(wait_time)
+        
+        return self._fallback_after_failure(transcription_text, video_title, last_error)
+    
+    async def _aextract_with_retry(self, transcription_text: str, video_title: str, max_attempts: int = 3) -> Dict[str, Any]:
+        """
+        带重试的异步信息提取，逻辑与 _extract_with_retry 一致
+        """
+        last_error = None
+        token_scale = 1
+        feedback: List[Dict[str, str]] = []
+        
+        for attempt in range(max_attempts):
+            try:
+                logger.info(f"🤖 开始使用Gemini提取关键信息... (第 {attempt + 1}/{max_attempts} 次)")
                 
-                # 解析JSON响应 - 多次尝试
-                extracted_info = self._parse_json_response(response, attempt + 1)
-                if extracted_info:
-                    extracted_info["extraction_method"] = "gemini_llm"
-                    extracted_info["tokens_used"] = tokens_used
-                    extracted_info["attempts_used"] = attempt + 1
-                    
-                    logger.info(f"✅ 信息提取成功 (第 {attempt + 1} 次尝试)")
-                    return extracted_info
-                else:
-                    raise Exception("JSON解析失败")
+                messages, cache_params = self._build_messages(transcription_text, video_title)
+                response, tokens_used, finish_reason = await self.llm.acall(
+                    message_list=messages + feedback, **self._llm_call_params(token_scale), **cache_params
+                )
+                if finish_reason == "length":
+                    token_scale *= 2
+                    raise Exception("输出达到token上限被截断，下次尝试提高上限")
+                return self._handle_llm_response(response, tokens_used, finish_reason, attempt)
                     
             except Exception as e:
                 last_error = e
                 logger.warning(f"⚠️ 第 {attempt + 1} 次提取失败: {e}")
+                # 输出格式有误时把错误反馈给模型，让其在下一次尝试中修正
+                feedback = self._feedback_messages(e) if isinstance(e, _InvalidResponseError) else []
                 
                 if attempt < max_attempts - 1:
-                    import time
-                    wait_time = 2 ** attempt  # 指数退避: 1, 2, 4秒
-                    logger.info(f"🔄 等待 {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
+                    wait_time = self._backoff_time(attempt)
+                    logger.info(f"🔄 等待 {wait_time:.1f} 秒后重试...")
+                    await asyncio.sleep(wait_time)
+        
+        return self._fallback_after_failure(transcription_text, video_title, last_error)
+    
+    async def _aextract(self, transcription_text: str, video_title: str,
+                        semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """按文本长度选择单次提取，或超出输入上限时的分块map-reduce提取，每次LLM调用占用一个并发名额"""
+        if estimate_tokens(transcription_text) > _MAX_INPUT_TOKENS:
+            return await self._aextract_map_reduce(transcription_text, video_title, semaphore)
+        async with semaphore:
+            return await self._aextract_with_retry(transcription_text, video_title, max_attempts=3)
+    
+    def _extract_map_reduce(self, transcription_text: str, video_title: str) -> Dict[str, Any]:
+        """
+        超长转录的同步分块提取，逻辑与 _aextract_map_reduce 一致
+        
+        共享LLM实例的aio客户端绑定在首次使用它的事件循环上，同步路径每次asyncio.run新建循环会导致
+        跨循环或循环已关闭的错误，因此这里用线程池并发执行同步调用
+        """
+        chunks = _split_text(transcription_text, _MAP_CHUNK_TOKENS)
+        logger.info(f"✂️ 转录文本过长，按句子切分为 {len(chunks)} 块并发提取")
+        
+        with ThreadPoolExecutor(max_workers=min(len(chunks), _MAP_CONCURRENCY)) as executor:
+            partials = list(executor.map(
+                lambda chunk: self._extract_with_retry(chunk, video_title, max_attempts=3), chunks
+            ))
+        partials = [partial for partial in partials if partial.get("extraction_method") == "gemini_llm"]
+        if not partials:
+            return self._extract_without_llm(transcription_text, video_title)
+        
+        merged = self._merge_partial_results(partials)
+        if len(partials) > 1:
+            self._reduce_summary(merged, partials, video_title)
+        logger.info(f"✅ 分块提取完成: {len(partials)}/{len(chunks)} 块成功")
+        return merged
+    
+    async def _aextract_map_reduce(self, transcription_text: str, video_title: str,
+                                   semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+        """
+        超长转录的分块提取：按句子边界切块后并发提取(map)，合并列表字段，再用一次短调用合并摘要(reduce)
+        
+        避免截断丢失中间内容，单块输入较小也降低了超时和输出截断的概率
+        
+        Args:
+            transcription_text: 转录文本
+            video_title: 视频标题
+            semaphore: 调用方的并发名额，每个分块调用占用一个；为None时最多并发 _MAP_CONCURRENCY 块
+            
+        Returns:
+            合并后的提取信息字典，所有分块都失败时为规则提取结果
+        """
+        chunks = _split_text(transcription_text, _MAP_CHUNK_TOKENS)
+        logger.info(f"✂️ 转录文本过长，按句子切分为 {len(chunks)} 块并发提取")
         
+        semaphore = semaphore or asyncio.Semaphore(_MAP_CONCURRENCY)
+        
+        async def _extract_chunk(chunk: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._aextract_with_retry(chunk, video_title, max_attempts=3)
+        
+        partials = await asyncio.gather(*[_extract_chunk(chunk) for chunk in chunks])
+        partials = [partial for partial in partials if partial.get("extraction_method") == "gemini_llm"]
+        if not partials:
+            return self._extract_without_llm(transcription_text, video_title)
+        
+        merged = self._merge_partial_results(partials)
+        if len(partials) > 1:
+            async with semaphore:
+                await self._areduce_summary(merged, partials, video_title)
+        logger.info(f"✅ 分块提取完成: {len(partials)}/{len(chunks)} 块成功")
+        return merged
+    
+    def _merge_partial_results(self, partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """合并各分块的提取结果：列表字段拼接去重，摘要先按顺序拼接"""
+        market_overview = next((partial["market_overview"] for partial in partials if partial.get("market_overview")), {})
+        merged = {
+            "summary": "\n".join(partial["summary"] for partial in partials if partial.get("summary")),
+            "market_overview": dict(market_overview),
+            "stock_analysis": _merge_stock_analysis(
+                [item for partial in partials for item in partial.get("stock_analysis") or []]
+            ),
+        }
+        for field, key_field in _MERGE_KEY_FIELDS.items():
+            merged[field] = _merge_unique([item for partial in partials for item in partial.get(field) or []], key_field)
+        
+        merged["extraction_method"] = "gemini_llm"
+        merged["tokens_used"] = sum(partial.get("tokens_used", 0) for partial in partials)
+        merged["attempts_used"] = max(partial.get("attempts_used", 1) for partial in partials)
+        merged["chunks"] = len(partials)
+        return merged
+    
+    def _reduce_messages(self, partials: List[Dict[str, Any]], video_title: str) -> List[Dict[str, str]]:
+        """构建reduce步骤的消息：各分块的摘要和市场情绪按顺序列出"""
+        sections = "\n\n".join(
+            f"[第{index + 1}部分]\n摘要: {partial.get('summary', '')}\n"
+            f"市场情绪: {(partial.get('market_overview') or {}).get('market_sentiment', '')}"
+            for index, partial in enumerate(partials)
+        )
+        prompt = (
+            f"以下是财经视频《{video_title}》按顺序分段提取的摘要和市场情绪。"
+            f"请合并为对整个视频的一段摘要(summary)和一个整体市场情绪判断(market_sentiment)，只返回JSON。\n\n{sections}"
+        )
+        return [{"role": "user", "content": prompt}]
+    
+    def _apply_reduced(self, merged: Dict[str, Any], response: str, tokens_used: int) -> None:
+        """把reduce步骤返回的整体摘要和市场情绪写回合并结果"""
+        reduced = self._parse_json_response(response, 1) or {}
+        if reduced.get("summary"):
+            merged["summary"] = reduced["summary"]
+        if reduced.get("market_sentiment"):
+            merged["market_overview"]["market_sentiment"] = reduced["market_sentiment"]
+        merged["tokens_used"] += tokens_used
+    
+    def _reduce_summary(self, merged: Dict[str, Any], partials: List[Dict[str, Any]], video_title: str) -> None:
+        """reduce步骤的同步版本，逻辑与 _areduce_summary 一致"""
+        try:
+            response, tokens_used, _ = self.llm.call(
+                message_list=self._reduce_messages(partials, video_title), **_REDUCE_CALL_PARAMS
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ 合并分块摘要失败，保留拼接结果: {e}")
+            return
+        self._apply_reduced(merged, response, tokens_used)
+    
+    async def _areduce_summary(self, merged: Dict[str, Any], partials: List[Dict[str, Any]], video_title: str) -> None:
+        """reduce步骤：让模型把各分块的摘要和市场情绪合并为整体结论，失败时保留拼接的结果"""
+        try:
+            response, tokens_used, _ = await self.llm.acall(
+                message_list=self._reduce_messages(partials, video_title), **_REDUCE_CALL_PARAMS
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ 合并分块摘要失败，保留拼接结果: {e}")
+            return
+        self._apply_reduced(merged, response, tokens_used)
+    
+    def _feedback_messages(self, error: _InvalidResponseError) -> List[Dict[str, str]]:
+        """把上一次的无效输出和错误原因作为后续对话，要求模型重新输出有效JSON"""
+        return [
+            {"role": "assistant", "content": error.response},
+            {"role": "user", "content": f"上一次输出有误: {error}。请只返回符合schema的有效JSON，不要包含任何其他文字。"},
+        ]
+    
+    def _backoff_time(self, attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+        """指数退避 + 全抖动(full jitter)，避免批量任务同时失败后在同一时刻集中重试"""
+        return random.uniform(0, min(cap, base * 2 ** attempt))
+    
+    def _build_messages(self, transcription_text: str, video_title: str,
+                        use_context_cache: bool = True) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        构建LLM调用的消息列表
+        
+        静态prompt前缀已创建上下文缓存时，消息只包含标题和转录文本等动态部分
+        
+        Returns:
+            (消息列表, 额外调用参数) 元组，使用缓存时额外参数包含cached_content
+        """
+        transcription_text = self._truncate_for_context(transcription_text)
+        static_prefix, dynamic_suffix = self._build_extraction_prompt(transcription_text, video_title)
+        cached_content = self._get_cached_content(static_prefix) if use_context_cache else None
+        if cached_content:
+            return [{"role": "user", "content": dynamic_suffix}], {"cached_content": cached_content}
+        return [{"role": "user", "content": static_prefix + dynamic_suffix}], {}
+    
+    def _truncate_for_context(self, text: str, max_input_tokens: int = _MAX_INPUT_TOKENS) -> str:
+        """
+        超长转录文本截断到输入token上限内，保留开头和结尾(开场概述与总结通常信息最密集)
+        
+        Args:
+            text: 转录文本
+            max_input_tokens: 输入token上限
+            
+        Returns:
+            不超过上限的文本
+        """
+        estimated_tokens = estimate_tokens(text)
+        if estimated_tokens <= max_input_tokens:
+            return text
+        
+        keep_chars = int(len(text) * max_input_tokens / estimated_tokens)
+        head_chars = int(keep_chars * _TRUNCATE_HEAD_RATIO)
+        tail_chars = keep_chars - head_chars
+        logger.warning(f"⚠️ 转录文本过长(约 {estimated_tokens} tokens)，截断为约 {max_input_tokens} tokens")
+        return text[:head_chars] + _TRUNCATION_MARKER + text[len(text) - tail_chars:]
+    
+    def _get_cached_content(self, static_prefix: str) -> Optional[str]:
+        """
+        获取静态prompt前缀的上下文缓存名称，模板变化或即将过期时重建
+        
+        Returns:
+            缓存资源名称，不可用时返回None
+        """
+        if self.llm is None or self._context_cache_disabled:
+            return None
+        
+        version = _prompt_version()
+        if (self._cached_content_name and self._cached_content_version == version
+                and time.time() < self._cached_content_expires_at):
+            return self._cached_content_name
+        
+        try:
+            self._cached_content_name = self.llm.create_cached_content(
+                static_prefix, ttl_seconds=_CONTEXT_CACHE_TTL, display_name=f"financial-extraction-{version}"
+            )
+            self._cached_content_version = version
+            self._cached_content_expires_at = time.time() + _CONTEXT_CACHE_TTL - _CONTEXT_CACHE_MARGIN
+            return self._cached_content_name
+        except Exception as e:
+            # 静态前缀低于模型要求的最小token数时无法创建，退回完整prompt(仍可命中隐式缓存)
+            logger.info(f"ℹ️ 上下文缓存不可用，使用完整prompt: {e}")
+            self._context_cache_disabled = True
+            self._cached_content_name = None
+            return None
+    
+    def _llm_call_params(self, token_scale: int = 1) -> Dict[str, Any]:
+        """
+        LLM调用参数
+        
+        Args:
+            token_scale: 输出和思考token上限的放大倍数，输出被截断后重试时翻倍
+        """
+        return {
+            "temperature": 0.0,
+            "max_tokens": min(_MAX_OUTPUT_TOKENS * token_scale, _MAX_OUTPUT_TOKENS_CAP),
+            "thinking_budget": min(_THINKING_BUDGET * token_scale, _THINKING_BUDGET_CAP),
+            "response_mime_type": "application/json",
+            "response_schema": self.response_schema,
+        }
+    
+    def _handle_llm_response(self, response: str, tokens_used: int, finish_reason: str, attempt: int) -> Dict[str, Any]:
+        """
+        校验并解析LLM响应
+        
+        Raises:
+            _InvalidResponseError: 响应无法解析为JSON或不符合schema
+            Exception: 响应为空
+        """
+        logger.info(f"💰 LLM调用完成，使用tokens: {tokens_used}")
+        
+        if finish_reason != "stop":
+            logger.warning(f"⚠️ LLM调用未正常结束: {finish_reason}")
+            # 如果不是正常结束，但有响应内容，仍然尝试解析
+            if not response.strip():
+                raise Exception(f"LLM调用未正常结束且响应为空: {finish_reason}")
+        
+        extracted_info = self._parse_json_response(response, attempt + 1)
+        if not extracted_info:
+            raise _InvalidResponseError("输出不是有效的JSON对象", response)
+        
+        schema_error = self._validate_schema(extracted_info)
+        if schema_error:
+            raise _InvalidResponseError(f"输出不符合schema: {schema_error}", response)
+        
+        extracted_info["extraction_method"] = "gemini_llm"
+        extracted_info["tokens_used"] = tokens_used
+        extracted_info["attempts_used"] = attempt + 1
+        
+        logger.info(f"✅ 信息提取成功 (第 {attempt + 1} 次尝试)")
+        return extracted_info
+    
+    def _fallback_after_failure(self, transcription_text: str, video_title: str, last_error: Optional[Exception]) -> Dict[str, Any]:
+        """所有尝试失败后回退到基础规则提取"""
         logger.error(f"❌ 所有提取尝试都失败了，最后错误: {last_error}")
         logger.info("🔄 回退到基础规则提取")
         return self._extract_without_llm(transcription_text, video_title)
     
+    def _semantic_embedding(self, transcription_text: str, video_title: str) -> Optional[List[float]]:
+        """计算语义缓存使用的嵌入(标题 + 转录开头)，未启用或调用失败时返回None"""
+        if self.semantic_cache is None:
+            return None
+        try:
+            return self.llm.embed(f"{video_title}\n{transcription_text[:_SEMANTIC_KEY_CHARS]}")
+        except Exception as e:
+            logger.warning(f"⚠️ 计算文本嵌入失败，跳过语义缓存: {e}")
+            return None
+    
+    def _cache_key(self, transcription_text: str, video_title: str) -> str:
+        """
+        计算内容寻址的缓存键: sha256(prompt模板 || 模型 || schema版本 || 标题 || 文本)
+        
+        每个字段前加8字节长度前缀，避免不同字段拼接后产生相同的字节串
+        """
+        digest = hashlib.sha256()
+        fields = (
+            _load_prompt_template(),
+            self.llm.gemini_model_name if self.llm else "",
+            SCHEMA_VERSION,
+            video_title,
+            transcription_text,
+        )
+        for field in fields:
+            data = field.encode('utf-8')
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+        return digest.hexdigest()
+    
+    def _cache_get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的提取结果，未命中、条目过期或缓存不可用时返回None"""
+        if self.cache_dir is None:
+            return None
+        cache_file = self.cache_dir / f"{cache_key}.json"
+        try:
+            entry = _json_loads(cache_file.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ 读取结果缓存失败: {e}")
+            return None
+        
+        if entry.get("prompt_version") != _prompt_version():
+            return None
+        
+        result = entry["result"]
+        result["extraction_method"] = "gemini_llm_cached"
+        logger.info(f"✅ 命中结果缓存: {cache_key[:16]}")
+        return result
+    
+    def _cache_set(self, cache_key: str, result: Dict[str, Any]) -> None:
+        """缓存LLM提取成功的结果(原子写入)，降级结果不缓存"""
+        if self.cache_dir is None or result.get("extraction_method") != "gemini_llm":
+            return
+        entry = {
+            "model": self.llm.gemini_model_name if self.llm else "",
+            "prompt_version": _prompt_version(),
+            "timestamp": time.time(),
+            "result": result,
+        }
+        cache_file = self.cache_dir / f"{cache_key}.json"
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file.write_bytes(_json_dumps(entry))
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            logger.warning(f"⚠️ 写入结果缓存失败: {e}")
+            try:
+                tmp_file.unlink(missing_ok=True)
+            except OSError:
+                pass
+    
+    def _append_checkpoint(self, checkpoint_path: str, index: int, video_title: str, result: Dict[str, Any]) -> None:
+        """向JSONL检查点文件追加一条完成记录"""
+        try:
+            checkpoint_file = Path(checkpoint_path)
+            checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+            line = _json_dumps({"index": index, "video_title": video_title, "result": result})
+            with open(checkpoint_file, 'ab') as f:
+                f.write(line + b"\n")
+        except Exception as e:
+            logger.warning(f"⚠️ 写入检查点失败: {e}")
+    
     def _parse_json_response(self, response: str, attempt_num: int) -> Optional[Dict[str, Any]]:
         """
-        解析JSON响应，支持多种格式清理
+        解析JSON响应，标准解析失败时容错修复(markdown代码块、前后多余文本、轻微格式错误)
         
         Args:
             response: 原始响应
@@ -157,296 +1379,70 @@ class FinancialInfoExtractor:
             logger.warning("响应为空")
             return None
         
-        # 尝试多种方式清理和解析JSON
-        json_attempts = [
-            response.strip(),  # 原始响应
-            response.strip().strip('```json').strip('```'),  # 移除markdown代码块
-            response[response.find('{'):response.rfind('}') + 1] if '{' in response and '}' in response else response,  # 提取JSON部分
-        ]
+        # 快速路径：结构化输出通常是合法JSON
+        parsed = None
+        try:
+            parsed = _json_loads(response)
+        except json.JSONDecodeError as e:
+            logger.debug(f"标准JSON解析失败 (第 {attempt_num} 次尝试): {e}")
+            
+            if JSON_REPAIR_AVAILABLE:
+                parsed = json_repair.loads(response)
+            else:
+                # 无json_repair时截取最外层JSON对象，截断的响应补齐括号后再解析
+                start, end = response.find('{'), response.rfind('}')
+                candidates = [response[start:end + 1]] if 0 <= start < end else []
+                balanced = _balance_truncated_json(response)
+                if balanced:
+                    candidates.append(balanced)
+                for candidate in candidates:
+                    try:
+                        parsed = _json_loads(candidate)
+                        break
+                    except json.JSONDecodeError:
+                        parsed = None
+            
+            if isinstance(parsed, dict) and parsed:
+                logger.info("JSON容错解析成功")
         
-        for i, json_str in enumerate(json_attempts):
-            try:
-                if json_str.strip():
-                    parsed = json.loads(json_str)
-                    if i > 0:
-                        logger.info(f"JSON解析成功 (使用第 {i + 1} 种清理方法)")
-                    return parsed
-            except json.JSONDecodeError as e:
-                if i == 0:
-                    logger.debug(f"第 {i + 1} 种JSON解析失败: {e}")
-                continue
+        if isinstance(parsed, dict) and parsed:
+            return parsed
         
         # 记录失败详情
-        logger.error(f"所有JSON解析方法都失败了")
+        logger.error(f"JSON解析失败")
         logger.info(f"原始响应 (前500字符): {response[:500]}")
         return None
     
-    def _create_financial_schema(self) -> Dict[str, Any]:
+    def _validate_schema(self, parsed: Dict[str, Any]) -> Optional[str]:
         """
-        创建财经信息提取的JSON schema
+        使用预编译的校验器检查解析结果是否符合schema，未安装fastjsonschema时跳过校验
         
         Returns:
-            完整的JSON schema定义
+            不符合时返回错误描述，符合时返回None
         """
-        return {
-            "type": "object",
-            "required": [
-                "summary",
-                "market_overview", 
-                "macroeconomic_data",
-                "stock_analysis",
-                "key_events",
-                "investment_advice",
-                "risks_and_warnings"
-            ],
-            "properties": {
-                "summary": {
-                    "type": "string",
-                    "description": "对整个财经分析内容的简明总结"
-                },
-                "market_overview": {
-                    "type": "object",
-                    "required": ["date", "major_indices", "market_sentiment"],
-                    "properties": {
-                        "date": {
-                            "type": "string",
-                            "description": "分析日期，格式YYYY-MM-DD"
-                        },
-                        "major_indices": {
-                            "type": "array",
-                            "items": {
-                                "type": "object",
-                                "required": ["name", "performance"],
-                                "properties": {
-                                    "name": {
-                                        "type": "string",
-                                        "description": "指数名称，如S&P 500, 纳斯达克等"
-                                    },
-                                    "performance": {
-                                        "type": "string",
-                                        "description": "当日表现描述"
-                                    },
-                                    "current_level": {
-                                        "type": "string",
-                                        "description": "当前点位或价格"
-                                    },
-                                    "key_levels": {
-                                        "type": "array",
-                                        "items": {"type": "string"},
-                                        "description": "关键技术位"
-                                    },
-                                    "analysis": {
-                                        "type": "string",
-                                        "description": "技术分析和走势解读"
-                                    }
-                                }
-                            },
-                            "description": "主要市场指数分析"
-                        },
-                        "market_sentiment": {
-                            "type": "string",
-                            "description": "整体市场情绪和驱动因素"
-                        }
-                    }
-                },
-                "macroeconomic_data": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "required": ["indicator", "impact"],
-                        "properties": {
-                            "indicator": {
-                                "type": "string",
-                                "description": "宏观经济指标名称"
-                            },
-                            "actual_value": {
-                                "type": "string",
-                                "description": "实际公布值"
-                            },
-                            "expected_value": {
-                                "type": "string",
-                                "description": "市场预期值"
-                            },
-                            "previous_value": {
-                                "type": "string",
-                                "description": "前值"
-                            },
-                            "impact": {
-                                "type": "string",
-                                "description": "对市场的影响分析"
-                            },
-                            "interpretation": {
-                                "type": "string",
-                                "description": "数据解读和意义"
-                            }
-                        }
-                    },
-                    "description": "宏观经济数据和分析"
-                },
-                "stock_analysis": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "required": ["symbol", "key_points"],
-                        "properties": {
-                            "symbol": {
-                                "type": "string",
-                                "description": "股票代码或ETF代码"
-                            },
-                            "company_name": {
-                                "type": "string",
-                                "description": "公司或产品全名"
-                            },
-                            "current_price": {
-                                "type": "string",
-                                "description": "当前价格或价格区间"
-                            },
-                            "price_change": {
-                                "type": "string",
-                                "description": "价格变化"
-                            },
-                            "key_points": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                                "description": "关键分析要点"
-                            },
-                            "price_levels": {
-                                "type": "object",
-                                "properties": {
-                                    "support": {
-                                        "type": "array",
-                                        "items": {"type": "string"},
-                                        "description": "支撑位"
-                                    },
-                                    "resistance": {
-                                        "type": "array",
-                                        "items": {"type": "string"},
-                                        "description": "阻力位"
-                                    },
-                                    "target": {
-                                        "type": "array", 
-                                        "items": {"type": "string"},
-                                        "description": "目标位"
-                                    }
-                                }
-                            },
-                            "recommendation": {
-                                "type": "string",
-                                "enum": ["买入", "持有", "卖出", "观望"],
-                                "description": "投资建议"
-                            },
-                            "risk_reward_ratio": {
-                                "type": "string",
-                                "description": "风险收益比"
-                            },
-                            "analyst_notes": {
-                                "type": "string",
-                                "description": "分析师备注"
-                            }
-                        }
-                    },
-                    "description": "个股分析"
-                },
-                "key_events": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "required": ["event", "impact"],
-                        "properties": {
-                            "event": {
-                                "type": "string",
-                                "description": "关键事件描述"
-                            },
-                            "date": {
-                                "type": "string",
-                                "description": "事件日期"
-                            },
-                            "impact": {
-                                "type": "string",
-                                "description": "对市场的影响"
-                            },
-                            "category": {
-                                "type": "string",
-                                "enum": ["财报", "政策", "经济数据", "企业行为", "其他"],
-                                "description": "事件类别"
-                            }
-                        }
-                    },
-                    "description": "影响市场的关键事件"
-                },
-                "investment_advice": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "required": ["advice", "timeframe"],
-                        "properties": {
-                            "advice": {
-                                "type": "string",
-                                "description": "具体投资建议"
-                            },
-                            "timeframe": {
-                                "type": "string",
-                                "enum": ["短期", "中期", "长期"],
-                                "description": "建议的时间框架"
-                            },
-                            "rationale": {
-                                "type": "string",
-                                "description": "建议的理由"
-                            },
-                            "target_audience": {
-                                "type": "string",
-                                "description": "目标投资者类型"
-                            }
-                        }
-                    },
-                    "description": "投资建议"
-                },
-                "risks_and_warnings": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "required": ["risk", "severity"],
-                        "properties": {
-                            "risk": {
-                                "type": "string",
-                                "description": "风险描述"
-                            },
-                            "severity": {
-                                "type": "string",
-                                "enum": ["低", "中", "高"],
-                                "description": "风险严重程度"
-                            },
-                            "probability": {
-                                "type": "string",
-                                "enum": ["低", "中", "高"],
-                                "description": "风险发生概率"
-                            },
-                            "mitigation": {
-                                "type": "string",
-                                "description": "风险缓解措施"
-                            }
-                        }
-                    },
-                    "description": "风险提示和警告"
-                }
-            }
-        }
+        if _SCHEMA_VALIDATOR is None:
+            return None
+        try:
+            _SCHEMA_VALIDATOR(parsed)
+            return None
+        except fastjsonschema.JsonSchemaException as e:
+            logger.warning(f"⚠️ 响应不符合schema: {e.message}")
+            return e.message
     
-    def _build_extraction_prompt(self, text: str, title: str) -> str:
-        """构建信息提取的prompt"""
-        # 尝试从prompts目录读取模板
-        prompt_file = Path(__file__).parent.parent / "prompts" / "financial_extraction_prompt.txt"
+    def _build_extraction_prompt(self, text: str, title: str) -> Tuple[str, str]:
+        """
+        构建信息提取的prompt
         
-        if prompt_file.exists():
-            try:
-                with open(prompt_file, 'r', encoding='utf-8') as f:
-                    prompt_template = f.read()
-                # 替换模板中的占位符
-                prompt = prompt_template.format(title=title, text=text)
-                logger.info(f"✅ 使用外部prompt模板: {prompt_file}")
-                return prompt
-            except Exception as e:
-                raise RuntimeError(f"⚠️ 读取prompt模板失败, prompt_file: {prompt_file}, error: {e}")
+        模板中标题和转录文本位于末尾，从第一个占位符所在行切分为静态前缀和动态后缀，
+        静态前缀在所有请求间保持一致，可用于上下文缓存
+        
+        Returns:
+            (静态前缀, 动态后缀) 元组
+        """
+        prompt_template = _load_prompt_template()
+        first_placeholder = min(prompt_template.find(name) for name in ("{title}", "{text}"))
+        split_at = prompt_template.rfind("\n", 0, first_placeholder) + 1
+        return prompt_template[:split_at], prompt_template[split_at:].format(title=title, text=text)
     
     def _extract_without_llm(self, text: str, title: str) -> Dict[str, Any]:
         """不使用LLM的基础信息提取"""
@@ -461,7 +1457,7 @@ class FinancialInfoExtractor:
             "summary": f"基于视频标题的财经分析内容: {title}",
             "text_length": len(text),
             "stocks_mentioned": stocks_mentioned,
-            "numbers_found": numbers[:10],  # 限制数量
+            "numbers_found": numbers,
             "market_overview": {
                 "date": "",
                 "major_indices": [],
@@ -475,53 +1471,13 @@ class FinancialInfoExtractor:
             "note": "使用基础规则提取，信息有限。建议配置Gemini LLM获得更详细的分析。"
         }
     
-    def _extract_stock_symbols(self, text: str) -> List[str]:
-        """提取股票代码"""
-        import re
-        
-        # 常见美股代码模式
-        patterns = [
-            r'\b([A-Z]{1,5})\b',  # 1-5个大写字母的股票代码
-            r'特斯拉|TSLA',
-            r'苹果|AAPL', 
-            r'谷歌|GOOGL|GOOG',
-            r'微软|MSFT',
-            r'亚马逊|AMZN',
-            r'英伟达|NVDA',
-            r'Meta|META',
-            r'博通|AVGO',
-            r'LULU'
-        ]
-        
-        stocks = set()
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            stocks.update(matches)
-        
-        # 过滤掉常见的非股票词汇
-        exclude = {'AND', 'THE', 'FOR', 'ARE', 'YOU', 'ALL', 'BUT', 'NOT', 'CAN', 'HAD', 'HER', 'WAS', 'ONE', 'OUR', 'OUT', 'DAY', 'GET', 'HAS', 'HIM', 'HIS', 'HOW', 'ITS', 'NEW', 'NOW', 'OLD', 'SEE', 'TWO', 'WHO', 'BOY', 'DID', 'DOWN', 'EACH', 'FEW', 'FROM', 'HAVE', 'HERE', 'INTO', 'JUST', 'LIKE', 'LONG', 'MADE', 'MANY', 'OVER', 'SUCH', 'TAKE', 'THAN', 'THEM', 'WELL', 'WERE', 'WHAT', 'WITH', 'WORK'}
-        stocks = [s for s in stocks if s not in exclude and len(s) <= 5]
-        
-        return list(stocks)[:10]  # 限制返回数量
+    def _extract_stock_symbols(self, text: str, limit: int = 10) -> List[str]:
+        """提取股票代码，按首次出现顺序去重，最多返回limit个"""
+        return _take_unique(_iter_ticker_matches(text), limit)
     
-    def _extract_numbers(self, text: str) -> List[str]:
-        """提取可能的价格和百分比数据"""
-        import re
-        
-        patterns = [
-            r'\b\d+\.?\d*%',  # 百分比
-            r'\$\d+\.?\d*',   # 价格
-            r'\b\d{1,4}\.?\d*块',  # 中文价格描述
-            r'\b\d+\.?\d*美元',    # 美元
-            r'\b\d+\.?\d*亿',      # 亿
-        ]
-        
-        numbers = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            numbers.extend(matches)
-        
-        return numbers
+    def _extract_numbers(self, text: str, limit: int = 10) -> List[str]:
+        """提取可能的价格和百分比数据，按首次出现顺序去重，最多返回limit个"""
+        return _take_unique((m.group(0) for m in _NUMBER_RE.finditer(text)), limit)
     
     def save_extracted_info(self, info: Dict[str, Any], output_path: str) -> bool:
         """
@@ -538,8 +1494,11 @@ class FinancialInfoExtractor:
             output_file = Path(output_path)
             output_file.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(info, f, ensure_ascii=False, indent=2)
+            if ORJSON_AVAILABLE:
+                output_file.write_bytes(orjson.dumps(info, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump(info, f, ensure_ascii=False, indent=2)
             
             logger.info(f"💾 提取信息已保存到: {output_file}")
             return True
@@ -549,6 +1508,12 @@ class FinancialInfoExtractor:
             return False
 
 
+@functools.lru_cache(maxsize=1)
+def _get_extractor() -> FinancialInfoExtractor:
+    """进程内共享的提取器，便捷函数被循环调用时不再重复初始化Gemini客户端"""
+    return FinancialInfoExtractor()
+
+
 def extract_financial_info(transcription_text: str, 
                          video_title: str = "", 
                          output_path: Optional[str] = None) -> Dict[str, Any]:
@@ -563,7 +1528,7 @@ def extract_financial_info(transcription_text: str,
     Returns:
         提取的信息字典
     """
-    extractor = FinancialInfoExtractor()
+    extractor = _get_extractor()
     info = extractor.extract_key_info(transcription_text, video_title)
     
     if output_path:
@@ -575,7 +1540,7 @@ def extract_financial_info(transcription_text: str,
 def test_with_real_transcription():
     """使用真实的转录文本测试LLM信息提取功能"""
     # 读取真实的转录文本
-    transcription_file = Path(__file__).parent.parent / "downloads" / "rhino_finance" / "2025-09-10" / "transcription" / "rhino_ZKo41ja8rD0.txt"
+    transcription_file = _PROJECT_ROOT / "downloads" / "rhino_finance" / "2025-09-10" / "transcription" / "rhino_ZKo41ja8rD0.txt"
     
     if not transcription_file.exists():
         print(f"❌ 转录文件不存在: {transcription_file}")
@@ -597,7 +1562,7 @@ def test_with_real_transcription():
         )
         
         # 保存结果
-        output_file = Path(__file__).parent.parent / "downloads" / "rhino_finance" / "2025-09-10" / "analysis" / "rhino_ZKo41ja8rD0_analysis2.json"
+        output_file = _PROJECT_ROOT / "downloads" / "rhino_finance" / "2025-09-10" / "analysis" / "rhino_ZKo41ja8rD0_analysis2.json"
         extractor.save_extracted_info(result, str(output_file))
         
         # 显示提取结果摘要
@@ -621,7 +1586,7 @@ def test_with_real_transcription():
         if macro_data:
             print(f"\n🌍 宏观经济数据 ({len(macro_data)}条):")
             for data in macro_data[:3]:  # 显示前3条
-                print(f"  • {data.get('indicator', 'N/A')}: {data.get('value', 'N/A')}")
+                print(f"  • {data.get('indicator', 'N/A')}: {data.get('actual_value', 'N/A')}")
         
         # 显示股票分析
         stock_analysis = result.get('stock_analysis', [])
@@ -630,9 +1595,9 @@ def test_with_real_transcription():
             for stock in stock_analysis:
                 symbol = stock.get('symbol', 'N/A')
                 company = stock.get('company_name', 'N/A')
-                outlook = stock.get('outlook', 'N/A')
+                recommendation = stock.get('recommendation', 'N/A')
                 print(f"  🏢 {symbol} ({company})")
-                print(f"     观点: {outlook}")
+                print(f"     观点: {recommendation}")
                 
                 # 显示关键点位
                 price_levels = stock.get('price_levels', {})
@@ -646,14 +1611,14 @@ def test_with_real_transcription():
         if advice:
             print(f"\n💡 投资建议 ({len(advice)}条):")
             for item in advice[:3]:  # 显示前3条
-                print(f"  • {item}")
+                print(f"  • {item.get('advice', 'N/A')} ({item.get('timeframe', 'N/A')})")
         
         # 显示风险警示
         risks = result.get('risks_and_warnings', [])
         if risks:
             print(f"\n⚠️ 风险提示 ({len(risks)}条):")
             for risk in risks[:2]:  # 显示前2条
-                print(f"  • {risk}")
+                print(f"  • [{risk.get('severity', 'N/A')}] {risk.get('risk', 'N/A')}")
         
         print("="*60)
         print(f"💾 详细结果已保存到: {output_file}")
@@ -663,9 +1628,7 @@ def test_with_real_transcription():
             print(f"💰 LLM Tokens 使用量: {result['tokens_used']}")
         
     except Exception as e:
-        logger.error(f"❌ 测试失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ 测试失败: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+"""
+客户端限流
+令牌桶按配额预先等待，避免批量调用时触发429后在重试退避中浪费时间
+"""
+
+import re
+import time
+import asyncio
+import threading
+from typing import Optional
+
+_CJK_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中日韩字符约1个token，其他字符约4个字符1个token"""
+    cjk_count = len(_CJK_RE.findall(text))
+    return cjk_count + (len(text) - cjk_count) // 4
+
+
+class TokenBucket:
+    """
+    线程安全、可用于asyncio的令牌桶
+
+    采用预约方式：取令牌时直接扣减(可为负)，再按欠额计算需要等待的时间，
+    等待期间不持有锁，多个线程/协程按到达顺序排队
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate_per_minute: 每分钟补充的令牌数(如RPM或TPM配额)
+            capacity: 桶容量，即允许的突发量，默认等于每分钟配额
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount: float) -> float:
+        """扣减令牌并返回需要等待的秒数"""
+        # 单次请求超过桶容量时按容量计，否则永远无法满足
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        同步获取令牌，不足时阻塞等待
+
+        Args:
+            amount: 需要的令牌数
+
+        Returns:
+            实际等待的秒数
+        """
+        wait = self._reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, amount: float = 1) -> float:
+        """
+        异步获取令牌，不足时让出事件循环等待
+
+        Args:
+            amount: 需要的令牌数
+
+        Returns:
+            实际等待的秒数
+        """
+        wait = self._reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
@@ -0,0 +1,148 @@
+"""
+语义缓存
+按文本嵌入的余弦相似度查找相近转录的提取结果，适用于同一频道结构高度相似的视频
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入numpy，用于向量相似度计算
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class SemanticCache:
+    """基于嵌入向量相似度的提取结果缓存，条目持久化为JSONL"""
+
+    def __init__(self, cache_dir: str, threshold: float = 0.92, ttl_seconds: Optional[float] = None):
+        """
+        初始化语义缓存
+
+        Args:
+            cache_dir: 缓存目录
+            threshold: 命中所需的最小余弦相似度
+            ttl_seconds: 条目有效期(秒)，过期条目不再命中；为None时永不过期
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("语义缓存需要numpy")
+
+        self.cache_file = Path(cache_dir) / "entries.jsonl"
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._results: List[Dict[str, Any]] = []
+        self._created_at: List[float] = []
+        self._matrix = None
+        self._load()
+
+    def _load(self) -> None:
+        """从JSONL文件加载已有条目，存在过期或损坏的行时重写文件将其清除"""
+        if not self.cache_file.exists():
+            return
+
+        vectors = []
+        kept_lines = []
+        dropped = 0
+        for line in self.cache_file.read_text(encoding='utf-8').splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                dropped += 1
+                continue
+            # 旧条目没有时间戳，视为刚写入
+            created_at = entry.get("created_at", time.time())
+            if self._expired(created_at):
+                dropped += 1
+                continue
+            vectors.append(entry["embedding"])
+            self._results.append(entry["result"])
+            self._created_at.append(created_at)
+            kept_lines.append(line)
+
+        if dropped:
+            self._rewrite(kept_lines)
+            logger.info(f"🧹 已从语义缓存文件清除 {dropped} 条过期或无效条目")
+
+        if vectors:
+            self._matrix = self._normalize(np.asarray(vectors, dtype=np.float32))
+        logger.info(f"📚 已加载语义缓存: {len(self._results)} 条")
+
+    def _rewrite(self, lines: List[str]) -> None:
+        """用给定的行原子地替换缓存文件，写入失败时保留原文件"""
+        tmp_file = self.cache_file.with_suffix(".jsonl.tmp")
+        try:
+            tmp_file.write_text("".join(line + "\n" for line in lines), encoding='utf-8')
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            logger.warning(f"⚠️ 重写语义缓存文件失败: {e}")
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    @staticmethod
+    def _normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def lookup(self, embedding: Sequence[float]) -> Optional[Dict[str, Any]]:
+        """
+        查找与给定嵌入最相似的缓存结果
+
+        Args:
+            embedding: 查询文本的嵌入向量
+
+        Returns:
+            相似度达到阈值时返回缓存结果的副本，否则返回None
+        """
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                return None
+            scores = self._matrix @ query
+            if self.ttl_seconds is not None:
+                expired = np.fromiter((self._expired(t) for t in self._created_at), dtype=bool, count=len(self._created_at))
+                scores = np.where(expired, -np.inf, scores)
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            result = self._results[best]
+
+        if score < self.threshold:
+            return None
+        logger.info(f"✅ 命中语义缓存, 相似度: {score:.3f}")
+        return dict(result)
+
+    def add(self, embedding: Sequence[float], result: Dict[str, Any]) -> None:
+        """
+        追加一条缓存条目并写入磁盘
+
+        Args:
+            embedding: 文本的嵌入向量
+            result: 对应的提取结果
+        """
+        vector = self._normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            if self._matrix is not None and self._matrix.shape[1] != vector.shape[0]:
+                logger.warning(f"⚠️ 嵌入维度与语义缓存不一致，跳过写入: {vector.shape[0]}")
+                return
+
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            created_at = time.time()
+            with open(self.cache_file, 'a', encoding='utf-8') as f:
+                entry = {"embedding": [float(value) for value in embedding], "result": result, "created_at": created_at}
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+            self._matrix = vector[None, :] if self._matrix is None else np.vstack([self._matrix, vector[None, :]])
+            self._results.append(result)
+            self._created_at.append(created_at)
@@ -3,11 +3,209 @@ YouTube媒体下载模块
 使用yt-dlp库下载YouTube视频和音频
 """
 
+import os
+import re
+import copy
+import shutil
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-import yt_dlp
+# yt-dlp导入时会加载上千个提取器模块，推迟到真正下载时再导入
+if TYPE_CHECKING:
+    import yt_dlp
 
+# 批量下载的默认并发数，可通过环境变量YDL_MAX_WORKERS覆盖
+DEFAULT_MAX_WORKERS = int(os.environ.get("YDL_MAX_WORKERS", 4))
+
+# 单个视频内的下载并行度，等同yt-dlp命令行的 -N：DASH/HLS分片并发下载，可通过环境变量YDL_FRAG_N覆盖
+CONCURRENT_FRAGMENTS = int(os.environ.get("YDL_FRAG_N", 8))
+# 非分片格式按块发起HTTP Range请求，避免单个长连接被限速
+HTTP_CHUNK_SIZE = 10 * 1024 * 1024
+
+# 安装了aria2c时，非分片的单文件格式改用aria2c多连接Range下载，绕过单连接限速
+ARIA2C_AVAILABLE = shutil.which("aria2c") is not None
+_ARIA2C_ARGS = ["-x", "16", "-s", "16", "-k", "1M", "--file-allocation=none"]
+
+# YouTube链接(含子域名、短链)或11位视频ID，不匹配的输入不必进入yt-dlp的提取流程
+_YOUTUBE_URL_RE = re.compile(
+    r'^(?:https?://)?(?:[\w-]+\.)?(?:youtube\.com|youtube-nocookie\.com|youtu\.be)/|^[\w-]{11}$'
+)
+
+# 各目标音频格式优先选择的原始音频流，没有时退回最佳音质
+_AUDIO_FORMAT_SELECTORS = {
+    "webm": "bestaudio[ext=webm]/bestaudio/best",
+    "opus": "bestaudio[acodec=opus]/bestaudio/best",
+    "m4a": "bestaudio[ext=m4a]/bestaudio/best",
+}
+
+def _extract_audio_pp(codec: str, quality: Optional[str] = "192") -> Dict[str, Any]:
+    """构建FFmpegExtractAudio后处理器配置"""
+    return {"key": "FFmpegExtractAudio", "preferredcodec": codec, "preferredquality": quality}
+
+
+# 目标音频格式 -> (yt-dlp后处理器, 提示信息)，模块加载时生成一次
+# 源音频已是目标编码(YouTube音频流为Opus/AAC)时，FFmpegExtractAudio只做无损重封装，不重新编码
+_AUDIO_POSTPROCESSORS = {
+    "mp3": ((_extract_audio_pp("mp3"),), "Attempting MP3 conversion (requires FFmpeg with libmp3lame)"),
+    "m4a": ((_extract_audio_pp("m4a"),), "Attempting M4A conversion (requires FFmpeg)"),
+    "opus": ((_extract_audio_pp("opus"),), "Attempting OPUS conversion (requires FFmpeg)"),
+    "wav": ((_extract_audio_pp("wav", None),), "Attempting WAV conversion (requires FFmpeg)"),
+    "flac": ((_extract_audio_pp("flac"),), "Attempting FLAC conversion (requires FFmpeg)"),
+}
+_ORIGINAL_AUDIO_MESSAGE = "Using original audio format (typically WebM/OGG)"
+
+# 视频元数据缓存有效期(秒)。元数据中的媒体直链带签名且会过期，只在进程内短期复用，不持久化到磁盘
+METADATA_CACHE_TTL = int(os.environ.get("YDL_METADATA_TTL", 600))
+
+# URL -> (缓存时间, extract_info结果)
+_metadata_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_metadata_lock = threading.Lock()
+
+
+def _extract_info_cached(ydl: "yt_dlp.YoutubeDL", url: str) -> Dict[str, Any]:
+    """
+    获取视频元数据，同一URL在有效期内复用上一次的结果(如同一视频先下载视频再下载音频)
+
+    Args:
+        ydl: 用于提取元数据的YoutubeDL实例
+        url: 视频URL
+
+    Returns:
+        元数据字典的副本(下载时yt-dlp会就地修改该字典)
+    """
+    now = time.monotonic()
+    with _metadata_lock:
+        cached = _metadata_cache.get(url)
+    if cached and now - cached[0] < METADATA_CACHE_TTL:
+        print(f"Using cached metadata for: {url}")
+        return copy.deepcopy(cached[1])
+
+    info = ydl.extract_info(url, download=False)
+    with _metadata_lock:
+        _metadata_cache[url] = (now, copy.deepcopy(info))
+    return info
+
+
+def prefetch_metadata(urls: List[str], max_workers: int = 16) -> None:
+    """
+    并发预取多个URL的元数据并放入缓存，随后的下载直接复用，不再逐个等待元数据请求
+
+    Args:
+        urls: 视频URL列表
+        max_workers: 最大并发请求数
+    """
+    def _fetch(url: str) -> None:
+        try:
+            with _pooled_ydl({"quiet": True, "skip_download": True}) as ydl:
+                _extract_info_cached(ydl, url)
+        except Exception as e:
+            print(f"Metadata prefetch failed for {url}: {e}")
+
+    if not urls:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as executor:
+        list(executor.map(_fetch, urls))
+
+
+def clear_metadata_cache() -> None:
+    """清空进程内的视频元数据缓存"""
+    with _metadata_lock:
+        _metadata_cache.clear()
+
+
+# 空闲的YoutubeDL实例池：选项(不含输出模板) -> 实例列表。复用实例可省去提取器注册和播放器JS解析
+# YoutubeDL不能被多个线程同时使用，因此按"借出/归还"方式管理，而不是共享同一个实例
+_ydl_pool: Dict[str, List["yt_dlp.YoutubeDL"]] = {}
+_ydl_pool_lock = threading.Lock()
+
+# 每组选项最多保留的空闲实例数，超出的实例归还时直接关闭，可通过环境变量YDL_POOL_MAX_IDLE覆盖
+YDL_POOL_MAX_IDLE = int(os.environ.get("YDL_POOL_MAX_IDLE", DEFAULT_MAX_WORKERS))
+
+
+def _apply_outtmpl(ydl: "yt_dlp.YoutubeDL", outtmpl: Optional[str]) -> None:
+    """
+    为借出的实例设置本次下载的输出模板
+
+    yt-dlp在构造时把outtmpl规范化为 {类型: 模板} 字典(部分版本另存于outtmpl_dict)，
+    这里只替换其中的default项，其余类型的模板保持不变
+
+    Args:
+        ydl: YoutubeDL实例
+        outtmpl: 输出模板，None表示恢复yt-dlp默认模板
+    """
+    from yt_dlp.utils import DEFAULT_OUTTMPL
+
+    template = outtmpl if outtmpl is not None else DEFAULT_OUTTMPL["default"]
+    templates = ydl.params.get("outtmpl")
+    if isinstance(templates, dict):
+        templates["default"] = template
+    else:
+        ydl.params["outtmpl"] = template
+    if isinstance(getattr(ydl, "outtmpl_dict", None), dict):
+        ydl.outtmpl_dict["default"] = template
+
+
+@contextmanager
+def _pooled_ydl(ydl_opts: Dict[str, Any]):
+    """
+    从实例池借出选项一致的YoutubeDL实例，用完后归还
+
+    输出模板因视频而异，不参与池键，每次借出时单独设置，使不同视频的下载可以复用同一实例
+
+    Args:
+        ydl_opts: yt-dlp选项
+
+    Yields:
+        YoutubeDL实例
+    """
+    outtmpl = ydl_opts.get("outtmpl")
+    key = repr(sorted((k, v) for k, v in ydl_opts.items() if k != "outtmpl"))
+    with _ydl_pool_lock:
+        idle = _ydl_pool.get(key)
+        ydl = idle.pop() if idle else None
+    if ydl is None:
+        import yt_dlp
+        ydl = yt_dlp.YoutubeDL(ydl_opts)
+    else:
+        _apply_outtmpl(ydl, outtmpl)
+
+    try:
+        yield ydl
+    except BaseException:
+        # 出错的实例状态不可预期，直接关闭不再复用
+        _close_ydl(ydl)
+        raise
+
+    with _ydl_pool_lock:
+        idle = _ydl_pool.setdefault(key, [])
+        if len(idle) < YDL_POOL_MAX_IDLE:
+            idle.append(ydl)
+            ydl = None
+    if ydl is not None:
+        _close_ydl(ydl)
+
+
+def _close_ydl(ydl: "yt_dlp.YoutubeDL") -> None:
+    """关闭YoutubeDL实例(保存cookie、释放网络连接)"""
+    try:
+        ydl.__exit__(None, None, None)
+    except Exception:
+        pass
+
+
+@atexit.register
+def close_pooled_downloaders() -> None:
+    """关闭实例池中所有空闲的YoutubeDL实例，进程退出时自动调用"""
+    with _ydl_pool_lock:
+        instances = [ydl for idle in _ydl_pool.values() for ydl in idle]
+        _ydl_pool.clear()
+    for ydl in instances:
+        _close_ydl(ydl)
 
 
 class YouTubeDownloader:
@@ -27,7 +225,14 @@ class YouTubeDownloader:
 
         # 确保下载目录存在
         self.download_dir.mkdir(parents=True, exist_ok=True)
-        
+
+        # 输出模板只取决于下载目录，预先生成，下载时只需拼接文件名
+        # 目录路径只做字符串拼接，不经过str.format，路径中含有花括号时也不受影响
+        self._output_prefix = str(self.download_dir) + os.sep
+        self._default_templates = {
+            media_type: self._output_prefix + f"%(title)s_{media_type}_%(upload_date)s.%(ext)s"
+            for media_type in ("video", "audio")
+        }
 
     def download_video(self, url: str, output_filename: Optional[str] = None, video_format: str = "mp4") -> Dict[str, Any]:
         """
@@ -74,40 +279,24 @@ class YouTubeDownloader:
         Args:
             url: YouTube视频URL
             output_filename: 输出文件名（不包括扩展名），为None时使用默认命名
-            audio_format: 音频格式，支持 'mp3', 'webm', 'm4a', 'wav' 等
+            audio_format: 音频格式，支持 'mp3', 'webm', 'm4a', 'opus', 'wav' 等
 
         Returns:
             Dict包含下载结果信息
         """
         print(f"Starting audio download from: {url}")
 
-        # 配置yt-dlp选项用于提取音频
+        # 配置yt-dlp选项用于提取音频；目标格式有对应的原始音频流时优先选用，后处理只需重封装或直接跳过
+        audio_format = audio_format.lower()
         ydl_opts = {
             "outtmpl": self._get_output_template(output_filename, "audio"),
-            "format": "bestaudio/best",  # 下载最佳音质
+            "format": _AUDIO_FORMAT_SELECTORS.get(audio_format, "bestaudio/best"),
         }
 
-        # 如果请求mp3格式，尝试转换；如果转换失败则保持原格式
-        if audio_format.lower() == "mp3":
-            ydl_opts["postprocessors"] = [
-                {
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "mp3",
-                    "preferredquality": "192",
-                }
-            ]
-            print("Attempting MP3 conversion (requires FFmpeg with libmp3lame)")
-        elif audio_format.lower() in ["m4a", "wav", "flac"]:
-            ydl_opts["postprocessors"] = [
-                {
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": audio_format.lower(),
-                    "preferredquality": "192" if audio_format.lower() != "wav" else None,
-                }
-            ]
-            print(f"Attempting {audio_format.upper()} conversion (requires FFmpeg)")
-        else:
-            print(f"Using original audio format (typically WebM/OGG)")
+        postprocessors, message = _AUDIO_POSTPROCESSORS.get(audio_format, (None, _ORIGINAL_AUDIO_MESSAGE))
+        if postprocessors:
+            ydl_opts["postprocessors"] = list(postprocessors)
+        print(message)
 
         return self._download_with_ytdlp(url, ydl_opts, "audio")
     
@@ -133,6 +322,42 @@ class YouTubeDownloader:
         else:
             raise ValueError(f"Unsupported media type: {media_type}. Use 'video' or 'audio'.")
 
+    def download_batch(
+        self, urls: List[str], media_type: str = "video", max_workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        并发下载多个URL
+
+        下载主要耗时在网络和磁盘I/O上，各URL互不相关，用线程池并发执行；
+        每个任务从实例池借出独立的YoutubeDL实例(YoutubeDL不能跨线程共享)。
+        下载前先以更高并发预取全部元数据，下载阶段不再逐个等待元数据请求
+
+        Args:
+            urls: YouTube视频URL列表
+            media_type: 媒体类型，'video' 或 'audio'
+            max_workers: 最大并发数，默认为DEFAULT_MAX_WORKERS
+
+        Returns:
+            与urls顺序一致的下载结果列表
+        """
+        if not urls:
+            return []
+
+        workers = max(1, min(max_workers or DEFAULT_MAX_WORKERS, len(urls)))
+        print(f"Starting batch {media_type} download: {len(urls)} URLs, {workers} workers")
+
+        prefetch_metadata(urls)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._download_one, url, media_type) for url in urls]
+            return [future.result() for future in futures]
+
+    def _download_one(self, url: str, media_type: str) -> Dict[str, Any]:
+        """下载单个URL，不支持的媒体类型等异常转换为失败结果，避免中断整个批次"""
+        try:
+            return self.download_media(url, media_type)
+        except Exception as e:
+            return {"success": False, "error": str(e), "url": url, "media_type": media_type, "message": str(e)}
+
     def _get_output_template(self, filename: Optional[str], media_type: str) -> str:
         """
         获取输出文件模板
@@ -146,10 +371,9 @@ class YouTubeDownloader:
         """
         if filename:
             # 用户指定了文件名，使用指定的文件名
-            return str(self.download_dir / f"{filename}.%(ext)s")
-        else:
-            # 使用默认命名：标题_类型_日期
-            return str(self.download_dir / f"%(title)s_{media_type}_%(upload_date)s.%(ext)s")
+            return self._output_prefix + filename + ".%(ext)s"
+        # 使用默认命名：标题_类型_日期
+        return self._default_templates[media_type]
 
     def _download_with_ytdlp(self, url: str, ydl_opts: Dict, media_type: str) -> Dict[str, Any]:
         """
@@ -163,18 +387,30 @@ class YouTubeDownloader:
         Returns:
             下载结果字典
         """
+        if not _YOUTUBE_URL_RE.match(url):
+            error_msg = f"Invalid YouTube URL: {url}"
+            print(error_msg)
+            return {"success": False, "error": "Invalid YouTube URL", "url": url, "media_type": media_type, "message": error_msg}
+
+        ydl_opts.setdefault("concurrent_fragment_downloads", CONCURRENT_FRAGMENTS)
+        ydl_opts.setdefault("http_chunk_size", HTTP_CHUNK_SIZE)
+        if ARIA2C_AVAILABLE:
+            # 只接管http(s)协议，DASH/HLS分片仍由yt-dlp原生下载器并发获取
+            ydl_opts.setdefault("external_downloader", {"http": "aria2c"})
+            ydl_opts.setdefault("external_downloader_args", {"aria2c": _ARIA2C_ARGS})
+
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with _pooled_ydl(ydl_opts) as ydl:
                 # 获取视频信息
-                info = ydl.extract_info(url, download=False)
+                info = _extract_info_cached(ydl, url)
                 title = info.get("title", "Unknown")
                 duration = info.get("duration", 0)
 
                 print(f"Found {media_type}: {title}")
                 print(f"Duration: {duration} seconds")
 
-                # 执行下载
-                ydl.download([url])
+                # 复用已获取的信息执行下载，避免再次请求元数据
+                info = ydl.process_ie_result(info, download=True)
 
                 return {
                     "success": True,
@@ -183,6 +419,7 @@ class YouTubeDownloader:
                     "url": url,
                     "media_type": media_type,
                     "download_dir": str(self.download_dir),
+                    "filepath": self._get_downloaded_filepath(ydl, info),
                     "message": f"Successfully downloaded {media_type}: {title}",
                 }
 
@@ -191,6 +428,25 @@ class YouTubeDownloader:
             print(error_msg)
             return {"success": False, "error": str(e), "url": url, "media_type": media_type, "message": error_msg}
 
+    def _get_downloaded_filepath(self, ydl: "yt_dlp.YoutubeDL", info: Dict[str, Any]) -> Optional[str]:
+        """
+        获取下载完成(含后处理转换)后的实际文件路径
+
+        Args:
+            ydl: 执行下载的YoutubeDL实例
+            info: 下载后的视频信息
+
+        Returns:
+            文件路径，无法确定时返回None
+        """
+        requested = info.get("requested_downloads") or []
+        if requested and requested[-1].get("filepath"):
+            return requested[-1]["filepath"]
+        try:
+            return ydl.prepare_filename(info)
+        except Exception:
+            return None
+
 
 # 便捷函数
 def download_youtube_video(
@@ -249,6 +505,25 @@ def download_youtube_media(
     return downloader.download_media(url, media_type, filename)
 
 
+def download_youtube_batch(
+    urls: List[str], media_type: str = "video", output_dir: Optional[str] = None, max_workers: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    便捷函数：并发下载多个YouTube媒体
+
+    Args:
+        urls: YouTube视频URL列表
+        media_type: 媒体类型，'video' 或 'audio'
+        output_dir: 输出目录
+        max_workers: 最大并发数
+
+    Returns:
+        与urls顺序一致的下载结果列表
+    """
+    downloader = YouTubeDownloader(output_dir)
+    return downloader.download_batch(urls, media_type, max_workers)
+
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+"""
+统一运行入口
+按子命令分发到各脚本的main函数，只在选定命令后才导入对应模块(避免无关命令加载torch/whisper等重依赖)
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# 子命令 -> (模块路径, 说明)
+COMMANDS = {
+    'single': ('scripts.single_video', '处理单个YouTube视频'),
+    'batch': ('scripts.batch_channel', '批量处理频道最新视频'),
+    'reprocess': ('scripts.reprocess_transcripts', '重新提取已有转录文件的信息'),
+    'analyze': ('web.analyzer', '生成分析汇总报告'),
+    'web': ('web.web_dashboard', '启动Web仪表板'),
+    'asr-daemon': ('core.asr_daemon', '启动常驻Whisper转录守护进程'),
+}
+
+
+def main():
+    """主函数，解析子命令后延迟导入并调用对应模块的main"""
+    parser = argparse.ArgumentParser(
+        description="🎵 YouTube Finance AI 统一运行入口",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(["子命令:"] + [f"  {name:<10} {desc}" for name, (_, desc) in COMMANDS.items()]) + """
+
+示例:
+  python run_app.py single "https://www.youtube.com/watch?v=XXXXX"
+  python run_app.py batch --limit 20
+  python run_app.py analyze
+  python run_app.py web --port 8080
+  python run_app.py asr-daemon --model base
+        """
+    )
+    parser.add_argument('command', choices=list(COMMANDS), help='要运行的子命令')
+
+    # 只解析子命令，其余参数原样交给子命令自己的解析器(包括 --help)
+    args, rest = parser.parse_known_args(sys.argv[1:2])
+    rest += sys.argv[2:]
+
+    project_root = Path(__file__).resolve().parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    module_name, _ = COMMANDS[args.command]
+    sys.argv = [f"{Path(sys.argv[0]).name} {args.command}"] + rest
+
+    module = __import__(module_name, fromlist=['main'])
+    module.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,24 @@ Rhino Finance 频道批量处理脚本
 自动获取频道最新视频并进行批量分析
 """
 
+import re
 import sys
 import os
 import json
-import subprocess
+import time
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-from urllib.parse import urlparse, parse_qs
+
+# 尝试导入orjson，用于快速序列化批量结果
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent.parent
@@ -19,6 +28,14 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from scripts.single_video import download_and_transcribe_youtube
+from core.info_extractor import FinancialInfoExtractor
+from core.asr_service import WhisperASR
+
+# 从watch/短链接/embed/shorts形式的URL中提取11位视频ID
+_YT_ID_RE = re.compile(r"(?:[?&]v=|youtu\.be/|/embed/|/shorts/)([A-Za-z0-9_-]{11})")
+
+# 同时进行的yt-dlp下载数上限，避免触发YouTube限流
+MAX_CONCURRENT_DOWNLOADS = 4
 
 class RhinoFinanceProcessor:
     """Rhino Finance 频道处理器"""
@@ -33,6 +50,14 @@ class RhinoFinanceProcessor:
         self.channel_url = channel_url
         self.output_dir = Path.cwd() / "downloads" / "rhino_finance"
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # 每个视频完成后追加一行JSON的进度文件
+        self.progress_file = self.output_dir / "progress.jsonl"
+        # get_channel_videos获取到的 URL -> 视频ID
+        self.video_ids: Dict[str, str] = {}
+        # 所有视频共用一个提取器，复用Gemini客户端及其连接池
+        self.extractor = FinancialInfoExtractor()
+        # Whisper模型只加载一次，供所有视频的转录复用(转录受asr_slots串行化)
+        self.asr_service = WhisperASR()
         
         print(f"🦏 初始化 Rhino Finance 处理器")
         print(f"📺 频道: {channel_url}")
@@ -51,24 +76,21 @@ class RhinoFinanceProcessor:
         print(f"🔍 获取频道最新 {limit} 个视频...")
         
         try:
-            # 使用yt-dlp获取频道视频列表
-            cmd = [
-                "yt-dlp", 
-                "--flat-playlist", 
-                "--print", "url",
-                "--playlist-end", str(limit),  # 限制获取数量
-                self.channel_url
-            ]
+            # 进程内调用yt-dlp，只展开列表不解析每个视频；yt-dlp导入时会加载全部提取器，推迟到这里才导入
+            from yt_dlp import YoutubeDL
             
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                check=True
-            )
+            ydl_opts = {
+                'extract_flat': 'in_playlist',
+                'playlistend': limit,
+                'quiet': True,
+                'no_warnings': True,
+            }
+            with YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(self.channel_url, download=False)
             
-            # 解析输出，每行一个URL
-            video_urls = [url.strip() for url in result.stdout.split('\n') if url.strip()]
+            entries = list(self._iter_entries(info))[:limit]
+            video_urls = [entry['url'] for entry in entries]
+            self.video_ids.update((entry['url'], entry['id']) for entry in entries if entry.get('id'))
             
             print(f"✅ 成功获取 {len(video_urls)} 个视频URL")
             for i, url in enumerate(video_urls[:5], 1):
@@ -78,35 +100,33 @@ class RhinoFinanceProcessor:
                 
             return video_urls
             
-        except subprocess.CalledProcessError as e:
-            print(f"❌ 获取视频列表失败: {e}")
-            print(f"错误输出: {e.stderr}")
-            return []
         except Exception as e:
             print(f"❌ 获取视频列表时发生异常: {e}")
             return []
     
+    def _iter_entries(self, info: Optional[Dict[str, Any]]):
+        """遍历频道信息中的视频条目，频道主页按标签页(视频/直播等)嵌套时逐层展开"""
+        for entry in (info or {}).get('entries') or []:
+            if not entry:
+                continue
+            if entry.get('entries'):
+                yield from self._iter_entries(entry)
+            elif entry.get('url'):
+                yield entry
+    
     def extract_video_id(self, url: str) -> Optional[str]:
         """从YouTube URL中提取视频ID"""
-        try:
-            parsed = urlparse(url)
-            if 'youtube.com' in parsed.netloc:
-                if 'watch' in parsed.path:
-                    return parse_qs(parsed.query).get('v', [None])[0]
-                elif 'embed' in parsed.path:
-                    return parsed.path.split('/')[-1]
-            elif 'youtu.be' in parsed.netloc:
-                return parsed.path[1:]
-            return None
-        except Exception:
-            return None
+        match = _YT_ID_RE.search(url)
+        return match.group(1) if match else None
     
     def process_videos(
         self, 
         video_urls: List[str], 
         audio_format: str = "webm",
         video_format: str = "none",
-        model_size: str = "base"
+        model_size: str = "base",
+        use_batch: bool = False,
+        workers: int = 2
     ) -> List[Dict[str, Any]]:
         """
         批量处理视频列表
@@ -116,6 +136,9 @@ class RhinoFinanceProcessor:
             audio_format: 音频格式
             video_format: 视频格式
             model_size: Whisper模型大小
+            use_batch: 是否在全部转录完成后通过Gemini批量预测统一提取信息
+            workers: 并发处理的视频数，下载与转录分别受信号量限制；
+                默认2，转录当前视频的同时下载下一个视频
             
         Returns:
             处理结果列表
@@ -124,57 +147,31 @@ class RhinoFinanceProcessor:
         print(f"🎵 音频格式: {audio_format}")
         print(f"🎬 视频格式: {video_format}")
         print(f"🧠 模型大小: {model_size}")
+        print(f"👷 并发数: {workers}")
         
-        results = []
+        # 下载是I/O密集型，可适度并发；Whisper转录占用GPU，同一时间只跑一个
+        download_slots = threading.BoundedSemaphore(MAX_CONCURRENT_DOWNLOADS)
+        asr_slots = threading.BoundedSemaphore(1)
         
-        for i, url in enumerate(video_urls, 1):
-            print(f"\n{'='*60}")
-            print(f"🎬 处理第 {i}/{len(video_urls)} 个视频")
-            print(f"🔗 URL: {url}")
-            print(f"{'='*60}")
-            
-            try:
-                # 为每个视频生成唯一的文件名
-                video_id = self.extract_video_id(url)
-                filename = f"rhino_{video_id}" if video_id else f"rhino_video_{i:03d}"
-                
-                # 调用现有的处理函数
-                result = download_and_transcribe_youtube(
-                    youtube_url=url,
-                    output_dir=str(self.output_dir),
-                    filename=filename,
-                    audio_format=audio_format,
-                    video_format=video_format,
-                    model_size=model_size,
-                    language="auto",
-                    use_date_folder=True
-                )
-                
-                # 添加处理时间和序号
-                result['processed_at'] = datetime.now().isoformat()
-                result['video_index'] = i
-                result['video_id'] = video_id
-                
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor, \
+                open(self.progress_file, 'a', encoding='utf-8') as progress:
+            futures = {
+                executor.submit(
+                    self._process_one, i, len(video_urls), url, audio_format, video_format, model_size,
+                    use_batch, download_slots, asr_slots
+                ): (i, url)
+                for i, url in enumerate(video_urls, 1)
+            }
+            for future in as_completed(futures):
+                result = future.result()
                 results.append(result)
-                
-                if result['success']:
-                    print(f"✅ 第 {i} 个视频处理成功: {result.get('title', '未知标题')}")
-                else:
-                    print(f"❌ 第 {i} 个视频处理失败: {result.get('error', '未知错误')}")
-                    
-            except Exception as e:
-                print(f"❌ 处理第 {i} 个视频时发生异常: {e}")
-                results.append({
-                    'success': False,
-                    'error': str(e),
-                    'url': url,
-                    'video_index': i,
-                    'processed_at': datetime.now().isoformat()
-                })
-            
-            # 添加短暂延迟，避免请求过快
-            import time
-            time.sleep(2)
+                self._report_progress(progress, result, len(results), len(video_urls))
+        
+        results.sort(key=lambda r: r['video_index'])
+        
+        if use_batch:
+            self.extract_batch_info(results)
         
         print(f"\n🎉 批量处理完成!")
         success_count = sum(1 for r in results if r.get('success', False))
@@ -183,6 +180,124 @@ class RhinoFinanceProcessor:
         
         return results
     
+    def _process_one(
+        self,
+        i: int,
+        total: int,
+        url: str,
+        audio_format: str,
+        video_format: str,
+        model_size: str,
+        use_batch: bool,
+        download_slots: threading.BoundedSemaphore,
+        asr_slots: threading.BoundedSemaphore
+    ) -> Dict[str, Any]:
+        """
+        处理单个视频，异常时返回失败结果而不是抛出
+        
+        Returns:
+            处理结果
+        """
+        print(f"\n{'='*60}")
+        print(f"🎬 处理第 {i}/{total} 个视频")
+        print(f"🔗 URL: {url}")
+        print(f"{'='*60}")
+        
+        started = time.perf_counter()
+        try:
+            # 为每个视频生成唯一的文件名
+            video_id = self.video_ids.get(url) or self.extract_video_id(url)
+            filename = f"rhino_{video_id}" if video_id else f"rhino_video_{i:03d}"
+            
+            # 调用现有的处理函数
+            result = download_and_transcribe_youtube(
+                youtube_url=url,
+                output_dir=str(self.output_dir),
+                filename=filename,
+                audio_format=audio_format,
+                video_format=video_format,
+                model_size=model_size,
+                language="auto",
+                use_date_folder=True,
+                extract_info=not use_batch,
+                download_slots=download_slots,
+                asr_slots=asr_slots,
+                extractor=self.extractor,
+                asr_service=self.asr_service
+            )
+            
+            # 添加处理时间和序号
+            result['processed_at'] = datetime.now().isoformat()
+            result['video_index'] = i
+            result['video_id'] = video_id
+            result['elapsed_seconds'] = round(time.perf_counter() - started, 1)
+            
+            if result['success']:
+                print(f"✅ 第 {i} 个视频处理成功: {result.get('title', '未知标题')}")
+            else:
+                print(f"❌ 第 {i} 个视频处理失败: {result.get('error', '未知错误')}")
+            return result
+                
+        except Exception as e:
+            print(f"❌ 处理第 {i} 个视频时发生异常: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'url': url,
+                'video_index': i,
+                'elapsed_seconds': round(time.perf_counter() - started, 1),
+                'processed_at': datetime.now().isoformat()
+            }
+    
+    def _report_progress(self, progress, result: Dict[str, Any], done: int, total: int) -> None:
+        """
+        每完成一个视频输出一行进度摘要，并向JSONL进度文件追加一条完整记录，供外部监控读取
+        
+        Args:
+            progress: 已打开的进度文件
+            result: 该视频的处理结果
+            done: 已完成的视频数
+            total: 视频总数
+        """
+        status = "✓" if result.get('success') else "✗"
+        elapsed = result.get('elapsed_seconds', 0.0)
+        print(f"[{done}/{total}] {status} {result.get('title') or result.get('url', '')} ({elapsed:.1f}s)")
+        
+        record = {
+            'video_index': result.get('video_index'),
+            'video_id': result.get('video_id'),
+            'url': result.get('url'),
+            'title': result.get('title'),
+            'success': result.get('success', False),
+            'error': result.get('error'),
+            'elapsed_seconds': elapsed,
+            'processed_at': result.get('processed_at'),
+        }
+        progress.write(json.dumps(record, ensure_ascii=False) + "\n")
+        progress.flush()
+    
+    def extract_batch_info(self, results: List[Dict[str, Any]]) -> None:
+        """
+        对已转录但尚未提取信息的视频，统一提交Gemini批量预测并保存分析文件
+        
+        Args:
+            results: 处理结果列表，提取结果写回每项的key_info
+        """
+        pending = [r for r in results if r.get('success') and r.get('key_info') is None]
+        if not pending:
+            return
+        
+        print(f"\n📦 批量提取 {len(pending)} 个视频的关键信息...")
+        key_infos = self.extractor.extract_key_info_batch_job(
+            [(r['text'], r.get('title', '未知')) for r in pending]
+        )
+        
+        # 分析文件互相独立，交给后台线程并行写入
+        with ThreadPoolExecutor(max_workers=2) as io_pool:
+            for result, key_info in zip(pending, key_infos):
+                result['key_info'] = key_info
+                io_pool.submit(self.extractor.save_extracted_info, key_info, result['info_file'])
+    
     def save_batch_results(self, results: List[Dict[str, Any]]) -> str:
         """
         保存批量处理结果
@@ -205,8 +320,11 @@ class RhinoFinanceProcessor:
             'results': results
         }
         
-        with open(results_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        if ORJSON_AVAILABLE:
+            results_file.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(results_file, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
         
         print(f"💾 批量处理结果已保存: {results_file}")
         return str(results_file)
@@ -238,9 +356,9 @@ def main():
     )
     parser.add_argument(
         '--audio-format',
-        choices=['webm', 'mp3', 'm4a', 'wav'],
-        default='wav',
-        help='音频格式 (默认: wav)'
+        choices=['webm', 'mp3', 'm4a', 'opus', 'wav'],
+        default='webm',
+        help='音频格式 (默认: webm，即原始音频流不转码，Whisper直接解码)'
     )
     parser.add_argument(
         '--video-format',
@@ -254,6 +372,17 @@ def main():
         default='large',
         help='Whisper模型大小 (默认: large)'
     )
+    parser.add_argument(
+        '--use-batch',
+        action='store_true',
+        help='转录完成后通过Gemini批量预测统一提取信息 (约半价，需配置batch_gcs_uri)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=2,
+        help='并发处理的视频数，转录一个视频的同时下载下一个 (默认: 2)'
+    )
     
     args = parser.parse_args()
     
@@ -264,6 +393,8 @@ def main():
     print(f"🎵 音频格式: {args.audio_format}")
     print(f"🎬 视频格式: {args.video_format}")
     print(f"🧠 模型大小: {args.model}")
+    print(f"📦 批量预测: {'是' if args.use_batch else '否'}")
+    print(f"👷 并发数: {args.workers}")
     
     # 初始化处理器
     processor = RhinoFinanceProcessor(args.channel)
@@ -279,7 +410,9 @@ def main():
         video_urls=video_urls,
         audio_format=args.audio_format,
         video_format=args.video_format,
-        model_size=args.model
+        model_size=args.model,
+        use_batch=args.use_batch,
+        workers=args.workers
     )
     
     # 保存结果
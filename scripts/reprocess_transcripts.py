@@ -6,11 +6,22 @@
 
 import json
 import logging
+import os
 import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Iterator, List, Optional
 import argparse
 
+# 尝试导入orjson，用于快速序列化分析结果
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
@@ -22,19 +33,66 @@ from core.info_extractor import FinancialInfoExtractor
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 所有目录合计同时进行的LLM提取数的默认值，受LLM并发限制，不宜过大
+DEFAULT_WORKERS = 8
+
+# 同时处理的转录目录数；各目录的文件线程共享同一组提取名额，总并发不超过--workers
+MAX_CONCURRENT_DIRS = 4
+
+# 批量处理时转录文件名的前缀(见batch_channel)，提取标题时去掉
+_TITLE_PREFIX = 'rhino_'
+
+
+def _walk_for_transcription(root: Path) -> Iterator[Path]:
+    """
+    基于os.scandir迭代遍历目录树，产出名为transcription的目录
+    
+    transcription目录本身不再向下遍历，也不跟随符号链接
+    
+    Args:
+        root: 遍历的根目录
+        
+    Yields:
+        transcription目录路径
+    """
+    stack = [str(root)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    if entry.name == "transcription":
+                        yield Path(entry.path)
+                    else:
+                        stack.append(entry.path)
+        except OSError as e:
+            logger.warning(f"⚠️  无法读取目录 {current}: {e}")
+
+
+def _count_txt_files(directory: Path) -> int:
+    """统计目录下的.txt文件数"""
+    with os.scandir(directory) as entries:
+        return sum(1 for entry in entries if entry.name.endswith('.txt') and entry.is_file())
+
 
 class TranscriptionReprocessor:
     """转录文件重新处理器"""
     
-    def __init__(self, base_dir: str = "downloads"):
+    def __init__(self, base_dir: str = "downloads", max_workers: int = DEFAULT_WORKERS):
         """
         初始化重新处理器
         
         Args:
             base_dir: 下载目录的根路径
+            max_workers: 所有目录合计同时进行的LLM提取数上限
         """
         self.base_dir = Path(base_dir)
+        self.max_workers = max(1, max_workers)
         self.extractor = FinancialInfoExtractor()
+        # 多个目录并发处理时共享的提取名额，避免目录数×线程数的调用同时打到共享的Gemini客户端
+        self._extract_slots = threading.BoundedSemaphore(self.max_workers)
         
     def find_transcription_dirs(self) -> List[Path]:
         """
@@ -46,18 +104,17 @@ class TranscriptionReprocessor:
         transcription_dirs = []
         
         # 遍历所有可能的目录结构
-        for item in self.base_dir.rglob("transcription"):
-            if item.is_dir() and list(item.glob("*.txt")):
+        for item in _walk_for_transcription(self.base_dir):
+            txt_count = _count_txt_files(item)
+            if txt_count:
                 transcription_dirs.append(item)
+                logger.info(f"  - {item}: {txt_count} 个转录文件")
                 
         logger.info(f"📁 找到 {len(transcription_dirs)} 个转录目录")
-        for dir_path in transcription_dirs:
-            txt_count = len(list(dir_path.glob("*.txt")))
-            logger.info(f"  - {dir_path}: {txt_count} 个转录文件")
             
         return transcription_dirs
         
-    def process_transcription_dir(self, transcription_dir: Path, force_reprocess: bool = False) -> Dict[str, any]:
+    def process_transcription_dir(self, transcription_dir: Path, force_reprocess: bool = False) -> Counter:
         """
         处理单个转录目录中的所有文件
         
@@ -78,68 +135,95 @@ class TranscriptionReprocessor:
         txt_files = list(transcription_dir.glob("*.txt"))
         logger.info(f"📄 找到 {len(txt_files)} 个转录文件")
         
-        results = {
+        results = Counter({
             "total": len(txt_files),
             "processed": 0,
             "skipped": 0,
             "failed": 0,
             "success": 0
-        }
+        })
+        if not txt_files:
+            return results
         
-        for txt_file in txt_files:
-            try:
-                # 检查对应的分析文件是否已存在
-                analysis_file = analysis_dir / f"{txt_file.stem}_analysis.json"
-                
-                if analysis_file.exists() and not force_reprocess:
-                    logger.info(f"⏭️  跳过已存在的分析文件: {analysis_file.name}")
-                    results["skipped"] += 1
-                    continue
-                
-                logger.info(f"🔄 处理转录文件: {txt_file.name}")
+        # 读文件、LLM调用与写分析文件都是I/O等待，多个文件并发处理
+        workers = min(self.max_workers, len(txt_files))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._process_one, txt_file, analysis_dir, force_reprocess): txt_file
+                for txt_file in txt_files
+            }
+            for future in as_completed(futures):
+                status = future.result()
+                results[status] += 1
+                if status != "skipped":
+                    results["processed"] += 1
+                done = sum(results[key] for key in ("success", "skipped", "failed"))
+                logger.info(f"📈 进度: {done}/{len(txt_files)} ({futures[future].name}: {status})")
                 
-                # 读取转录内容
-                with open(txt_file, 'r', encoding='utf-8') as f:
-                    transcription_text = f.read().strip()
-                
-                if not transcription_text:
-                    logger.warning(f"⚠️  转录文件为空: {txt_file.name}")
-                    results["failed"] += 1
-                    continue
-                
-                # 从文件名提取视频标题（如果可能）
-                video_title = self._extract_title_from_filename(txt_file.name)
-                
-                logger.info(f"📝 开始提取信息，转录文本长度: {len(transcription_text)} 字符")
-                
-                # 调用信息提取
+        return results
+    
+    def _process_one(self, txt_file: Path, analysis_dir: Path, force_reprocess: bool) -> str:
+        """
+        处理单个转录文件，异常时记录日志而不是抛出
+        
+        Args:
+            txt_file: 转录文件路径
+            analysis_dir: 分析结果目录
+            force_reprocess: 是否强制重新处理已存在的分析文件
+            
+        Returns:
+            处理状态: "success"、"skipped" 或 "failed"
+        """
+        try:
+            # 检查对应的分析文件是否已存在
+            analysis_file = analysis_dir / f"{txt_file.stem}_analysis.json"
+            
+            if analysis_file.exists() and not force_reprocess:
+                logger.info(f"⏭️  跳过已存在的分析文件: {analysis_file.name}")
+                return "skipped"
+            
+            logger.info(f"🔄 处理转录文件: {txt_file.name}")
+            
+            # 读取转录内容(按字节读取后一次解码，不做文本模式的换行符转换；整段文本都要放进prompt，不做流式读取)
+            transcription_text = txt_file.read_bytes().decode('utf-8').strip()
+            
+            if not transcription_text:
+                logger.warning(f"⚠️  转录文件为空: {txt_file.name}")
+                return "failed"
+            
+            # 从文件名提取视频标题（如果可能）
+            video_title = self._extract_title_from_filename(txt_file.name)
+            
+            logger.info(f"📝 开始提取信息，转录文本长度: {len(transcription_text)} 字符")
+            
+            # 调用信息提取(各线程共享同一个提取器及其Gemini客户端，并发数受全局名额限制)
+            with self._extract_slots:
                 extracted_info = self.extractor.extract_key_info(
                     transcription_text=transcription_text,
                     video_title=video_title
                 )
-                
-                # 保存分析结果
+            
+            # 保存分析结果
+            if ORJSON_AVAILABLE:
+                analysis_file.write_bytes(orjson.dumps(extracted_info, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
                 with open(analysis_file, 'w', encoding='utf-8') as f:
                     json.dump(extracted_info, f, ensure_ascii=False, indent=2)
+            
+            logger.info(f"✅ 成功保存分析结果: {analysis_file.name}")
+            logger.info(f"📊 提取方法: {extracted_info.get('extraction_method', 'unknown')}")
+            
+            if "tokens_used" in extracted_info:
+                logger.info(f"💰 使用tokens: {extracted_info['tokens_used']}")
                 
-                logger.info(f"✅ 成功保存分析结果: {analysis_file.name}")
-                logger.info(f"📊 提取方法: {extracted_info.get('extraction_method', 'unknown')}")
-                
-                if "tokens_used" in extracted_info:
-                    logger.info(f"💰 使用tokens: {extracted_info['tokens_used']}")
-                    
-                if "attempts_used" in extracted_info:
-                    logger.info(f"🔄 重试次数: {extracted_info['attempts_used']}")
-                
-                results["success"] += 1
-                results["processed"] += 1
-                
-            except Exception as e:
-                logger.error(f"❌ 处理失败 {txt_file.name}: {e}")
-                results["failed"] += 1
-                results["processed"] += 1
-                
-        return results
+            if "attempts_used" in extracted_info:
+                logger.info(f"🔄 重试次数: {extracted_info['attempts_used']}")
+            
+            return "success"
+            
+        except Exception as e:
+            logger.error(f"❌ 处理失败 {txt_file.name}: {e}")
+            return "failed"
     
     def _extract_title_from_filename(self, filename: str) -> str:
         """
@@ -151,10 +235,10 @@ class TranscriptionReprocessor:
         Returns:
             提取的标题
         """
-        # 移除扩展名和前缀
-        base_name = filename.replace('.txt', '')
-        if base_name.startswith('rhino_'):
-            base_name = base_name[6:]  # 移除 'rhino_' 前缀
+        # 移除扩展名和前缀(只去掉末尾扩展名；项目要求Python 3.8，不使用str.removeprefix)
+        base_name = Path(filename).stem
+        if base_name.startswith(_TITLE_PREFIX):
+            base_name = base_name[len(_TITLE_PREFIX):]
             
         # 使用视频ID作为标题（如果需要更智能的标题提取，可以后续改进）
         return f"Rhino Finance Video - {base_name}"
@@ -193,29 +277,34 @@ class TranscriptionReprocessor:
             logger.warning("⚠️  未找到任何转录目录")
             return
         
-        total_stats = {
+        total_stats = Counter({
             "total": 0,
             "processed": 0,
             "skipped": 0,
             "failed": 0,
             "success": 0
-        }
+        })
         
-        # 处理每个目录
-        for transcription_dir in dirs_to_process:
-            try:
-                stats = self.process_transcription_dir(transcription_dir, force_reprocess)
-                
-                # 累计统计
-                for key in total_stats:
-                    total_stats[key] += stats[key]
+        # 多个日期目录并发处理，统计在主线程汇总
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_DIRS, len(dirs_to_process))) as executor:
+            futures = {
+                executor.submit(self.process_transcription_dir, transcription_dir, force_reprocess): transcription_dir
+                for transcription_dir in dirs_to_process
+            }
+            for future in as_completed(futures):
+                transcription_dir = futures[future]
+                try:
+                    stats = future.result()
                     
-                logger.info(f"📊 目录处理完成 {transcription_dir}:")
-                logger.info(f"   总计: {stats['total']}, 成功: {stats['success']}, "
-                          f"跳过: {stats['skipped']}, 失败: {stats['failed']}")
-                          
-            except Exception as e:
-                logger.error(f"❌ 处理目录失败 {transcription_dir}: {e}")
+                    # 累计统计(update保留计数为0的键，+=会丢弃)
+                    total_stats.update(stats)
+                        
+                    logger.info(f"📊 目录处理完成 {transcription_dir}:")
+                    logger.info(f"   总计: {stats['total']}, 成功: {stats['success']}, "
+                              f"跳过: {stats['skipped']}, 失败: {stats['failed']}")
+                              
+                except Exception as e:
+                    logger.error(f"❌ 处理目录失败 {transcription_dir}: {e}")
         
         # 输出总体统计
         logger.info("🎉 全部处理完成!")
@@ -270,11 +359,18 @@ def main():
         help='基础下载目录路径 (默认: downloads)'
     )
     
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f'所有目录合计并发提取的文件数 (默认: {DEFAULT_WORKERS})'
+    )
+    
     args = parser.parse_args()
     
     try:
         # 创建重新处理器
-        reprocessor = TranscriptionReprocessor(base_dir=args.base_dir)
+        reprocessor = TranscriptionReprocessor(base_dir=args.base_dir, max_workers=args.workers)
         
         # 开始处理
         reprocessor.reprocess_all(
@@ -285,9 +381,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("🛑 用户中断处理")
     except Exception as e:
-        logger.error(f"❌ 处理过程中发生错误: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ 处理过程中发生错误: {e}")
 
 
 if __name__ == "__main__":
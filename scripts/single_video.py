@@ -3,8 +3,11 @@ YouTube音频下载和转录主程序
 整合youtube_downloader和asr_service功能
 """
 
+import os
 import sys
+import shutil
 import argparse
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional
@@ -15,9 +18,35 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from core.youtube_downloader import YouTubeDownloader
-from core.asr_service import WhisperASR, WHISPER_AVAILABLE
+from core.asr_service import WhisperASR, WHISPER_AVAILABLE, PREPARED_AUDIO_SUFFIX
 from core.info_extractor import FinancialInfoExtractor
 
+# 下载器可能产出的音频文件后缀
+AUDIO_SUFFIXES = frozenset({'.webm', '.mp3', '.m4a', '.opus', '.wav', '.flac'})
+
+
+def _find_audio_file(directory: Path, filename: Optional[str]) -> Optional[Path]:
+    """
+    在目录中查找下载的音频文件(跳过转录用的16kHz WAV)，找到第一个即返回
+
+    Args:
+        directory: 音频目录
+        filename: 下载时指定的文件名(不含扩展名)，为None时匹配任意文件
+
+    Returns:
+        音频文件路径，找不到时返回None
+    """
+    prefix = f"{filename}." if filename else ""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if (name.startswith(prefix)
+                    and not name.endswith(PREPARED_AUDIO_SUFFIX)
+                    and os.path.splitext(name)[1].lower() in AUDIO_SUFFIXES
+                    and entry.is_file()):
+                return Path(entry.path)
+    return None
+
 
 def download_and_transcribe_youtube(
     youtube_url: str,
@@ -28,6 +57,11 @@ def download_and_transcribe_youtube(
     model_size: str = "base",
     language: str = "auto",
     use_date_folder: bool = True,
+    extract_info: bool = True,
+    download_slots=None,
+    asr_slots=None,
+    extractor: Optional[FinancialInfoExtractor] = None,
+    asr_service: Optional[WhisperASR] = None,
     **whisper_kwargs
 ) -> Dict[str, Any]:
     """
@@ -41,6 +75,11 @@ def download_and_transcribe_youtube(
         video_format: 视频格式 ("mp4", "webm", "mkv", "none")，'none'表示不下载视频
         model_size: Whisper模型大小 ("tiny", "base", "small", "medium", "large")
         language: 语言设置 ("auto", "zh", "en", "zh-en")
+        extract_info: 是否立即提取关键财经信息，为False时由调用方稍后提取(如批量预测)
+        download_slots: 可选的信号量，并发处理时限制同时进行的下载数
+        asr_slots: 可选的信号量，并发处理时限制同时进行的转录数(GPU显存有限)
+        extractor: 可选的共享信息提取器，批量处理时复用同一个Gemini客户端，为None时新建
+        asr_service: 可选的共享ASR服务，批量处理时复用已加载的Whisper模型，为None时新建
         **whisper_kwargs: Whisper的额外参数
         
     Returns:
@@ -90,7 +129,8 @@ def download_and_transcribe_youtube(
             video_output_dir = Path(final_output_dir) / 'video'
         
         video_downloader = YouTubeDownloader(str(video_output_dir))
-        video_download_result = video_downloader.download_video(youtube_url, filename, video_format)
+        with download_slots or nullcontext():
+            video_download_result = video_downloader.download_video(youtube_url, filename, video_format)
         
         if video_download_result['success']:
             print(f"✅ 视频下载成功: {video_download_result['title']}")
@@ -109,7 +149,8 @@ def download_and_transcribe_youtube(
         audio_output_dir = Path(final_output_dir) / 'audio'
     
     audio_downloader = YouTubeDownloader(str(audio_output_dir))
-    download_result = audio_downloader.download_audio(youtube_url, filename, audio_format)
+    with download_slots or nullcontext():
+        download_result = audio_downloader.download_audio(youtube_url, filename, audio_format)
     
     if not download_result['success']:
         return {
@@ -122,14 +163,12 @@ def download_and_transcribe_youtube(
     
     print(f"✅ 音频下载成功: {download_result['title']}")
     
-    # 步骤3: 查找下载的音频文件
-    audio_files = list(audio_downloader.download_dir.glob(f"{filename or '*'}.*"))
+    # 步骤3: 查找下载的音频文件，优先使用下载器返回的实际路径
     audio_file = None
-    
-    for file in audio_files:
-        if file.suffix.lower() in ['.webm', '.mp3', '.m4a', '.wav', '.flac']:
-            audio_file = file
-            break
+    if download_result.get('filepath') and Path(download_result['filepath']).exists():
+        audio_file = Path(download_result['filepath'])
+    else:
+        audio_file = _find_audio_file(audio_downloader.download_dir, filename)
     
     if audio_file is None:
         return {
@@ -144,10 +183,12 @@ def download_and_transcribe_youtube(
     
     # 步骤4: 初始化ASR服务并转录
     print("🎤 开始语音转录...")
-    asr_service = WhisperASR()
-    transcription_result = asr_service.transcribe_audio(
-        str(audio_file), model_size, language, **whisper_kwargs
-    )
+    if asr_service is None:
+        asr_service = WhisperASR()
+    with asr_slots or nullcontext():
+        transcription_result = asr_service.transcribe_audio(
+            str(audio_file), model_size, language, **whisper_kwargs
+        )
     
     if not transcription_result['success']:
         return {
@@ -167,7 +208,8 @@ def download_and_transcribe_youtube(
         audio_subdir = date_output_dir / "audio"
         new_audio_path = audio_subdir / audio_file.name
         if audio_file != new_audio_path:
-            audio_file.rename(new_audio_path)
+            # shutil.move同文件系统时为原子重命名，跨文件系统时回退为复制+删除
+            shutil.move(str(audio_file), str(new_audio_path))
             audio_file = new_audio_path
         
         # 转录文件保存到transcription子目录
@@ -177,29 +219,34 @@ def download_and_transcribe_youtube(
         text_file = audio_file.with_suffix('.txt')
     
     try:
-        with open(text_file, 'w', encoding='utf-8') as f:
-            f.write(transcription_result['text'])
+        # 一次性编码后按字节写入，不经过文本层的增量编码
+        text_file.write_bytes(transcription_result['text'].encode('utf-8'))
         print(f"💾 转录文本已保存到: {text_file}")
         transcription_result['text_file'] = str(text_file)
     except Exception as e:
         print(f"⚠️ 保存转录文本失败: {e}")
     
     # 步骤6: 提取关键财经信息
-    print("🤖 开始提取关键财经信息...")
-    extractor = FinancialInfoExtractor()
-    key_info = extractor.extract_key_info(
-        transcription_text=transcription_result['text'],
-        video_title=download_result.get('title', '未知')
-    )
-    
-    # 保存提取信息到JSON文件
     if use_date_folder:
         analysis_subdir = date_output_dir / "analysis"
         info_file = analysis_subdir / f"{audio_file.stem}_analysis.json"
     else:
         info_file = audio_file.with_suffix('.json')
     
-    extractor.save_extracted_info(key_info, str(info_file))
+    key_info = None
+    if extract_info:
+        print("🤖 开始提取关键财经信息...")
+        if extractor is None:
+            extractor = FinancialInfoExtractor()
+        key_info = extractor.extract_key_info(
+            transcription_text=transcription_result['text'],
+            video_title=download_result.get('title', '未知')
+        )
+        
+        # 保存提取信息到JSON文件
+        extractor.save_extracted_info(key_info, str(info_file))
+    else:
+        print("📝 跳过信息提取 (稍后批量提取)")
     
     # 步骤7: 打印转录内容和关键信息
     print("\n" + "="*50)
@@ -208,36 +255,38 @@ def download_and_transcribe_youtube(
     print(transcription_result['text'])
     print("="*50)
     
-    # 打印关键信息摘要
-    print("\n" + "="*50)
-    print("📊 关键信息摘要:")
-    print("="*50)
-    
-    if key_info.get('summary'):
-        print(f"📋 内容概要: {key_info['summary']}")
-    
-    if key_info.get('stock_analysis'):
-        print("\n📈 个股分析:")
-        for stock in key_info['stock_analysis']:
-            print(f"  🏢 {stock.get('symbol', 'N/A')}: {stock.get('company_name', 'N/A')}")
-            if stock.get('key_points'):
-                for point in stock['key_points'][:2]:  # 显示前2个要点
-                    print(f"    • {point}")
-    
-    if key_info.get('macroeconomic_data'):
-        print("\n🌍 宏观数据:")
-        for data in key_info['macroeconomic_data'][:3]:  # 显示前3个
-            print(f"  📊 {data.get('indicator', 'N/A')}: {data.get('value', 'N/A')}")
-    
-    if key_info.get('investment_advice'):
-        print("\n💡 投资建议:")
-        for advice in key_info['investment_advice'][:3]:  # 显示前3个
-            print(f"  • {advice}")
-    
-    print("="*50)
-    print(f"💾 详细分析已保存至: {info_file}")
+    if key_info is not None:
+        # 打印关键信息摘要
+        print("\n" + "="*50)
+        print("📊 关键信息摘要:")
+        print("="*50)
+        
+        if key_info.get('summary'):
+            print(f"📋 内容概要: {key_info['summary']}")
+        
+        if key_info.get('stock_analysis'):
+            print("\n📈 个股分析:")
+            for stock in key_info['stock_analysis']:
+                print(f"  🏢 {stock.get('symbol', 'N/A')}: {stock.get('company_name', 'N/A')}")
+                if stock.get('key_points'):
+                    for point in stock['key_points'][:2]:  # 显示前2个要点
+                        print(f"    • {point}")
+        
+        if key_info.get('macroeconomic_data'):
+            print("\n🌍 宏观数据:")
+            for data in key_info['macroeconomic_data'][:3]:  # 显示前3个
+                print(f"  📊 {data.get('indicator', 'N/A')}: {data.get('actual_value', 'N/A')}")
+        
+        if key_info.get('investment_advice'):
+            print("\n💡 投资建议:")
+            for advice in key_info['investment_advice'][:3]:  # 显示前3个
+                print(f"  • {advice.get('advice', 'N/A')}")
+        
+        print("="*50)
+        print(f"💾 详细分析已保存至: {info_file}")
     
-    # 返回综合结果
+    # 返回综合结果：转录文本只在顶层保留一份，不再内嵌完整的transcription_result，
+    # 避免批量结果常驻内存和写入batch_results时重复保存整段文本
     result = {
         'success': True,
         'title': download_result.get('title', '未知'),
@@ -252,14 +301,19 @@ def download_and_transcribe_youtube(
         'service': 'whisper',
         'download_result': download_result,
         'video_download_result': video_download_result,
-        'transcription_result': transcription_result,
         'key_info': key_info,
         'info_file': str(info_file),
         'message': f"成功下载、转录并分析: {download_result.get('title', '未知')}"
     }
     
+    # 请求了分段时间戳时单独保留分段
+    if transcription_result.get('segments'):
+        result['segments'] = transcription_result['segments']
+    
     # 添加视频文件信息（如果下载了视频）
-    if video_download_result and video_download_result.get('success'):
+    if video_download_result and video_download_result.get('filepath'):
+        result['video_file'] = video_download_result['filepath']
+    elif video_download_result and video_download_result.get('success'):
         # 查找下载的视频文件
         if use_date_folder:
             video_dir = date_output_dir / 'video'
@@ -303,9 +357,9 @@ def main():
     )
     parser.add_argument(
         '--audio-format', 
-        choices=['webm', 'mp3', 'm4a', 'wav'], 
-        default='wav',
-        help='音频格式 (默认: wav)'
+        choices=['webm', 'mp3', 'm4a', 'opus', 'wav'], 
+        default='webm',
+        help='音频格式 (默认: webm，即原始音频流不转码，Whisper直接解码)'
     )
     parser.add_argument(
         '--video-format', 
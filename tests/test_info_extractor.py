@@ -0,0 +1,76 @@
+"""
+info_extractor纯函数单元测试：截断JSON补全与长文本切分
+"""
+
+import json
+import unittest
+
+from core.info_extractor import _balance_truncated_json, _split_text
+from core.rate_limiter import estimate_tokens
+
+
+class BalanceTruncatedJsonTest(unittest.TestCase):
+    """_balance_truncated_json回退到最后一个完整成员并补齐括号"""
+
+    def test_complete_object_is_returned_unchanged(self):
+        text = 'prefix {"a": [1, 2], "b": {"c": "d"}} suffix'
+        self.assertEqual(_balance_truncated_json(text), '{"a": [1, 2], "b": {"c": "d"}}')
+
+    def test_truncated_array_keeps_complete_members(self):
+        result = _balance_truncated_json('{"a": [1, 2, 3')
+        self.assertEqual(json.loads(result), {"a": [1, 2]})
+
+    def test_truncated_string_member_is_dropped(self):
+        result = _balance_truncated_json('{"a": 1, "b": "tru')
+        self.assertEqual(json.loads(result), {"a": 1})
+
+    def test_nested_objects_are_closed_in_order(self):
+        result = _balance_truncated_json('{"stock_analysis": [{"symbol": "AAPL"}, {"symbol": "TS')
+        self.assertEqual(json.loads(result), {"stock_analysis": [{"symbol": "AAPL"}]})
+
+    def test_brackets_inside_strings_are_ignored(self):
+        result = _balance_truncated_json('{"a": "x}]\\"{", "b": [')
+        self.assertEqual(json.loads(result), {"a": 'x}]"{'})
+
+    def test_no_object_returns_none(self):
+        self.assertIsNone(_balance_truncated_json("no json here"))
+
+    def test_no_safe_point_returns_none(self):
+        self.assertIsNone(_balance_truncated_json('{"a": "unterminated'))
+
+
+class SplitTextTest(unittest.TestCase):
+    """_split_text按句子边界切块，且不丢失、不重复内容"""
+
+    def test_empty_text(self):
+        self.assertEqual(_split_text("", 100), [])
+
+    def test_short_text_is_single_chunk(self):
+        text = "美股今天上涨。纳指创新高！"
+        self.assertEqual(_split_text(text, 100), [text])
+
+    def test_chunks_respect_limit_and_sentence_boundaries(self):
+        # 纯中文句子的估算token数可逐句累加，块的估算值与切分时的累计值一致
+        text = "美股今天继续上涨，纳指创下新高。" * 200
+        chunks = _split_text(text, 50)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), text)
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 50)
+            self.assertTrue(chunk.endswith("。"))
+
+    def test_long_sentence_without_punctuation_is_hard_split(self):
+        text = "涨" * 1000
+        chunks = _split_text(text, 100)
+        self.assertEqual("".join(chunks), text)
+        self.assertTrue(all(estimate_tokens(chunk) <= 100 for chunk in chunks))
+
+    def test_english_sentences(self):
+        text = "The Fed held rates. " * 100
+        chunks = _split_text(text, 20)
+        self.assertEqual("".join(chunks), text)
+        self.assertTrue(all(estimate_tokens(chunk) <= 20 for chunk in chunks))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+rate_limiter单元测试：令牌估算与令牌桶的预约/等待逻辑
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+from core.rate_limiter import TokenBucket, estimate_tokens
+
+
+class EstimateTokensTest(unittest.TestCase):
+    """estimate_tokens的粗略估算规则"""
+
+    def test_cjk_counts_one_token_per_char(self):
+        self.assertEqual(estimate_tokens("美联储加息"), 5)
+
+    def test_latin_counts_four_chars_per_token(self):
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+
+    def test_mixed_text(self):
+        self.assertEqual(estimate_tokens("买入AAPL"), 2 + 1)
+
+    def test_empty_text(self):
+        self.assertEqual(estimate_tokens(""), 0)
+
+
+class TokenBucketTest(unittest.TestCase):
+    """令牌桶测试，固定time.monotonic使结果可重复"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("core.rate_limiter.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_bucket_does_not_wait(self):
+        bucket = TokenBucket(rate_per_minute=60)
+        for _ in range(60):
+            self.assertEqual(bucket._reserve(1), 0.0)
+
+    def test_empty_bucket_waits_for_refill(self):
+        bucket = TokenBucket(rate_per_minute=60, capacity=1)
+        self.assertEqual(bucket._reserve(1), 0.0)
+        self.assertAlmostEqual(bucket._reserve(1), 1.0)
+        # 预约可使余额为负，后来者排在前一个预约之后
+        self.assertAlmostEqual(bucket._reserve(1), 2.0)
+
+    def test_refill_is_capped_at_capacity(self):
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+        bucket._reserve(2)
+        self.now += 3600
+        self.assertEqual(bucket._reserve(2), 0.0)
+        self.assertAlmostEqual(bucket._reserve(1), 1.0)
+
+    def test_amount_above_capacity_is_capped(self):
+        bucket = TokenBucket(rate_per_minute=60, capacity=10)
+        self.assertEqual(bucket._reserve(1000), 0.0)
+        self.assertAlmostEqual(bucket._reserve(1), 1.0)
+
+    def test_concurrent_reservations_queue_in_order(self):
+        bucket = TokenBucket(rate_per_minute=60, capacity=5)
+        waits = []
+        waits_lock = threading.Lock()
+
+        def _worker():
+            wait = bucket._reserve(1)
+            with waits_lock:
+                waits.append(wait)
+
+        threads = [threading.Thread(target=_worker) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 锁内扣减保证每个预约各得到一个不同的排队位置
+        expected = [max(0.0, float(k - 5)) for k in range(1, 21)]
+        self.assertEqual(sorted(round(wait, 6) for wait in waits), expected)
+
+    def test_acquire_sleeps_for_reserved_wait(self):
+        bucket = TokenBucket(rate_per_minute=60, capacity=1)
+        with mock.patch("core.rate_limiter.time.sleep") as sleep:
+            self.assertEqual(bucket.acquire(), 0.0)
+            sleep.assert_not_called()
+            self.assertAlmostEqual(bucket.acquire(), 1.0)
+            sleep.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
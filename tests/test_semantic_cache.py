@@ -0,0 +1,80 @@
+"""
+SemanticCache单元测试：TTL过期与JSONL文件的清理重写
+"""
+
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from core.semantic_cache import NUMPY_AVAILABLE
+
+if NUMPY_AVAILABLE:
+    from core.semantic_cache import SemanticCache
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "语义缓存需要numpy")
+class SemanticCacheTest(unittest.TestCase):
+    """语义缓存的加载、过期与命中"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.cache_dir = Path(self._tmp.name)
+        self.cache_file = self.cache_dir / "entries.jsonl"
+
+    def _write_lines(self, lines):
+        self.cache_file.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+
+    @staticmethod
+    def _entry(embedding, result, created_at):
+        return json.dumps({"embedding": embedding, "result": result, "created_at": created_at})
+
+    def test_expired_and_invalid_lines_are_removed_on_load(self):
+        now = time.time()
+        fresh = self._entry([0.0, 1.0], {"id": "fresh"}, now)
+        self._write_lines([
+            self._entry([1.0, 0.0], {"id": "expired"}, now - 1000),
+            fresh,
+            "not json",
+        ])
+
+        cache = SemanticCache(str(self.cache_dir), ttl_seconds=100)
+
+        self.assertEqual(cache._results, [{"id": "fresh"}])
+        self.assertEqual(self.cache_file.read_text(encoding="utf-8"), fresh + "\n")
+
+    def test_file_is_not_rewritten_when_nothing_expired(self):
+        lines = [self._entry([1.0, 0.0], {"id": "a"}, time.time())]
+        self._write_lines(lines)
+        before = self.cache_file.stat().st_mtime_ns
+
+        SemanticCache(str(self.cache_dir), ttl_seconds=100)
+
+        self.assertEqual(self.cache_file.stat().st_mtime_ns, before)
+
+    def test_entries_without_ttl_never_expire(self):
+        self._write_lines([self._entry([1.0, 0.0], {"id": "old"}, 0.0)])
+        cache = SemanticCache(str(self.cache_dir))
+        self.assertEqual(cache._results, [{"id": "old"}])
+
+    def test_add_persists_and_lookup_respects_threshold(self):
+        cache = SemanticCache(str(self.cache_dir), threshold=0.9)
+        cache.add([1.0, 0.0], {"id": "a"})
+
+        self.assertEqual(cache.lookup([0.99, 0.05]), {"id": "a"})
+        self.assertIsNone(cache.lookup([0.0, 1.0]))
+
+        reloaded = SemanticCache(str(self.cache_dir), threshold=0.9)
+        self.assertEqual(reloaded.lookup([1.0, 0.0]), {"id": "a"})
+
+    def test_lookup_skips_entries_expired_after_load(self):
+        cache = SemanticCache(str(self.cache_dir), threshold=0.5, ttl_seconds=100)
+        cache.add([1.0, 0.0], {"id": "a"})
+        cache._created_at[0] -= 1000
+        self.assertIsNone(cache.lookup([1.0, 0.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
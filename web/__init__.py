@@ -3,8 +3,24 @@ Web展示模块
 包含Web仪表板和分析结果汇总功能
 """
 
-from web.analyzer import FinancialAnalyzer
-from web.web_dashboard import FinanceDashboard
+import importlib
+
+# 名称 -> 所在模块。仪表板依赖Flask，首次访问对应名称时才导入，
+# 只用到分析器的命令行入口不必加载Web框架
+_LAZY_EXPORTS = {
+    'FinancialAnalyzer': 'web.analyzer',
+    'FinanceDashboard': 'web.web_dashboard',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     'FinancialAnalyzer',
@@ -5,12 +5,92 @@
 
 import json
 import os
+import sys
+import logging
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+from collections import Counter
+from itertools import groupby, islice
+from concurrent.futures import ThreadPoolExecutor
 import re
 
+logger = logging.getLogger(__name__)
+
+# 尝试导入orjson，用于快速解析和序列化JSON
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# orjson直接解析bytes，省去Python层的UTF-8解码
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# 并发加载分析文件的线程数
+LOAD_MAX_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+# 买入信号关键词 - 更全面的关键词
+BUY_KEYWORDS = (
+    '买入', '建议买入', '逢低买入', '增持', '建议增持', 'buy', 'long', 
+    '看好', '建议关注', '加仓', '建议加仓', '积极', '强烈推荐', 
+    '上涨', '看涨', '建议持有并适度加仓', '强势', '重回上攻'
+)
+
+# 卖出信号关键词
+SELL_KEYWORDS = (
+    '卖出', '建议卖出', '减持', '建议减持', 'sell', 'short', 
+    '看空', '谨慎', '减仓', '不建议', '超买', '不宜追高',
+    '获利了结', '止盈', '规避风险', '破位下行'
+)
+
+# 持有信号关键词
+HOLD_KEYWORDS = (
+    '持有', '维持', 'hold', '长线持有', '保持', '继续持有',
+    '稳健', '维持仓位', '不变', '波段'
+)
+
+# 观望信号关键词
+WATCH_KEYWORDS = (
+    '观望', '等待', '暂时观望', '谨慎观望', '静观其变', 
+    '等待时机', '暂不操作', '关注', '跟踪'
+)
+
+# 每类关键词预编译为一个交替正则，按优先级排列，一次扫描判断一类信号
+_ACTION_PATTERNS = [
+    (action, re.compile('|'.join(map(re.escape, keywords))))
+    for action, keywords in (
+        ('买入', BUY_KEYWORDS),
+        ('卖出', SELL_KEYWORDS),
+        ('持有', HOLD_KEYWORDS),
+        ('观望', WATCH_KEYWORDS),
+    )
+]
+
+# 日期目录名，格式为YYYY-MM-DD
+_DATE_DIR_RE = re.compile(r'\d{4}-\d{2}-\d{2}$')
+
+# 批量结果文件名中的时间戳，格式与batch_channel.save_batch_results一致，字典序即时间顺序
+_BATCH_TIMESTAMP_RE = re.compile(r'batch_results_(\d{8}_\d{6})\.json$')
+
+
+def _batch_file_sort_key(entry: os.DirEntry) -> Tuple[str, float]:
+    """批量结果文件的新旧排序键：优先使用文件名时间戳，无法解析时才读取修改时间"""
+    match = _BATCH_TIMESTAMP_RE.match(entry.name)
+    if match:
+        return match.group(1), 0.0
+    return '', entry.stat().st_mtime
+
+
+def _first_nonempty(data: Dict[str, Any], *keys: str) -> Any:
+    """按顺序返回第一个非空字段的值，都为空时返回空列表"""
+    for key in keys:
+        value = data.get(key)
+        if value:
+            return value
+    return []
+
+
 class FinancialAnalyzer:
     """财经分析结果处理器"""
     
@@ -26,8 +106,8 @@ class FinancialAnalyzer:
         else:
             self.data_dir = Path(data_dir)
         
-        print(f"📊 初始化财经分析器")
-        print(f"📁 数据目录: {self.data_dir}")
+        logger.info(f"📊 初始化财经分析器")
+        logger.info(f"📁 数据目录: {self.data_dir}")
     
     def load_batch_results(self, results_file: str = None) -> Dict[str, Any]:
         """
@@ -41,19 +121,66 @@ class FinancialAnalyzer:
         """
         if results_file is None:
             # 查找最新的批量结果文件
-            batch_files = list(self.data_dir.glob("batch_results_*.json"))
+            with os.scandir(self.data_dir) as it:
+                batch_files = [entry for entry in it
+                               if entry.name.startswith("batch_results_") and entry.name.endswith(".json")]
             if not batch_files:
                 raise FileNotFoundError("未找到批量处理结果文件")
             
-            # 按时间排序，获取最新的
-            batch_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-            results_file = batch_files[0]
-            print(f"📄 加载最新批量结果: {results_file.name}")
+            # 单次遍历取最新的，文件名带时间戳时无需stat
+            latest = max(batch_files, key=_batch_file_sort_key)
+            results_file = Path(latest.path)
+            logger.info(f"📄 加载最新批量结果: {results_file.name}")
         else:
             results_file = Path(results_file)
         
-        with open(results_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(results_file, 'rb') as f:
+            return _json_loads(f.read())
+    
+    def _iter_analysis_files(self, verbose: bool = True):
+        """
+        遍历所有日期目录下analysis子目录中的JSON文件
+        
+        使用os.scandir，目录项类型来自DirEntry缓存，不必对每个条目再做stat
+        
+        Args:
+            verbose: 是否打印正在处理的日期
+            
+        Returns:
+            (日期, 文件名, 文件路径) 元组的生成器
+        """
+        with os.scandir(self.data_dir) as it:
+            for entry in it:
+                if not entry.is_dir(follow_symlinks=False) or not _DATE_DIR_RE.match(entry.name):
+                    continue
+                
+                try:
+                    with os.scandir(os.path.join(entry.path, 'analysis')) as sub_it:
+                        if verbose:
+                            logger.info(f"📅 处理日期: {entry.name}")
+                        for sub in sub_it:
+                            if sub.name.endswith('.json') and sub.is_file():
+                                yield entry.name, sub.name, sub.path
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+    
+    def data_signature(self) -> Tuple[int, int, int]:
+        """
+        计算分析文件的轻量签名，只stat不读取内容，用于判断数据是否有变化
+        
+        Returns:
+            (文件数, 最新修改时间(纳秒), 总字节数)
+        """
+        count = latest_mtime = total_size = 0
+        for _, _, file_path in self._iter_analysis_files(verbose=False):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            count += 1
+            latest_mtime = max(latest_mtime, stat.st_mtime_ns)
+            total_size += stat.st_size
+        return count, latest_mtime, total_size
     
     def collect_all_analysis_data(self) -> List[Dict[str, Any]]:
         """
@@ -62,40 +189,41 @@ class FinancialAnalyzer:
         Returns:
             所有分析结果的列表
         """
-        print("🔍 收集所有分析数据...")
+        logger.info("🔍 收集所有分析数据...")
         
-        all_data = []
+        paths = list(self._iter_analysis_files())
         
-        # 遍历所有日期目录
-        for date_dir in self.data_dir.iterdir():
-            if not date_dir.is_dir() or not re.match(r'\d{4}-\d{2}-\d{2}', date_dir.name):
-                continue
-            
-            analysis_dir = date_dir / 'analysis'
-            if not analysis_dir.exists():
-                continue
-            
-            print(f"📅 处理日期: {date_dir.name}")
-            
-            # 加载该日期的所有分析文件
-            for analysis_file in analysis_dir.glob("*.json"):
-                try:
-                    with open(analysis_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        
-                    # 添加元数据
-                    data['file_date'] = date_dir.name
-                    data['file_name'] = analysis_file.name
-                    data['file_path'] = str(analysis_file)
-                    
-                    all_data.append(data)
-                    
-                except Exception as e:
-                    print(f"⚠️ 读取 {analysis_file} 失败: {e}")
-        
-        print(f"✅ 收集到 {len(all_data)} 份分析数据")
+        # 分析文件小而多，读取以I/O等待为主，用线程池并发加载
+        with ThreadPoolExecutor(max_workers=LOAD_MAX_WORKERS) as executor:
+            all_data = [data for data in executor.map(self._load_analysis_file, paths) if data is not None]
+        
+        logger.info(f"✅ 收集到 {len(all_data)} 份分析数据")
         return all_data
     
+    def _load_analysis_file(self, entry: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        """
+        加载单个分析文件并添加元数据
+        
+        Args:
+            entry: (日期, 文件名, 文件路径) 元组
+            
+        Returns:
+            分析数据，读取失败时返回None
+        """
+        file_date, file_name, file_path = entry
+        try:
+            with open(file_path, 'rb') as f:
+                data = _json_loads(f.read())
+        except Exception as e:
+            logger.warning(f"⚠️ 读取 {file_path} 失败: {e}")
+            return None
+        
+        # 添加元数据
+        data['file_date'] = file_date
+        data['file_name'] = file_name
+        data['file_path'] = file_path
+        return data
+    
     def aggregate_by_date(self, analysis_data: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """
         按日期聚合分析数据
@@ -106,19 +234,17 @@ class FinancialAnalyzer:
         Returns:
             按日期聚合的数据字典
         """
-        print("📊 按日期聚合数据...")
-        
-        date_groups = defaultdict(list)
+        logger.info("📊 按日期聚合数据...")
         
-        for data in analysis_data:
-            file_date = data.get('file_date', 'unknown')
-            date_groups[file_date].append(data)
-        
-        # 按日期排序
-        sorted_dates = dict(sorted(date_groups.items(), reverse=True))
+        # YYYY-MM-DD字典序即时间顺序，稳定排序后连续分组，同一日期内保持原有顺序
+        date_key = lambda data: data.get('file_date', 'unknown')
+        sorted_dates = {
+            date: list(items)
+            for date, items in groupby(sorted(analysis_data, key=date_key, reverse=True), key=date_key)
+        }
         
         for date, items in sorted_dates.items():
-            print(f"📅 {date}: {len(items)} 份分析")
+            logger.info(f"📅 {date}: {len(items)} 份分析")
         
         return sorted_dates
     
@@ -133,58 +259,9 @@ class FinancialAnalyzer:
         Returns:
             宏观新闻列表
         """
-        print(f"📰 提取最近 {days} 天的宏观新闻...")
-        
-        macro_news = []
-        processed_dates = 0
-        
-        for date, items in date_groups.items():
-            if processed_dates >= days:
-                break
-                
-            for item in items:
-                # 提取宏观经济数据
-                macro_data = item.get('macroeconomic_data', [])
-                if macro_data:
-                    for data_point in macro_data:
-                        macro_news.append({
-                            'date': date,
-                            'source_file': item.get('file_name', ''),
-                            'indicator': data_point.get('indicator', ''),
-                            'value': data_point.get('actual_value', data_point.get('value', '')),
-                            'expected': data_point.get('expected_value', data_point.get('expected', '')),
-                            'impact': data_point.get('impact', ''),
-                            'description': data_point.get('interpretation', data_point.get('description', ''))
-                        })
-                
-                # 提取关键事件
-                key_events = item.get('key_events', [])
-                if key_events:
-                    for event in key_events:
-                        # 如果event是字符串，直接使用；如果是字典，提取相关字段
-                        if isinstance(event, str):
-                            event_desc = event
-                            event_impact = ''
-                        elif isinstance(event, dict):
-                            event_desc = event.get('description', event.get('event', str(event)))
-                            event_impact = event.get('impact', '')
-                        else:
-                            event_desc = str(event)
-                            event_impact = ''
-                            
-                        macro_news.append({
-                            'date': date,
-                            'source_file': item.get('file_name', ''),
-                            'indicator': '重要事件',
-                            'value': event_desc,
-                            'expected': '',
-                            'impact': event_impact,
-                            'description': event_desc
-                        })
-            
-            processed_dates += 1
-        
-        print(f"✅ 提取到 {len(macro_news)} 条宏观信息")
+        logger.info(f"📰 提取最近 {days} 天的宏观新闻...")
+        macro_news, _ = self._extract_recent(date_groups, days, 0)
+        logger.info(f"✅ 提取到 {len(macro_news)} 条宏观信息")
         return macro_news
     
     def extract_stock_positions(self, date_groups: Dict[str, List[Dict[str, Any]]], days: int = 7) -> List[Dict[str, Any]]:
@@ -198,123 +275,176 @@ class FinancialAnalyzer:
         Returns:
             股票点位信息列表
         """
-        print(f"📈 提取最近 {days} 天的股票点位信息...")
+        logger.info(f"📈 提取最近 {days} 天的股票点位信息...")
+        _, stock_positions = self._extract_recent(date_groups, 0, days)
+        self._log_stock_stats(stock_positions)
+        return stock_positions
+    
+    def extract_macro_and_stocks(self, date_groups: Dict[str, List[Dict[str, Any]]],
+                                 macro_days: int = 1,
+                                 stock_days: int = 7) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        一次遍历同时提取宏观新闻和股票点位信息
         
+        Args:
+            date_groups: 按日期分组的数据
+            macro_days: 宏观新闻提取天数
+            stock_days: 股票点位提取天数
+            
+        Returns:
+            (宏观新闻列表, 股票点位信息列表)
+        """
+        logger.info(f"📰 提取最近 {macro_days} 天的宏观新闻...")
+        logger.info(f"📈 提取最近 {stock_days} 天的股票点位信息...")
+        macro_news, stock_positions = self._extract_recent(date_groups, macro_days, stock_days)
+        logger.info(f"✅ 提取到 {len(macro_news)} 条宏观信息")
+        self._log_stock_stats(stock_positions)
+        return macro_news, stock_positions
+    
+    def _extract_recent(self, date_groups: Dict[str, List[Dict[str, Any]]],
+                        macro_days: int,
+                        stock_days: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        遍历最近的日期分组，按各自天数提取宏观新闻和股票点位
+        
+        Args:
+            date_groups: 按日期分组的数据，已按日期倒序
+            macro_days: 宏观新闻提取天数
+            stock_days: 股票点位提取天数
+            
+        Returns:
+            (宏观新闻列表, 股票点位信息列表)
+        """
+        macro_news = []
         stock_positions = []
-        stock_summary = defaultdict(list)  # 按股票代码汇总
-        processed_dates = 0
         
-        for date, items in date_groups.items():
-            if processed_dates >= days:
-                break
-                
+        # date_groups已按日期倒序，只遍历两者中较长的天数
+        for index, (date, items) in enumerate(islice(date_groups.items(), max(macro_days, stock_days, 0))):
+            with_macro = index < macro_days
+            with_stocks = index < stock_days
             for item in items:
-                stock_analysis = item.get('stock_analysis', [])
-                
-                for stock in stock_analysis:
-                    symbol = stock.get('symbol', '')
-                    company_name = stock.get('company_name', '')
-                    
-                    # 提取价格信息
-                    current_price = stock.get('current_price', '')
-                    price_levels = stock.get('price_levels', {})
-                    
-                    # 支撑阻力位可能在不同字段中
-                    support_levels = (price_levels.get('support', []) or 
-                                    price_levels.get('support_levels', []) or
-                                    [])
-                    resistance_levels = (price_levels.get('resistance', []) or 
-                                       price_levels.get('resistance_levels', []) or
-                                       [])
-                    
-                    # 提取操作建议 - 尝试多个可能的字段
-                    outlook = stock.get('outlook', '')
-                    recommendation = stock.get('recommendation', '')
-                    analyst_notes = stock.get('analyst_notes', '')
-                    
-                    # 推断操作类型 - 综合多个字段
-                    action = self._determine_action(outlook, recommendation + " " + analyst_notes)
-                    
-                    position_info = {
-                        'date': date,
-                        'source_file': item.get('file_name', ''),
-                        'symbol': symbol,
-                        'company_name': company_name,
-                        'current_price': current_price,
-                        'support_levels': support_levels,
-                        'resistance_levels': resistance_levels,
-                        'action': action,
-                        'outlook': outlook,
-                        'recommendation': recommendation,
-                        'key_points': stock.get('key_points', []),
-                        'risk_factors': stock.get('risk_factors', [])
-                    }
-                    
-                    stock_positions.append(position_info)
-                    stock_summary[symbol].append(position_info)
-            
-            processed_dates += 1
+                if with_macro:
+                    self._append_macro_news(date, item, macro_news)
+                if with_stocks:
+                    self._append_stock_positions(date, item, stock_positions)
         
-        print(f"✅ 提取到 {len(stock_positions)} 条股票点位信息")
-        print(f"📊 涉及 {len(stock_summary)} 只不同股票")
+        return macro_news, stock_positions
+    
+    def _append_macro_news(self, date: str, item: Dict[str, Any], macro_news: List[Dict[str, Any]]) -> None:
+        """
+        提取单份分析中的宏观经济数据和关键事件
         
-        return stock_positions
+        Args:
+            date: 分析所属日期
+            item: 单份分析数据
+            macro_news: 追加结果的宏观新闻列表
+        """
+        source_file = item.get('file_name', '')
+        
+        # 提取宏观经济数据
+        macro_news.extend({
+            'date': date,
+            'source_file': source_file,
+            'indicator': data_point.get('indicator', ''),
+            'value': data_point.get('actual_value', data_point.get('value', '')),
+            'expected': data_point.get('expected_value', data_point.get('expected', '')),
+            'impact': data_point.get('impact', ''),
+            'description': data_point.get('interpretation', data_point.get('description', ''))
+        } for data_point in item.get('macroeconomic_data') or [])
+        
+        # 提取关键事件
+        for event in item.get('key_events') or []:
+            # 如果event是字符串，直接使用；如果是字典，提取相关字段
+            if isinstance(event, str):
+                event_desc = event
+                event_impact = ''
+            elif isinstance(event, dict):
+                event_desc = event.get('description', event.get('event', str(event)))
+                event_impact = event.get('impact', '')
+            else:
+                event_desc = str(event)
+                event_impact = ''
+                
+            macro_news.append({
+                'date': date,
+                'source_file': source_file,
+                'indicator': '重要事件',
+                'value': event_desc,
+                'expected': '',
+                'impact': event_impact,
+                'description': event_desc
+            })
     
-    def _determine_action(self, outlook: str, recommendation: str) -> str:
+    def _append_stock_positions(self, date: str, item: Dict[str, Any], stock_positions: List[Dict[str, Any]]) -> None:
+        """
+        提取单份分析中的股票点位信息
+        
+        Args:
+            date: 分析所属日期
+            item: 单份分析数据
+            stock_positions: 追加结果的股票点位列表
+        """
+        source_file = item.get('file_name', '')
+        
+        for stock in item.get('stock_analysis', []):
+            # 同一股票在多份分析中反复出现，驻留后所有点位共享同一个字符串对象
+            symbol = stock.get('symbol', '')
+            if isinstance(symbol, str):
+                symbol = sys.intern(symbol)
+            company_name = stock.get('company_name', '')
+            
+            # 提取价格信息
+            current_price = stock.get('current_price', '')
+            price_levels = stock.get('price_levels', {})
+            
+            # 支撑阻力位可能在不同字段中
+            support_levels = _first_nonempty(price_levels, 'support', 'support_levels')
+            resistance_levels = _first_nonempty(price_levels, 'resistance', 'resistance_levels')
+            
+            # 提取操作建议 - 尝试多个可能的字段
+            outlook = stock.get('outlook', '')
+            recommendation = stock.get('recommendation', '')
+            analyst_notes = stock.get('analyst_notes', '')
+            
+            # 推断操作类型 - 综合多个字段，一次拼接并转小写
+            action = self._determine_action(f"{outlook} {recommendation} {analyst_notes}".lower())
+            
+            stock_positions.append({
+                'date': date,
+                'source_file': source_file,
+                'symbol': symbol,
+                'company_name': company_name,
+                'current_price': current_price,
+                'support_levels': support_levels,
+                'resistance_levels': resistance_levels,
+                'action': action,
+                'outlook': outlook,
+                'recommendation': recommendation,
+                'key_points': stock.get('key_points', []),
+                'risk_factors': stock.get('risk_factors', [])
+            })
+    
+    def _log_stock_stats(self, stock_positions: List[Dict[str, Any]]) -> None:
+        """记录股票点位条数和涉及的不同股票数"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info(f"✅ 提取到 {len(stock_positions)} 条股票点位信息")
+        logger.info(f"📊 涉及 {len({pos['symbol'] for pos in stock_positions})} 只不同股票")
+    
+    def _determine_action(self, text: str) -> str:
         """
         根据展望和建议判断操作类型
         
         Args:
-            outlook: 展望描述
-            recommendation: 建议描述
+            text: 展望、建议等描述拼接后的小写文本
             
         Returns:
             操作类型: 买入/卖出/持有/观望
         """
-        text = (str(outlook) + " " + str(recommendation)).lower()
-        
-        # 买入信号关键词 - 更全面的关键词
-        buy_keywords = [
-            '买入', '建议买入', '逢低买入', '增持', '建议增持', 'buy', 'long', 
-            '看好', '建议关注', '加仓', '建议加仓', '积极', '强烈推荐', 
-            '上涨', '看涨', '建议持有并适度加仓', '强势', '重回上攻'
-        ]
-        
-        # 卖出信号关键词  
-        sell_keywords = [
-            '卖出', '建议卖出', '减持', '建议减持', 'sell', 'short', 
-            '看空', '谨慎', '减仓', '不建议', '超买', '不宜追高',
-            '获利了结', '止盈', '规避风险', '破位下行'
-        ]
-        
-        # 持有信号关键词
-        hold_keywords = [
-            '持有', '维持', 'hold', '长线持有', '保持', '继续持有',
-            '稳健', '维持仓位', '不变', '波段'
-        ]
-        
-        # 观望信号关键词
-        watch_keywords = [
-            '观望', '等待', '暂时观望', '谨慎观望', '静观其变', 
-            '等待时机', '暂不操作', '关注', '跟踪'
-        ]
-        
         # 按优先级匹配
-        for keyword in buy_keywords:
-            if keyword in text:
-                return '买入'
-        
-        for keyword in sell_keywords:
-            if keyword in text:
-                return '卖出'
-        
-        for keyword in hold_keywords:
-            if keyword in text:
-                return '持有'
-                
-        for keyword in watch_keywords:
-            if keyword in text:
-                return '观望'
+        for action, pattern in _ACTION_PATTERNS:
+            if pattern.search(text):
+                return action
         
         return '观望'  # 默认
     
@@ -329,20 +459,14 @@ class FinancialAnalyzer:
         Returns:
             汇总报告数据
         """
-        print("📋 创建汇总报告...")
+        logger.info("📋 创建汇总报告...")
         
         # 统计股票操作分布
-        action_counts = defaultdict(int)
-        for pos in stock_positions:
-            action_counts[pos['action']] += 1
+        action_counts = Counter(pos['action'] for pos in stock_positions)
         
         # 获取最活跃的股票
-        symbol_counts = defaultdict(int)
-        for pos in stock_positions:
-            if pos['symbol']:
-                symbol_counts[pos['symbol']] += 1
-        
-        most_mentioned = dict(sorted(symbol_counts.items(), key=lambda x: x[1], reverse=True)[:10])
+        symbol_counts = Counter(pos['symbol'] for pos in stock_positions if pos['symbol'])
+        most_mentioned = dict(symbol_counts.most_common(10))
         
         summary = {
             'generated_at': datetime.now().isoformat(),
@@ -356,10 +480,10 @@ class FinancialAnalyzer:
             'stock_positions': stock_positions
         }
         
-        print(f"✅ 报告生成完成")
-        print(f"📰 宏观新闻: {len(macro_news)} 条")
-        print(f"📈 股票点位: {len(stock_positions)} 条")
-        print(f"🎯 操作分布: {dict(action_counts)}")
+        logger.info(f"✅ 报告生成完成")
+        logger.info(f"📰 宏观新闻: {len(macro_news)} 条")
+        logger.info(f"📈 股票点位: {len(stock_positions)} 条")
+        logger.info(f"🎯 操作分布: {dict(action_counts)}")
         
         return summary
     
@@ -380,10 +504,14 @@ class FinancialAnalyzer:
         
         output_file = self.data_dir / filename
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        if ORJSON_AVAILABLE:
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
         
-        print(f"💾 汇总报告已保存: {output_file}")
+        logger.info(f"💾 汇总报告已保存: {output_file}")
         return str(output_file)
 
 
@@ -398,6 +526,9 @@ def main():
     
     args = parser.parse_args()
     
+    # 命令行运行时按原样输出各步骤进度
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    
     print("📊 财经分析结果汇总工具")
     print("=" * 40)
     
@@ -413,9 +544,8 @@ def main():
     # 按日期聚合
     date_groups = analyzer.aggregate_by_date(analysis_data)
     
-    # 提取宏观新闻和股票点位
-    macro_news = analyzer.extract_macro_news(date_groups, args.macro_days)
-    stock_positions = analyzer.extract_stock_positions(date_groups, args.stock_days)
+    # 一次遍历提取宏观新闻和股票点位
+    macro_news, stock_positions = analyzer.extract_macro_and_stocks(date_groups, args.macro_days, args.stock_days)
     
     # 创建汇总报告
     summary = analyzer.create_summary_report(macro_news, stock_positions)
@@ -5,19 +5,88 @@
 
 import json
 import os
+import gzip
+import logging
+import time
+import shutil
+import hashlib
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, List
 
 try:
-    from flask import Flask, render_template, jsonify, request, send_from_directory
+    from flask import Flask, Response, render_template, request, send_from_directory
     FLASK_AVAILABLE = True
 except ImportError:
     FLASK_AVAILABLE = False
-    print("⚠️ Flask未安装，请运行: pip install flask")
+
+# 尝试导入orjson，用于快速序列化API响应
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from web.analyzer import FinancialAnalyzer
 
+logger = logging.getLogger(__name__)
+
+# 随包发布的模板目录
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+
+# /api/data响应缓存的有效期(秒)，与页面自动刷新间隔一致
+DATA_CACHE_TTL = float(os.environ.get("DASHBOARD_CACHE_TTL", "300"))
+
+# Gunicorn工作进程数和每个进程的线程数，可通过环境变量覆盖
+GUNICORN_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", str(os.cpu_count() or 1)))
+GUNICORN_THREADS = int(os.environ.get("DASHBOARD_THREADS", "8"))
+
+# 主页的浏览器缓存时间(秒)
+INDEX_MAX_AGE = 300
+
+# 仪表板股票表格展示的行数
+STOCK_TABLE_ROWS = 15
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """序列化为UTF-8编码的紧凑JSON字节串"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _latest_by_symbol(stock_positions: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """
+    每只股票只保留最新一条点位，按首次出现顺序取前limit只
+    
+    Args:
+        stock_positions: 按日期倒序排列的股票点位列表
+        limit: 最多保留的股票数
+        
+    Returns:
+        去重后的股票点位列表
+    """
+    latest = {}
+    for pos in stock_positions:
+        symbol = pos['symbol']
+        if not symbol:
+            continue
+        current = latest.get(symbol)
+        if current is None:
+            if len(latest) >= limit:
+                continue
+            latest[symbol] = pos
+        elif pos['date'] > current['date']:
+            latest[symbol] = pos
+    return list(latest.values())
+
+
+def _json_response(obj: Any, status: int = 200):
+    """构造JSON响应，替代jsonify以使用更快的序列化"""
+    return Response(_json_dumps(obj), status=status, mimetype='application/json')
+
+
 class FinanceDashboard:
     """财经分析仪表板"""
     
@@ -32,10 +101,9 @@ class FinanceDashboard:
         if not FLASK_AVAILABLE:
             raise ImportError("Flask is required for web dashboard")
         
-        # 使用绝对路径避免相对路径问题
-        project_root = Path(__file__).parent.parent
-        templates_dir = project_root / "templates"
-        static_dir = project_root / "static"
+        # 模板随web包一起发布，使用绝对路径避免相对路径问题
+        templates_dir = TEMPLATES_DIR
+        static_dir = Path(__file__).resolve().parent.parent / "static"
         
         self.app = Flask(__name__, 
                         template_folder=str(templates_dir),
@@ -45,11 +113,23 @@ class FinanceDashboard:
         # 初始化分析器
         self.analyzer = FinancialAnalyzer(data_dir)
         
+        # /api/data响应缓存：(序列化后的JSON, ETag)、过期时间和数据签名
+        self._cache = {'entry': None, 'expires_at': 0.0, 'sig': None}
+        self._cache_lock = threading.Lock()
+        
+        # 主页模板没有服务端变量，启动时读入一次并预先压缩，请求时直接返回字节
+        self._index_html = None
+        index_file = templates_dir / "dashboard.html"
+        if index_file.exists():
+            self._index_html = index_file.read_bytes()
+            self._index_gz = gzip.compress(self._index_html, 6)
+            self._index_etag = hashlib.blake2b(self._index_html, digest_size=8).hexdigest()
+        
         # 设置路由
         self._setup_routes()
         
-        print("🌐 财经仪表板初始化完成")
-        print(f"📁 数据目录: {self.analyzer.data_dir}")
+        logger.info("🌐 财经仪表板初始化完成")
+        logger.info(f"📁 数据目录: {self.analyzer.data_dir}")
     
     def _setup_routes(self):
         """设置路由"""
@@ -57,505 +137,162 @@ class FinanceDashboard:
         @self.app.route('/')
         def index():
             """主页"""
-            return render_template('dashboard.html')
+            if self._index_html is None:
+                return render_template('dashboard.html')
+            
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = Response(self._index_gz, mimetype='text/html')
+                response.headers['Content-Encoding'] = 'gzip'
+                response.set_etag(self._index_etag + '-gz')
+            else:
+                response = Response(self._index_html, mimetype='text/html')
+                response.set_etag(self._index_etag)
+            response.headers['Vary'] = 'Accept-Encoding'
+            response.headers['Cache-Control'] = f'public, max-age={INDEX_MAX_AGE}'
+            return response.make_conditional(request)
         
         @self.app.route('/api/data')
         def get_data():
             """获取分析数据API"""
-            try:
-                # 收集最新数据
-                analysis_data = self.analyzer.collect_all_analysis_data()
-                if not analysis_data:
-                    return jsonify({'error': 'No analysis data found'})
-                
-                # 按日期聚合
-                date_groups = self.analyzer.aggregate_by_date(analysis_data)
-                
-                # 提取数据
-                macro_news = self.analyzer.extract_macro_news(date_groups, days=1)
-                stock_positions = self.analyzer.extract_stock_positions(date_groups, days=7)
-                
-                # 创建汇总
-                summary = self.analyzer.create_summary_report(macro_news, stock_positions)
-                
-                return jsonify({
-                    'success': True,
-                    'data': summary,
-                    'updated_at': datetime.now().isoformat()
-                })
-                
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                })
+            return self._data_response()
         
         @self.app.route('/api/refresh')
         def refresh_data():
-            """刷新数据API"""
-            return get_data()
+            """刷新数据API，忽略缓存重新执行分析流水线"""
+            return self._data_response(force=True)
     
-    def run(self, host: str = '0.0.0.0', port: int = 5000):
-        """启动Web服务器"""
-        print(f"🚀 启动财经仪表板...")
-        print(f"🌐 访问地址: http://{host}:{port}")
-        
-        self.app.run(host=host, port=port, debug=self.app.config['DEBUG'])
-
-
-# 创建模板目录和文件
-def create_templates():
-    """创建模板文件"""
-    templates_dir = Path.cwd() / "templates"
-    static_dir = Path.cwd() / "static"
-    
-    templates_dir.mkdir(exist_ok=True)
-    static_dir.mkdir(exist_ok=True)
-    
-    # 创建主模板
-    dashboard_html = '''<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>🦏 Rhino Finance 财经分析仪表板</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background-color: #f5f6fa;
-            color: #2c3e50;
-            line-height: 1.6;
-        }
-        
-        .header {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 1.5rem 0;
-            text-align: center;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        
-        .header h1 {
-            font-size: 2.5rem;
-            margin-bottom: 0.5rem;
-        }
-        
-        .header p {
-            font-size: 1.1rem;
-            opacity: 0.9;
-        }
-        
-        .container {
-            max-width: 1400px;
-            margin: 2rem auto;
-            padding: 0 1rem;
-        }
-        
-        .dashboard-grid {
-            display: grid;
-            grid-template-columns: 1fr 2fr;
-            gap: 2rem;
-            margin-bottom: 2rem;
-        }
-        
-        .card {
-            background: white;
-            border-radius: 12px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.07);
-            overflow: hidden;
-            border: 1px solid #e1e5e9;
-        }
-        
-        .card-header {
-            background: #f8f9fa;
-            padding: 1.2rem;
-            border-bottom: 1px solid #e1e5e9;
-            display: flex;
-            justify-content: between;
-            align-items: center;
-        }
-        
-        .card-header h2 {
-            font-size: 1.4rem;
-            color: #2c3e50;
-            margin: 0;
-        }
-        
-        .card-content {
-            padding: 1.5rem;
-        }
-        
-        .macro-news-item {
-            padding: 1rem;
-            border-left: 4px solid #3498db;
-            margin-bottom: 1rem;
-            background: #f8f9fa;
-            border-radius: 0 8px 8px 0;
-        }
-        
-        .macro-news-item:last-child {
-            margin-bottom: 0;
-        }
-        
-        .macro-news-item .indicator {
-            font-weight: 600;
-            color: #2c3e50;
-            margin-bottom: 0.3rem;
-        }
-        
-        .macro-news-item .value {
-            font-size: 1.1rem;
-            margin-bottom: 0.3rem;
-        }
-        
-        .macro-news-item .date {
-            font-size: 0.85rem;
-            color: #7f8c8d;
-        }
-        
-        .stock-table {
-            width: 100%;
-            border-collapse: collapse;
-            font-size: 0.9rem;
-        }
-        
-        .stock-table th,
-        .stock-table td {
-            padding: 0.8rem;
-            text-align: left;
-            border-bottom: 1px solid #e1e5e9;
-        }
-        
-        .stock-table th {
-            background: #f8f9fa;
-            font-weight: 600;
-            color: #2c3e50;
-        }
-        
-        .stock-table tbody tr:hover {
-            background: #f8f9fa;
-        }
-        
-        .action-badge {
-            display: inline-block;
-            padding: 0.3rem 0.8rem;
-            border-radius: 20px;
-            font-size: 0.8rem;
-            font-weight: 600;
-            text-align: center;
-        }
-        
-        .action-buy { background: #d4edda; color: #155724; }
-        .action-sell { background: #f8d7da; color: #721c24; }
-        .action-hold { background: #fff3cd; color: #856404; }
-        .action-watch { background: #e2e3e5; color: #383d41; }
-        
-        .price-levels {
-            font-size: 0.8rem;
-            line-height: 1.3;
-        }
-        
-        .support { color: #28a745; }
-        .resistance { color: #dc3545; }
-        
-        .loading {
-            text-align: center;
-            padding: 2rem;
-            font-style: italic;
-            color: #7f8c8d;
-        }
-        
-        .error {
-            background: #f8d7da;
-            color: #721c24;
-            padding: 1rem;
-            border-radius: 8px;
-            margin: 1rem 0;
-        }
-        
-        .refresh-btn {
-            background: #3498db;
-            color: white;
-            border: none;
-            padding: 0.6rem 1.2rem;
-            border-radius: 6px;
-            cursor: pointer;
-            font-size: 0.9rem;
-            transition: background 0.3s;
-        }
-        
-        .refresh-btn:hover {
-            background: #2980b9;
-        }
-        
-        .stats-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 1rem;
-            margin-bottom: 2rem;
-        }
-        
-        .stat-card {
-            background: white;
-            padding: 1.5rem;
-            border-radius: 12px;
-            text-align: center;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.07);
-        }
-        
-        .stat-number {
-            font-size: 2rem;
-            font-weight: 700;
-            color: #3498db;
-            margin-bottom: 0.5rem;
-        }
-        
-        .stat-label {
-            color: #7f8c8d;
-            font-size: 0.9rem;
-        }
+    def _data_response(self, force: bool = False):
+        """
+        构造数据API的响应，供/api/data和/api/refresh共用
         
-        @media (max-width: 768px) {
-            .dashboard-grid {
-                grid-template-columns: 1fr;
-            }
+        Args:
+            force: 是否忽略缓存强制重建
             
-            .header h1 {
-                font-size: 2rem;
-            }
+        Returns:
+            JSON响应
+        """
+        try:
+            entry = self._get_cached_payload(force)
+            if entry is None:
+                return _json_response({'error': 'No analysis data found'})
             
-            .stock-table {
-                font-size: 0.8rem;
-            }
+            # 数据未变化时浏览器带If-None-Match轮询，直接返回304，不再下发响应体
+            payload, etag = entry
+            response = Response(payload, mimetype='application/json')
+            # 响应体含updated_at，重建后字节不同但数据等价，因此使用弱ETag
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
             
-            .stock-table th,
-            .stock-table td {
-                padding: 0.5rem;
-            }
-        }
-        
-        .last-updated {
-            text-align: center;
-            color: #7f8c8d;
-            font-size: 0.9rem;
-            margin-top: 2rem;
-        }
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>🦏 Rhino Finance</h1>
-        <p>财经分析智能仪表板</p>
-    </div>
+        except Exception as e:
+            return _json_response({
+                'success': False,
+                'error': str(e)
+            })
     
-    <div class="container">
-        <!-- 统计概览 -->
-        <div class="stats-grid" id="statsGrid">
-            <div class="stat-card">
-                <div class="stat-number" id="macroCount">-</div>
-                <div class="stat-label">宏观新闻</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-number" id="stockCount">-</div>
-                <div class="stat-label">股票分析</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-number" id="buyCount">-</div>
-                <div class="stat-label">买入建议</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-number" id="sellCount">-</div>
-                <div class="stat-label">卖出建议</div>
-            </div>
-        </div>
+    def _get_cached_payload(self, force: bool = False):
+        """
+        获取/api/data的响应内容，有效期内且数据签名未变时直接返回缓存
         
-        <!-- 主要内容 -->
-        <div class="dashboard-grid">
-            <!-- 宏观新闻 -->
-            <div class="card">
-                <div class="card-header">
-                    <h2>📰 最新宏观新闻</h2>
-                    <button class="refresh-btn" onclick="refreshData()">刷新</button>
-                </div>
-                <div class="card-content">
-                    <div id="macroNews" class="loading">正在加载数据...</div>
-                </div>
-            </div>
+        Args:
+            force: 是否忽略缓存强制重建
             
-            <!-- 股票点位分析 -->
-            <div class="card">
-                <div class="card-header">
-                    <h2>📈 股票点位分析 (近7天)</h2>
-                </div>
-                <div class="card-content">
-                    <div id="stockPositions" class="loading">正在加载数据...</div>
-                </div>
-            </div>
-        </div>
-        
-        <div class="last-updated" id="lastUpdated"></div>
-    </div>
-
-    <script>
-        // 数据加载和显示
-        async function loadData() {
-            try {
-                const response = await fetch('/api/data');
-                const result = await response.json();
-                
-                if (result.success) {
-                    displayData(result.data);
-                    document.getElementById('lastUpdated').textContent = 
-                        `最后更新: ${new Date(result.updated_at).toLocaleString()}`;
-                } else {
-                    showError('数据加载失败: ' + result.error);
-                }
-            } catch (error) {
-                showError('网络连接失败: ' + error.message);
-            }
-        }
-        
-        function displayData(data) {
-            // 更新统计数据
-            document.getElementById('macroCount').textContent = data.macro_news_count || 0;
-            document.getElementById('stockCount').textContent = data.stock_positions_count || 0;
-            document.getElementById('buyCount').textContent = (data.action_distribution && data.action_distribution['买入']) || 0;
-            document.getElementById('sellCount').textContent = (data.action_distribution && data.action_distribution['卖出']) || 0;
+        Returns:
+            (序列化后的JSON字节串, ETag) 元组，没有分析数据时返回None
+        """
+        sig = self.analyzer.data_signature()
+        cache = self._cache
+        if not force and cache['sig'] == sig and time.monotonic() < cache['expires_at']:
+            return cache['entry']
+        
+        # 加锁重建，并发请求只有第一个执行完整流水线，其余等待后复用结果
+        with self._cache_lock:
+            if not force and cache['sig'] == sig and time.monotonic() < cache['expires_at']:
+                return cache['entry']
             
-            // 显示宏观新闻
-            displayMacroNews(data.macro_news || []);
+            payload = self._build_payload()
+            if payload is None:
+                return None
             
-            // 显示股票点位
-            displayStockPositions(data.stock_positions || []);
-        }
+            # ETag取自数据签名，TTL到期重建但文件未变时客户端仍可得到304
+            entry = (payload, '-'.join(format(value, 'x') for value in sig))
+            cache.update(entry=entry, expires_at=time.monotonic() + DATA_CACHE_TTL, sig=sig)
+            return entry
+    
+    def _build_payload(self):
+        """
+        执行完整的分析流水线并序列化结果
         
-        function displayMacroNews(macroNews) {
-            const container = document.getElementById('macroNews');
-            
-            if (macroNews.length === 0) {
-                container.innerHTML = '<div class="loading">暂无宏观新闻数据</div>';
-                return;
-            }
-            
-            const html = macroNews.slice(0, 10).map(news => `
-                <div class="macro-news-item">
-                    <div class="indicator">${news.indicator || '重要指标'}</div>
-                    <div class="value">${news.value || news.description || '-'}</div>
-                    ${news.expected ? `<div style="font-size: 0.9rem; color: #7f8c8d;">预期: ${news.expected}</div>` : ''}
-                    <div class="date">${news.date}</div>
-                </div>
-            `).join('');
-            
-            container.innerHTML = html;
-        }
+        Returns:
+            序列化后的JSON字节串，没有分析数据时返回None
+        """
+        # 收集最新数据
+        analysis_data = self.analyzer.collect_all_analysis_data()
+        if not analysis_data:
+            return None
         
-        function displayStockPositions(stockPositions) {
-            const container = document.getElementById('stockPositions');
-            
-            if (stockPositions.length === 0) {
-                container.innerHTML = '<div class="loading">暂无股票点位数据</div>';
-                return;
-            }
-            
-            // 按股票代码分组，取最新的分析
-            const latestPositions = {};
-            stockPositions.forEach(pos => {
-                if (!pos.symbol) return;
-                if (!latestPositions[pos.symbol] || pos.date > latestPositions[pos.symbol].date) {
-                    latestPositions[pos.symbol] = pos;
-                }
-            });
-            
-            const positions = Object.values(latestPositions).slice(0, 15);
-            
-            const html = `
-                <table class="stock-table">
-                    <thead>
-                        <tr>
-                            <th>股票</th>
-                            <th>当前价格</th>
-                            <th>操作建议</th>
-                            <th>支撑位</th>
-                            <th>阻力位</th>
-                            <th>分析日期</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        ${positions.map(pos => `
-                            <tr>
-                                <td>
-                                    <strong>${pos.symbol || '-'}</strong><br>
-                                    <small style="color: #7f8c8d;">${pos.company_name || '-'}</small>
-                                </td>
-                                <td>${pos.current_price || '-'}</td>
-                                <td>
-                                    <span class="action-badge ${getActionClass(pos.action)}">
-                                        ${pos.action}
-                                    </span>
-                                </td>
-                                <td class="price-levels">
-                                    ${pos.support_levels && pos.support_levels.length > 0 ? 
-                                        pos.support_levels.slice(0,2).map(s => `<span class="support">${s}</span>`).join('<br>') : 
-                                        '-'
-                                    }
-                                </td>
-                                <td class="price-levels">
-                                    ${pos.resistance_levels && pos.resistance_levels.length > 0 ? 
-                                        pos.resistance_levels.slice(0,2).map(r => `<span class="resistance">${r}</span>`).join('<br>') : 
-                                        '-'
-                                    }
-                                </td>
-                                <td>${pos.date}</td>
-                            </tr>
-                        `).join('')}
-                    </tbody>
-                </table>
-            `;
-            
-            container.innerHTML = html;
-        }
+        # 按日期聚合
+        date_groups = self.analyzer.aggregate_by_date(analysis_data)
         
-        function getActionClass(action) {
-            switch(action) {
-                case '买入': return 'action-buy';
-                case '卖出': return 'action-sell'; 
-                case '持有': return 'action-hold';
-                case '观望': return 'action-watch';
-                default: return 'action-watch';
-            }
-        }
+        # 提取数据
+        macro_news, stock_positions = self.analyzer.extract_macro_and_stocks(date_groups, macro_days=1, stock_days=7)
         
-        function showError(message) {
-            document.getElementById('macroNews').innerHTML = `<div class="error">${message}</div>`;
-            document.getElementById('stockPositions').innerHTML = `<div class="error">${message}</div>`;
-        }
+        # 创建汇总
+        summary = self.analyzer.create_summary_report(macro_news, stock_positions)
         
-        function refreshData() {
-            document.getElementById('macroNews').innerHTML = '<div class="loading">正在刷新数据...</div>';
-            document.getElementById('stockPositions').innerHTML = '<div class="loading">正在刷新数据...</div>';
-            loadData();
-        }
+        # 页面只展示每只股票的最新点位，在服务端去重，不下发其余历史记录
+        summary['stock_positions'] = _latest_by_symbol(stock_positions, STOCK_TABLE_ROWS)
         
-        // 页面加载完成后自动加载数据
-        document.addEventListener('DOMContentLoaded', loadData);
+        return _json_dumps({
+            'success': True,
+            'data': summary,
+            'updated_at': datetime.now().isoformat()
+        })
+    
+    def run(self, host: str = '0.0.0.0', port: int = 5000):
+        """启动Web服务器"""
+        logger.info("🚀 启动财经仪表板...")
+        logger.info(f"🌐 访问地址: http://{host}:{port}")
         
-        // 自动刷新 (每5分钟)
-        setInterval(loadData, 5 * 60 * 1000);
-    </script>
-</body>
-</html>'''
+        self.app.run(host=host, port=port, debug=self.app.config['DEBUG'])
+
+
+def create_templates():
+    """将随包发布的模板复制到当前目录的templates下，便于自定义修改"""
+    templates_dir = Path.cwd() / "templates"
+    templates_dir.mkdir(exist_ok=True)
+    
+    target = templates_dir / "dashboard.html"
+    shutil.copyfile(TEMPLATES_DIR / "dashboard.html", target)
+    
+    logger.info(f"📄 模板文件已创建: {target}")
+
+
+def serve_with_gunicorn(data_dir: str, host: str, port: int):
+    """
+    用Gunicorn的gthread工作进程替换当前进程启动仪表板
+    
+    Args:
+        data_dir: 数据目录路径
+        host: 服务器地址
+        port: 端口号
+    """
+    if data_dir:
+        os.environ["DASHBOARD_DATA_DIR"] = str(Path(data_dir).resolve())
     
-    with open(templates_dir / "dashboard.html", 'w', encoding='utf-8') as f:
-        f.write(dashboard_html)
+    project_root = Path(__file__).resolve().parent.parent
+    logger.info(f"🚀 使用Gunicorn启动: {GUNICORN_WORKERS} 个进程 × {GUNICORN_THREADS} 个线程")
+    logger.info(f"🌐 访问地址: http://{host}:{port}")
     
-    print(f"📄 模板文件已创建: {templates_dir}/dashboard.html")
+    os.execvp("gunicorn", [
+        "gunicorn",
+        "--chdir", str(project_root),
+        "-w", str(GUNICORN_WORKERS),
+        "-k", "gthread",
+        "--threads", str(GUNICORN_THREADS),
+        "-b", f"{host}:{port}",
+        "web.wsgi:application",
+    ])
 
 
 def main():
@@ -571,23 +308,26 @@ def main():
     
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    # 分析流水线每次请求都会执行，非调试模式下只保留警告，不逐条输出进度
+    if not args.debug:
+        logging.getLogger('web.analyzer').setLevel(logging.WARNING)
+    
     if args.create_templates:
         create_templates()
         return
     
     if not FLASK_AVAILABLE:
-        print("❌ Flask未安装，请运行以下命令安装:")
-        print("   pip install flask")
+        logger.error("❌ Flask未安装，请运行: pip install flask")
         return
     
-    print("🌐 财经分析Web仪表板")
-    print("=" * 40)
+    logger.info("🌐 财经分析Web仪表板")
     
-    # 确保模板文件存在
-    templates_dir = Path.cwd() / "templates"
-    if not (templates_dir / "dashboard.html").exists():
-        print("📄 创建模板文件...")
-        create_templates()
+    # 非调试模式优先使用Gunicorn多进程+线程，避免请求在开发服务器上排队
+    if not args.debug and shutil.which("gunicorn"):
+        serve_with_gunicorn(args.data_dir, args.host, args.port)
+        return
     
     # 启动仪表板
     dashboard = FinanceDashboard(args.data_dir, args.debug)
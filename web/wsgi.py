@@ -0,0 +1,11 @@
+"""
+WSGI入口
+供Gunicorn等WSGI服务器加载: gunicorn "web.wsgi:application"
+数据目录通过环境变量DASHBOARD_DATA_DIR指定
+"""
+
+import os
+
+from web.web_dashboard import FinanceDashboard
+
+application = FinanceDashboard(os.environ.get("DASHBOARD_DATA_DIR"), debug=False).app